@@ -0,0 +1,186 @@
+"""Benchmark del ciclo di controllo della friggitrice
+
+Uso:
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.2
+
+Ogni benchmark viene eseguito in più processi (--processes) e si confronta
+la mediana, perché i tempi variano più da un processo all'altro che tra i
+campioni di uno stesso processo.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from fryer import FryerConnection, SimulatedFryer, send_to_fryer
+from main import AsyncFrenchFryFryer, FrenchFryFryer, cook_many
+from polling import FixedPolling
+
+SCALING_SIZES = (1, 10, 100, 1000)
+
+# Regressione minima tollerata per i benchmark più rumorosi, anche con --threshold più basso
+THRESHOLDS = {
+    "send_to_fryer": 0.4,        # Meno di un microsecondo per operazione
+    "connection_send": 0.4,
+    "concurrent_cycles_1": 0.3,  # Un solo ciclo per campione: domina lo scheduling dell'event loop
+}
+
+
+def _best_of(func: Callable[[], None], number: int, repeat: int = 7) -> float:
+    """Restituisce il tempo migliore per singola esecuzione, in secondi."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def bench_send_to_fryer(number: int) -> float:
+    """Overhead di una chiamata a send_to_fryer."""
+    return _best_of(lambda: send_to_fryer("read_temperature"), number)
+
+
+def bench_connection_send(number: int) -> float:
+    """Overhead di un comando inviato su una FryerConnection aperta."""
+    connection = FryerConnection().open()
+    return _best_of(lambda: connection.send("read_temperature"), number)
+
+
+def bench_heat_oil_iteration(number: int, iterations: int = 100) -> float:
+    """Costo di una iterazione del ciclo di polling di heat_oil."""
+    def run():
+        # L'olio non si scalda mai: heat_oil esegue tutte le iterazioni
+        fryer = FrenchFryFryer(transport=SimulatedFryer(heating_rate=0.0),
+                               polling=FixedPolling(interval=5, max_attempts=iterations))
+        try:
+            fryer.heat_oil()
+        except TimeoutError:
+            pass
+    return _best_of(run, number) / iterations
+
+
+def bench_cook_cycle(number: int) -> float:
+    """Costo di un ciclo cook_french_fries completo sul tempo virtuale."""
+    def run():
+        fryer = FrenchFryFryer(transport=SimulatedFryer(initial_temp=175.0))
+        fryer.cook_french_fries(quantity=1.0, cooking_time=180.0)
+    return _best_of(run, number)
+
+
+def bench_concurrent_cycles(fryers: int, repeat: int = 15) -> float:
+    """Tempo per ciclo con `fryers` friggitrici asincrone sullo stesso event loop.
+
+    Friggitrici ed event loop vengono preparati fuori dalla misura; viene
+    restituito il migliore di repeat campioni.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        samples = []
+        for _ in range(repeat):
+            orders = [(AsyncFrenchFryFryer(transport=SimulatedFryer(seed=i, initial_temp=175.0)), 1.0, 180.0)
+                      for i in range(fryers)]
+            gc.disable()  # Come timeit: le raccolte del garbage collector non entrano nella misura
+            try:
+                start = time.perf_counter()
+                loop.run_until_complete(cook_many(orders, max_concurrency=fryers))
+                samples.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+    finally:
+        loop.close()
+    return min(samples) / fryers
+
+
+def run_benchmarks(quick: bool = False) -> Dict[str, float]:
+    """Esegue tutti i benchmark e restituisce i secondi per operazione."""
+    scale = 10 if quick else 1
+    results = {
+        "send_to_fryer": bench_send_to_fryer(20000 // scale),
+        "connection_send": bench_connection_send(20000 // scale),
+        "heat_oil_iteration": bench_heat_oil_iteration(50 // scale),
+        "cook_cycle": bench_cook_cycle(2000 // scale),
+    }
+    sizes = SCALING_SIZES[:2] if quick else SCALING_SIZES
+    for size in sizes:
+        # Almeno ~100 cicli per campione anche per i banchi piccoli
+        results[f"concurrent_cycles_{size}"] = bench_concurrent_cycles(size, repeat=max(5, 100 // size))
+    return results
+
+
+def run_isolated(quick: bool = False, processes: int = 5) -> Dict[str, float]:
+    """Esegue run_benchmarks in processi nuovi, uno alla volta, e restituisce la mediana.
+
+    Da un processo all'altro i tempi cambiano molto più che tra i campioni
+    di uno stesso processo (disposizione in memoria, seed degli hash...):
+    la mediana su più processi rende il confronto con la baseline stabile.
+    """
+    if processes <= 1:
+        return run_benchmarks(quick)
+    runs = []
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                             max_tasks_per_child=1) as executor:
+        for _ in range(processes):
+            runs.append(executor.submit(run_benchmarks, quick).result())
+    return {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], threshold: float = 0.2,
+            thresholds: Optional[Dict[str, float]] = None) -> List[str]:
+    """Confronta i risultati con una baseline e restituisce le regressioni.
+
+    Un benchmark è in regressione se è più lento della baseline di oltre
+    threshold (0.2 = 20%), o della soglia più alta indicata per lui in
+    thresholds (predefinito THRESHOLDS). I benchmark assenti in una delle
+    due serie vengono ignorati.
+    """
+    thresholds = THRESHOLDS if thresholds is None else thresholds
+    regressions = []
+    for name, seconds in sorted(current.items()):
+        reference = baseline.get(name)
+        if reference is None or reference <= 0:
+            continue
+        change = seconds / reference - 1
+        if change > max(threshold, thresholds.get(name, 0.0)):
+            regressions.append(f"{name}: {reference * 1e6:.2f}µs -> {seconds * 1e6:.2f}µs (+{change:.0%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto di ingresso da riga di comando."""
+    parser = argparse.ArgumentParser(description="Benchmark del ciclo di controllo della friggitrice")
+    parser.add_argument("--save", metavar="FILE", help="salva i risultati come baseline JSON")
+    parser.add_argument("--compare", metavar="FILE", help="confronta i risultati con una baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="regressione tollerata (default 0.2 = 20%%)")
+    parser.add_argument("--quick", action="store_true", help="esecuzione ridotta")
+    parser.add_argument("--processes", type=int, default=5,
+                        help="processi su cui ripetere i benchmark, se ne usa la mediana (default 5)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_isolated(quick=args.quick, processes=args.processes)
+    for name, seconds in results.items():
+        print(f"{name:<26} {seconds * 1e6:12.2f} µs/op")
+    print(f"Durata totale: {time.perf_counter() - start:.1f} s")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSIONE {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
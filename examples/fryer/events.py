@@ -0,0 +1,206 @@
+"""Log strutturato degli eventi della friggitrice"""
+
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import IO, Any, Deque, Dict, List, Optional, Type
+
+
+@dataclass(frozen=True)
+class Event:
+    """Evento base: ogni evento riporta la friggitrice e l'istante in cui è avvenuto."""
+    fryer_id: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Restituisce l'evento come dizionario serializzabile."""
+        return {"event": type(self).__name__, **asdict(self)}
+
+
+@dataclass(frozen=True)
+class HeatStarted(Event):
+    """Il riscaldamento dell'olio è stato avviato."""
+
+
+@dataclass(frozen=True)
+class HeatStopped(Event):
+    """Il riscaldamento dell'olio è stato spento."""
+
+
+@dataclass(frozen=True)
+class TemperatureRead(Event):
+    """È stata letta la temperatura dell'olio."""
+    temperature: float = 0.0
+
+
+@dataclass(frozen=True)
+class TargetReached(Event):
+    """L'olio ha raggiunto la temperatura target."""
+    temperature: float = 0.0
+
+
+@dataclass(frozen=True)
+class PotatoesLoaded(Event):
+    """Le patatine sono state caricate nel cestello."""
+    quantity: float = 0.0
+
+
+@dataclass(frozen=True)
+class FryStarted(Event):
+    """È iniziata la frittura."""
+    frying_time: float = 0.0
+
+
+@dataclass(frozen=True)
+class FryCompleted(Event):
+    """La frittura è terminata."""
+    frying_time: float = 0.0
+
+
+@dataclass(frozen=True)
+class FriesRemoved(Event):
+    """Le patatine sono state tolte dalla friggitrice."""
+    count: int = 0
+
+
+@dataclass(frozen=True)
+class Shutdown(Event):
+    """La friggitrice è stata spenta."""
+
+
+@dataclass(frozen=True)
+class Error(Event):
+    """Si è verificato un errore."""
+    message: str = ""
+
+
+class NullSink:
+    """Sink che scarta tutti gli eventi."""
+
+    def write(self, event: Event) -> None:
+        """Scarta l'evento."""
+
+    def close(self) -> None:
+        """Non c'è nulla da chiudere."""
+
+
+class MemorySink:
+    """Sink che conserva gli eventi in memoria, utile nei test."""
+
+    def __init__(self):
+        """Inizializza un sink vuoto."""
+        self.events: List[Event] = []
+
+    def write(self, event: Event) -> None:
+        """Conserva l'evento."""
+        self.events.append(event)
+
+    def of_type(self, event_type: Type[Event]) -> List[Event]:
+        """Restituisce gli eventi del tipo indicato."""
+        return [event for event in self.events if isinstance(event, event_type)]
+
+    def close(self) -> None:
+        """Non c'è nulla da chiudere."""
+
+
+class JsonLinesSink:
+    """Sink che scrive un oggetto JSON per riga su uno stream."""
+
+    def __init__(self, stream: IO[str]):
+        """Inizializza il sink sullo stream indicato."""
+        self.stream = stream
+
+    def write(self, event: Event) -> None:
+        """Scrive l'evento come riga JSON."""
+        self.stream.write(json.dumps(event.to_dict()) + "\n")
+
+    def close(self) -> None:
+        """Svuota il buffer dello stream."""
+        self.stream.flush()
+
+
+class EventLog:
+    """Emettitore di eventi con ring buffer e thread di scrittura in background.
+
+    Chi emette non tocca mai i sink: l'evento viene accodato in un buffer
+    circolare e scritto da un thread dedicato. Se non ci sono sink l'emissione
+    non costruisce nemmeno l'evento. A buffer pieno gli eventi più vecchi
+    vengono scartati e conteggiati in `dropped`.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """Inizializza il log senza sink."""
+        self._buffer: Deque[Event] = deque(maxlen=capacity)
+        self._sinks: List[Any] = []
+        self._cond = threading.Condition()
+        self._writer: Optional[threading.Thread] = None
+        self._pending = 0  # Eventi accodati ma non ancora scritti
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se almeno un sink è collegato."""
+        return bool(self._sinks)
+
+    def add_sink(self, sink: Any) -> None:
+        """Collega un sink e avvia il thread di scrittura, se necessario."""
+        with self._cond:
+            self._sinks = self._sinks + [sink]
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="fryer-event-log", daemon=True)
+                self._writer.start()
+
+    def remove_sink(self, sink: Any) -> None:
+        """Scollega un sink dopo aver scritto gli eventi in sospeso."""
+        self.flush()
+        with self._cond:
+            self._sinks = [s for s in self._sinks if s is not sink]
+        sink.close()
+
+    def emit(self, event_type: Type[Event], **fields: Any) -> None:
+        """Accoda un evento del tipo indicato."""
+        if not self._sinks:
+            return
+        event = event_type(**fields)
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+                self._pending -= 1
+            self._buffer.append(event)
+            self._pending += 1
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attende che tutti gli eventi accodati siano stati scritti."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self) -> None:
+        """Scrive gli eventi in sospeso e scollega tutti i sink."""
+        for sink in list(self._sinks):
+            self.remove_sink(sink)
+
+    def _run(self) -> None:
+        """Ciclo del thread di scrittura."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: bool(self._buffer))
+                events = list(self._buffer)
+                self._buffer.clear()
+                sinks = self._sinks
+            for event in events:
+                for sink in sinks:
+                    try:
+                        sink.write(event)
+                    except Exception:
+                        # Un sink difettoso non deve fermare il log
+                        pass
+            with self._cond:
+                self._pending -= len(events)
+                self._cond.notify_all()
+
+
+# Log condiviso dalle friggitrici che non ne ricevono uno proprio
+default_log = EventLog()
@@ -1,35 +1,207 @@
 # Simulazione della funzione di comunicazione con la friggitrice
+import asyncio
+import math
+import random
 import time
-from typing import Any, Dict, Optional, Union
+from array import array
+from typing import Any, Callable, Dict, Optional, Union
+
+
+def _handle_sleep(arguments: Dict[str, Any]) -> None:
+    """Gestisce il comando 'sleep'."""
+    if "seconds" not in arguments:
+        raise ValueError("L'azione 'sleep' richiede l'argomento 'seconds'")
+    # Simula l'attesa per il numero di secondi specificato
+    time.sleep(arguments["seconds"])
+    return None
+
+
+def _handle_heat(arguments: Dict[str, Any]) -> None:
+    """Gestisce il comando 'heat'."""
+    if "action" not in arguments:
+        raise ValueError("L'azione 'heat' richiede l'argomento 'action'")
+    if arguments["action"] not in ["start", "stop"]:
+        raise ValueError("L'argomento 'action' per 'heat' deve essere 'start' o 'stop'")
+    # Qui si simulerebbe l'accensione o lo spegnimento del riscaldamento
+    return None
+
+
+def _handle_read_temperature(arguments: Dict[str, Any]) -> float:
+    """Gestisce il comando 'read_temperature'."""
+    # Simula la lettura della temperatura (valore casuale tra 20 e 200)
+    return random.uniform(20, 200)
+
+
+def _handle_read_temperatures(arguments: Dict[str, Any]) -> array:
+    """Gestisce il comando 'read_temperatures' (lettura di più friggitrici)."""
+    if "fryer_ids" not in arguments:
+        raise ValueError("L'azione 'read_temperatures' richiede l'argomento 'fryer_ids'")
+    # Una sola lettura per tutte le friggitrici del banco
+    return array("d", (random.uniform(20, 200) for _ in arguments["fryer_ids"]))
+
+
+def _handle_load(arguments: Dict[str, Any]) -> None:
+    """Gestisce il comando 'load' (patatine immerse nell'olio)."""
+    if "quantity" not in arguments:
+        raise ValueError("L'azione 'load' richiede l'argomento 'quantity'")
+    return None
+
+
+# Tabella di dispatch: ad ogni azione corrisponde il suo gestore
+COMMANDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "sleep": _handle_sleep,
+    "heat": _handle_heat,
+    "read_temperature": _handle_read_temperature,
+    "read_temperatures": _handle_read_temperatures,
+    "load": _handle_load,
+}
 
 
 def send_to_fryer(action: str, arguments: Dict[str, Any] = None) -> Optional[Union[float, None]]:
     """Invia un comando alla friggitrice."""
     if arguments is None:
         arguments = {}
-        
+
+    handler = COMMANDS.get(action)
+    if handler is None:
+        raise ValueError(f"Azione non supportata: {action}")
+    return handler(arguments)
+
+
+async def async_send_to_fryer(action: str, arguments: Dict[str, Any] = None) -> Optional[Union[float, None]]:
+    """Invia un comando alla friggitrice senza bloccare l'event loop."""
+    if arguments is None:
+        arguments = {}
+
     if action == "sleep":
         if "seconds" not in arguments:
             raise ValueError("L'azione 'sleep' richiede l'argomento 'seconds'")
-        # Simula l'attesa per il numero di secondi specificato
-        time.sleep(arguments["seconds"])
-        return None
-        
-    elif action == "heat":
-        if "action" not in arguments:
-            raise ValueError("L'azione 'heat' richiede l'argomento 'action'")
-        if arguments["action"] not in ["start", "stop"]:
-            raise ValueError("L'argomento 'action' per 'heat' deve essere 'start' o 'stop'")
-        # Qui si simulerebbe l'accensione o lo spegnimento del riscaldamento
-        print(f"Riscaldamento {'avviato' if arguments['action'] == 'start' else 'spento'}")
+        await asyncio.sleep(arguments["seconds"])
         return None
-        
-    elif action == "read_temperature":
-        # Simula la lettura della temperatura (valore casuale tra 20 e 200)
-        import random
-        temp = random.uniform(20, 200)
-        print(f"Temperatura attuale: {temp:.1f}°C")
-        return temp
-        
-    else:
-        raise ValueError(f"Azione non supportata: {action}")
+    return send_to_fryer(action, arguments)
+
+
+class FryerConnection:
+    """Sessione persistente verso la friggitrice.
+
+    Mantiene aperto un unico canale con il dispositivo e risolve la tabella
+    dei comandi una sola volta all'apertura, invece che ad ogni chiamata.
+    Si usa come context manager e può essere iniettata in FrenchFryFryer
+    come trasporto.
+    """
+
+    def __init__(self, commands: Dict[str, Callable[[Dict[str, Any]], Any]] = None):
+        """Inizializza la connessione (ancora chiusa)."""
+        self._commands = COMMANDS if commands is None else commands
+        self._handlers: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Indica se la connessione è aperta."""
+        return self._handlers is not None
+
+    def open(self) -> "FryerConnection":
+        """Apre il canale verso la friggitrice."""
+        if self._handlers is None:
+            self._handlers = dict(self._commands)
+        return self
+
+    def close(self) -> None:
+        """Chiude il canale verso la friggitrice."""
+        self._handlers = None
+
+    def send(self, action: str, arguments: Dict[str, Any] = None) -> Optional[Union[float, None]]:
+        """Invia un comando sul canale aperto."""
+        if self._handlers is None:
+            raise RuntimeError("Connessione alla friggitrice non aperta")
+        handler = self._handlers.get(action)
+        if handler is None:
+            raise ValueError(f"Azione non supportata: {action}")
+        return handler({} if arguments is None else arguments)
+
+    async def send_async(self, action: str, arguments: Dict[str, Any] = None) -> Optional[Union[float, None]]:
+        """Invia un comando sul canale aperto senza bloccare l'event loop."""
+        if action == "sleep":
+            if self._handlers is None:
+                raise RuntimeError("Connessione alla friggitrice non aperta")
+            if arguments is None or "seconds" not in arguments:
+                raise ValueError("L'azione 'sleep' richiede l'argomento 'seconds'")
+            await asyncio.sleep(arguments["seconds"])
+            return None
+        return self.send(action, arguments)
+
+    def __enter__(self) -> "FryerConnection":
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class SimulatedFryer(FryerConnection):
+    """Friggitrice simulata con orologio virtuale e modello termico deterministico.
+
+    Il comando 'sleep' fa avanzare l'orologio virtuale invece di attendere,
+    quindi un ciclo completo dura pochi microsecondi. L'olio si scalda a
+    velocità costante con il riscaldamento acceso, si raffredda verso la
+    temperatura ambiente quando è spento e perde load_drop gradi per ogni kg
+    di patatine caricate. Il rumore delle letture dipende solo dal seed.
+    """
+
+    def __init__(self, seed: int = 0, ambient: float = 20.0, initial_temp: Optional[float] = None,
+                 heating_rate: float = 2.0, cooling_rate: float = 0.002, max_temp: float = 190.0,
+                 load_drop: float = 5.0, noise: float = 0.2):
+        """Inizializza la simulazione (la connessione è già aperta)."""
+        super().__init__(commands={
+            "sleep": self._sleep,
+            "heat": self._heat,
+            "read_temperature": self._read_temperature,
+            "load": self._load,
+        })
+        self.ambient = ambient
+        self.heating_rate = heating_rate  # °C al secondo con riscaldamento acceso
+        self.cooling_rate = cooling_rate  # Costante di raffreddamento (1/s)
+        self.max_temp = max_temp          # Limite del termostato di sicurezza
+        self.load_drop = load_drop        # °C persi per kg di patatine
+        self.noise = noise                # Deviazione standard delle letture
+        self.clock = 0.0                  # Secondi virtuali trascorsi
+        self.temperature = ambient if initial_temp is None else initial_temp
+        self.heater_on = False
+        self._random = random.Random(seed)
+        self.open()
+
+    def now(self) -> float:
+        """Restituisce l'orologio virtuale, utilizzabile come clock dello scheduler."""
+        return self.clock
+
+    def advance(self, seconds: float) -> None:
+        """Fa avanzare l'orologio virtuale aggiornando la temperatura."""
+        if seconds < 0:
+            raise ValueError("Il tempo non può tornare indietro")
+        self.clock += seconds
+        if self.heater_on:
+            self.temperature = min(self.max_temp, self.temperature + self.heating_rate * seconds)
+        else:
+            decay = math.exp(-self.cooling_rate * seconds)
+            self.temperature = self.ambient + (self.temperature - self.ambient) * decay
+
+    def _sleep(self, arguments: Dict[str, Any]) -> None:
+        if "seconds" not in arguments:
+            raise ValueError("L'azione 'sleep' richiede l'argomento 'seconds'")
+        self.advance(arguments["seconds"])
+
+    def _heat(self, arguments: Dict[str, Any]) -> None:
+        _handle_heat(arguments)
+        self.heater_on = arguments["action"] == "start"
+
+    def _read_temperature(self, arguments: Dict[str, Any]) -> float:
+        return self.temperature + self._random.gauss(0.0, self.noise)
+
+    def _load(self, arguments: Dict[str, Any]) -> None:
+        _handle_load(arguments)
+        self.temperature = max(self.ambient, self.temperature - self.load_drop * arguments["quantity"])
+
+    async def send_async(self, action: str, arguments: Dict[str, Any] = None) -> Optional[Union[float, None]]:
+        """Esegue il comando sul tempo virtuale, cedendo il controllo all'event loop."""
+        result = self.send(action, arguments)
+        await asyncio.sleep(0)
+        return result
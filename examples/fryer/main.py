@@ -1,93 +1,293 @@
 """Modulo friggitrice"""
 
+import asyncio
+import functools
+import threading
 import time
-from typing import Dict, Any, Optional, Union, List
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from fryer import send_to_fryer
+from events import (Error, EventLog, FriesRemoved, FryCompleted, FryStarted, HeatStarted, HeatStopped,
+                    PotatoesLoaded, Shutdown, TargetReached, TemperatureRead, default_log)
+from fryer import FryerConnection, async_send_to_fryer, send_to_fryer
+from metrics import MetricsRegistry
+from polling import AdaptivePolling, FixedPolling
+from state import FryerSnapshot, FryerState, check_transition, state_for
+from timeseries import TimeSeriesStore
+
+MAX_LOAD_KG = 2.0  # Capienza massima del cestello in kg
+CHANGES_TEMPERATURE = frozenset({"heat", "load"})  # Comandi che rendono obsoleta la temperatura in cache
+
+
+def timed_phase(phase: str):
+    """Decoratore che misura la durata di una fase, se la friggitrice ha un registro di metriche."""
+    def decorator(method):
+        if asyncio.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                if self.metrics is None:
+                    return await method(self, *args, **kwargs)
+                with self.metrics.time_phase(phase, self.fryer_id):
+                    return await method(self, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return method(self, *args, **kwargs)
+            with self.metrics.time_phase(phase, self.fryer_id):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
 
 
 class FrenchFryFryer:
-    """Classe che gestisce la frittura delle patatine."""
+    """Classe che gestisce la frittura delle patatine.
+
+    Lo stato del ciclo (vedi FryerState) è pubblicato come FryerSnapshot
+    immutabile: i thread di monitoraggio leggono `snapshot` senza lock,
+    mentre i cambiamenti di stato sono serializzati e validati.
+    """
+    
+    __slots__ = ("fryer_id", "target_temp", "transport", "metrics", "event_log", "polling",
+                 "temperature_ttl", "clock", "history", "cache_hits", "cache_misses", "_cached_temp", "_cached_at",
+                 "_snapshot", "_lock")
     
-    def __init__(self, target_temp: float = 180.0):
-        """Inizializza la friggitrice per patatine."""
+    def __init__(self, target_temp: float = 180.0, transport: Optional[FryerConnection] = None,
+                 fryer_id: int = 0, temperature_ttl: float = 0.0,
+                 metrics: Optional[MetricsRegistry] = None, event_log: Optional[EventLog] = None,
+                 polling: Optional[Union[FixedPolling, AdaptivePolling]] = None,
+                 history: Optional[TimeSeriesStore] = None, clock: Callable[[], float] = time.monotonic):
+        """Inizializza la friggitrice per patatine.
+
+        Con temperature_ttl > 0 le letture di temperatura più recenti di
+        temperature_ttl secondi (misurati con clock, ad esempio
+        SimulatedFryer.now) vengono servite dalla cache. Con history ogni
+        lettura effettiva viene registrata nello storico.
+        """
+        self.fryer_id = fryer_id        # Identificativo della friggitrice nel banco
         self.target_temp = target_temp  # Temperatura target in gradi Celsius
-        self.is_heating = False         # Se sta scaldando l'olio o meno
-        self.potatoes_loaded = False    # Se le patatine sono caricate o meno
+        self.transport = transport      # Connessione persistente (opzionale)
+        self.metrics = metrics          # Registro delle latenze (opzionale)
+        self.event_log = default_log if event_log is None else event_log
+        self.polling = polling          # Strategia di polling predefinita per heat_oil
+        self.temperature_ttl = temperature_ttl  # Validità della cache in secondi
+        self.clock = clock              # Orologio usato per la validità della cache
+        self.history = history          # Storico delle temperature (opzionale)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cached_temp: Optional[float] = None
+        self._cached_at = 0.0
+        self._snapshot = FryerSnapshot(fryer_id)
+        self._lock = threading.Lock()   # Serializza solo le scritture dello stato
+    
+    @property
+    def snapshot(self) -> FryerSnapshot:
+        """Ultima istantanea pubblicata; si può leggere da qualsiasi thread."""
+        return self._snapshot
+    
+    @property
+    def state(self) -> FryerState:
+        """Fase attuale del ciclo di frittura."""
+        return self._snapshot.state
+    
+    @property
+    def is_heating(self) -> bool:
+        """Se sta scaldando l'olio o meno."""
+        return self._snapshot.heater_on
+    
+    @is_heating.setter
+    def is_heating(self, value: bool) -> None:
+        self._publish(heater_on=value, validate=False)
+    
+    @property
+    def potatoes_loaded(self) -> bool:
+        """Se le patatine sono caricate o meno."""
+        return self._snapshot.potatoes_loaded
+    
+    @potatoes_loaded.setter
+    def potatoes_loaded(self, value: bool) -> None:
+        self._publish(potatoes_loaded=value, validate=False)
+    
+    def _publish(self, state: Optional[FryerState] = None, validate: bool = True, **changes: Any) -> FryerSnapshot:
+        """Pubblica una nuova istantanea con i campi modificati.
+
+        Senza state lo stato viene ricavato dai flag aggiornati. Con
+        validate=False la transizione non viene verificata (usato dai setter
+        di is_heating e potatoes_loaded).
+        """
+        with self._lock:
+            old = self._snapshot
+            new = old._replace(**changes)
+            if state is None:
+                state = state_for(new.heater_on, new.potatoes_loaded, old.state)
+            if validate:
+                check_transition(old.state, state)
+            self._snapshot = new._replace(state=state, version=old.version + 1)
+            return self._snapshot
         
-    def check_temperature(self) -> float:
-        """Controlla la temperatura attuale della friggitrice."""
-        return send_to_fryer("read_temperature")
+    def _send(self, action: str, arguments: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """Invia un comando tramite il trasporto iniettato o send_to_fryer."""
+        if action in CHANGES_TEMPERATURE:
+            self.invalidate_temperature()
+        send = self.transport.send if self.transport is not None else send_to_fryer
+        args = (action,) if arguments is None else (action, arguments)
+        if self.metrics is None:
+            return send(*args)
+        with self.metrics.time_action(action, self.fryer_id):
+            return send(*args)
     
-    def heat_oil(self, max_attempts: int = 6) -> bool:
-        """Riscalda l'olio fino alla temperatura target."""
+    def _emit(self, event_type, **fields: Any) -> None:
+        """Emette un evento sul log della friggitrice."""
+        self.event_log.emit(event_type, fryer_id=self.fryer_id, **fields)
+    
+    def invalidate_temperature(self) -> None:
+        """Scarta la temperatura in cache."""
+        self._cached_temp = None
+    
+    def _cached_temperature(self, max_age: Optional[float]) -> Optional[float]:
+        """Restituisce la temperatura in cache se ancora valida, altrimenti None."""
+        if max_age is None:
+            max_age = self.temperature_ttl
+        if (max_age > 0 and self._cached_temp is not None
+                and self.clock() - self._cached_at <= max_age):
+            self.cache_hits += 1
+            return self._cached_temp
+        self.cache_misses += 1
+        return None
+    
+    def _store_temperature(self, temp: float) -> float:
+        """Salva in cache una nuova lettura."""
+        self._cached_temp = temp
+        self._cached_at = self.clock()
+        self._publish(temperature=temp)
+        if self.history is not None:
+            self.history.record(self.fryer_id, temp)
+        return temp
+        
+    def check_temperature(self, max_age: Optional[float] = None) -> float:
+        """Controlla la temperatura attuale della friggitrice.
+
+        max_age sovrascrive temperature_ttl; con max_age=0 la lettura è sempre fresca.
+        """
+        cached = self._cached_temperature(max_age)
+        if cached is not None:
+            return cached
+        temp = self._store_temperature(self._send("read_temperature"))
+        self._emit(TemperatureRead, temperature=temp)
+        return temp
+    
+    @timed_phase("heat_oil")
+    def heat_oil(self, max_attempts: int = 6,
+                 polling: Optional[Union[FixedPolling, AdaptivePolling]] = None) -> bool:
+        """Riscalda l'olio fino alla temperatura target.
+
+        Senza una strategia di polling (né quella passata al costruttore)
+        attende 5 secondi tra una lettura e l'altra, per al massimo
+        max_attempts tentativi.
+        """
         # Avvia il riscaldamento
-        send_to_fryer("heat", {"action": "start"})
-        self.is_heating = True
+        self._send("heat", {"action": "start"})
+        self._publish(heater_on=True)
+        self._emit(HeatStarted)
         
         # Controlla la temperatura fino a raggiungere quella target
-        attempts = 0
+        if polling is None:
+            polling = self.polling or FixedPolling(interval=5, max_attempts=max_attempts)
+        polling.reset()
         current_temp = self.check_temperature()
         
-        while current_temp < self.target_temp and attempts < max_attempts:
-            print(f"Riscaldamento in corso... Temperatura attuale: {current_temp:.1f}°C")
-            send_to_fryer("sleep", {"seconds": 5})
-            current_temp = self.check_temperature()
-            attempts += 1
+        while current_temp < self.target_temp:
+            interval = polling.next_interval(current_temp, self.target_temp)
+            if interval is None:
+                break
+            self._send("sleep", {"seconds": interval})
+            current_temp = self.check_temperature(max_age=0)
             
         # Verifica se la temperatura target è stata raggiunta
         if current_temp >= self.target_temp:
-            print(f"Temperatura target raggiunta: {current_temp:.1f}°C")
+            self._target_reached()
+            self._emit(TargetReached, temperature=current_temp)
             return True
         else:
-            send_to_fryer("heat", {"action": "stop"})
-            self.is_heating = False
-            raise TimeoutError(f"Impossibile raggiungere la temperatura target dopo {max_attempts} tentativi")
+            self._send("heat", {"action": "stop"})
+            self._publish(heater_on=False)
+            self._emit(HeatStopped)
+            raise TimeoutError(f"Impossibile raggiungere la temperatura target {polling.describe_limit()}")
     
+    @timed_phase("load_potatoes")
     def load_potatoes(self, quantity: float) -> None:
         """Carica le patatine nella friggitrice."""
         if quantity <= 0:
             raise ValueError("La quantità di patatine deve essere maggiore di zero")
         
-        if quantity > 2.0:
-            raise ValueError("Quantità massima di patatine: 2 kg")
+        if quantity > MAX_LOAD_KG:
+            raise ValueError(f"Quantità massima di patatine: {MAX_LOAD_KG:g} kg")
+        
+        if self.potatoes_loaded:
+            raise RuntimeError("Il cestello contiene già delle patatine")
             
-        print(f"Caricamento di {quantity} kg di patatine nella friggitrice")
-        self.potatoes_loaded = True
+        self._send("load", {"quantity": quantity})
+        self._emit(PotatoesLoaded, quantity=quantity)
+        self._publish(potatoes_loaded=True)
     
-    def fry(self, frying_time: float = 180.0) -> None:
-        """Frigge le patatine per il tempo specificato."""
+    def _target_reached(self) -> None:
+        """Segna l'olio come pronto, se il cestello è vuoto."""
+        if not self.potatoes_loaded:
+            self._publish(FryerState.READY)
+    
+    def _check_can_fry(self) -> None:
+        """Verifica che si possa iniziare a friggere."""
         if not self.is_heating:
             raise RuntimeError("Il riscaldamento non è attivo")
             
         if not self.potatoes_loaded:
             raise RuntimeError("Nessuna patata caricata nella friggitrice")
         
+        if self.state is not FryerState.LOADED:
+            raise RuntimeError(f"Impossibile friggere nello stato {self.state.value}")
+    
+    @timed_phase("fry")
+    def fry(self, frying_time: float = 180.0) -> None:
+        """Frigge le patatine per il tempo specificato."""
+        self._check_can_fry()
+        
         # Controlla che la temperatura sia vicina a quella target
         current_temp = self.check_temperature()
         if current_temp < self.target_temp * 0.9:  # 90% della temperatura target
             raise RuntimeError(f"Temperatura troppo bassa: {current_temp:.1f}°C")
         
-        print(f"Inizio frittura delle patatine per {frying_time} secondi")
-        send_to_fryer("sleep", {"seconds": frying_time})
-        print("Frittura completata!")
+        self._publish(FryerState.FRYING)
+        self._emit(FryStarted, frying_time=frying_time)
+        try:
+            self._send("sleep", {"seconds": frying_time})
+        except BaseException:
+            self._publish(FryerState.LOADED)
+            raise
+        self._publish(FryerState.DONE)
+        self._emit(FryCompleted, frying_time=frying_time)
     
+    @timed_phase("remove_fries")
     def remove_fries(self) -> List[str]:
         """Rimuove le patatine dalla friggitrice."""
         if not self.potatoes_loaded:
             raise RuntimeError("Nessuna patata da rimuovere")
             
-        print("Rimozione delle patatine dalla friggitrice")
-        self.potatoes_loaded = False
-        return ["🍟"] * 10  # Simulate french fries
+        self._publish(FryerState.READY if self.is_heating else FryerState.IDLE, potatoes_loaded=False)
+        fries = ["🍟"] * 10  # Simulate french fries
+        self._emit(FriesRemoved, count=len(fries))
+        return fries
     
+    @timed_phase("shutdown")
     def shutdown(self) -> None:
         """Spegne la friggitrice."""
         if self.is_heating:
-            send_to_fryer("heat", {"action": "stop"})
-            self.is_heating = False
-        print("Friggitrice spenta")
+            self._send("heat", {"action": "stop"})
+            self._publish(heater_on=False)
+            self._emit(HeatStopped)
+        self._emit(Shutdown)
     
+    @timed_phase("cook_french_fries")
     def cook_french_fries(self, quantity, cooking_time) -> List[str]:
         """Processo completo di frittura delle patatine."""
         try:
@@ -105,7 +305,7 @@ class FrenchFryFryer:
             # Rimuovi e restituisci le patatine
             return self.remove_fries()
         except Exception as e:
-            print(f"Errore durante la frittura: {e}")
+            self._emit(Error, message=str(e))
             # Spegni la friggitrice in caso di errore
             self.shutdown()
             raise
@@ -113,4 +313,181 @@ class FrenchFryFryer:
             # Assicurati che la friggitrice venga spenta in caso di errore
             if self.is_heating:
                 self.shutdown()
-            
\ No newline at end of file
+
+
+class FryerBank:
+    """Banco di friggitrici le cui temperature vengono lette in blocco.
+
+    Ad ogni poll viene inviato un solo comando read_temperatures per tutte le
+    friggitrici, e i controlli sulle soglie lavorano sull'intero array. Se le
+    friggitrici hanno un proprio trasporto e il banco no, ognuna viene letta
+    tramite il suo. Le letture aggiornano anche cache, istantanea e storico
+    di ogni friggitrice.
+    """
+    
+    def __init__(self, fryers: List[FrenchFryFryer], transport: Optional[FryerConnection] = None):
+        """Inizializza il banco con le friggitrici indicate."""
+        if not fryers:
+            raise ValueError("Il banco deve contenere almeno una friggitrice")
+        self.fryers = list(fryers)
+        self.transport = transport
+        self.fryer_ids = [fryer.fryer_id for fryer in self.fryers]
+        self.targets = array("d", (fryer.target_temp for fryer in self.fryers))
+        self.temperatures = array("d", [0.0] * len(self.fryers))  # Ultima lettura
+    
+    def poll(self) -> array:
+        """Legge le temperature di tutte le friggitrici, con un solo comando se possibile."""
+        if self.transport is None and any(fryer.transport is not None for fryer in self.fryers):
+            self.temperatures = array("d", (fryer.check_temperature(max_age=0) for fryer in self.fryers))
+            return self.temperatures
+        send = self.transport.send if self.transport is not None else send_to_fryer
+        temps = send("read_temperatures", {"fryer_ids": self.fryer_ids})
+        if len(temps) != len(self.fryers):
+            raise RuntimeError(f"Letture attese: {len(self.fryers)}, ricevute: {len(temps)}")
+        self.temperatures = array("d", temps)
+        for fryer, temp in zip(self.fryers, self.temperatures):
+            fryer._store_temperature(temp)
+        return self.temperatures
+    
+    def ready(self) -> List[int]:
+        """Restituisce gli id delle friggitrici che hanno raggiunto la temperatura target."""
+        return [fryer_id for fryer_id, temp, target
+                in zip(self.fryer_ids, self.temperatures, self.targets) if temp >= target]
+    
+    def snapshots(self) -> List[FryerSnapshot]:
+        """Restituisce l'ultima istantanea di ogni friggitrice, senza prendere lock."""
+        return [fryer.snapshot for fryer in self.fryers]
+    
+    def below(self, fraction: float = 0.9) -> List[int]:
+        """Restituisce gli id delle friggitrici sotto la frazione indicata del target."""
+        return [fryer_id for fryer_id, temp, target
+                in zip(self.fryer_ids, self.temperatures, self.targets) if temp < target * fraction]
+
+
+class AsyncFrenchFryFryer(FrenchFryFryer):
+    """Variante asincrona di FrenchFryFryer.
+
+    Le attese passano da asyncio.sleep, quindi un solo event loop può
+    supervisionare molte friggitrici contemporaneamente.
+    """
+    
+    __slots__ = ()
+    
+    async def _send_async(self, action: str, arguments: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """Invia un comando in modo asincrono."""
+        if action in CHANGES_TEMPERATURE:
+            self.invalidate_temperature()
+        send = self.transport.send_async if self.transport is not None else async_send_to_fryer
+        args = (action,) if arguments is None else (action, arguments)
+        if self.metrics is None:
+            return await send(*args)
+        with self.metrics.time_action(action, self.fryer_id):
+            return await send(*args)
+    
+    async def check_temperature(self, max_age: Optional[float] = None) -> float:
+        """Controlla la temperatura attuale della friggitrice."""
+        cached = self._cached_temperature(max_age)
+        if cached is not None:
+            return cached
+        temp = self._store_temperature(await self._send_async("read_temperature"))
+        self._emit(TemperatureRead, temperature=temp)
+        return temp
+    
+    @timed_phase("heat_oil")
+    async def heat_oil(self, max_attempts: int = 6,
+                 polling: Optional[Union[FixedPolling, AdaptivePolling]] = None) -> bool:
+        """Riscalda l'olio fino alla temperatura target.
+
+        Senza una strategia di polling (né quella passata al costruttore)
+        attende 5 secondi tra una lettura e l'altra, per al massimo
+        max_attempts tentativi.
+        """
+        await self._send_async("heat", {"action": "start"})
+        self._publish(heater_on=True)
+        self._emit(HeatStarted)
+        
+        if polling is None:
+            polling = self.polling or FixedPolling(interval=5, max_attempts=max_attempts)
+        polling.reset()
+        current_temp = await self.check_temperature()
+        
+        while current_temp < self.target_temp:
+            interval = polling.next_interval(current_temp, self.target_temp)
+            if interval is None:
+                break
+            await self._send_async("sleep", {"seconds": interval})
+            current_temp = await self.check_temperature(max_age=0)
+            
+        if current_temp >= self.target_temp:
+            self._target_reached()
+            self._emit(TargetReached, temperature=current_temp)
+            return True
+        else:
+            await self._send_async("heat", {"action": "stop"})
+            self._publish(heater_on=False)
+            self._emit(HeatStopped)
+            raise TimeoutError(f"Impossibile raggiungere la temperatura target {polling.describe_limit()}")
+    
+    @timed_phase("fry")
+    async def fry(self, frying_time: float = 180.0) -> None:
+        """Frigge le patatine per il tempo specificato."""
+        self._check_can_fry()
+        
+        current_temp = await self.check_temperature()
+        if current_temp < self.target_temp * 0.9:  # 90% della temperatura target
+            raise RuntimeError(f"Temperatura troppo bassa: {current_temp:.1f}°C")
+        
+        self._publish(FryerState.FRYING)
+        self._emit(FryStarted, frying_time=frying_time)
+        try:
+            await self._send_async("sleep", {"seconds": frying_time})
+        except BaseException:
+            self._publish(FryerState.LOADED)
+            raise
+        self._publish(FryerState.DONE)
+        self._emit(FryCompleted, frying_time=frying_time)
+    
+    @timed_phase("shutdown")
+    async def shutdown(self) -> None:
+        """Spegne la friggitrice."""
+        if self.is_heating:
+            await self._send_async("heat", {"action": "stop"})
+            self._publish(heater_on=False)
+            self._emit(HeatStopped)
+        self._emit(Shutdown)
+    
+    @timed_phase("cook_french_fries")
+    async def cook_french_fries(self, quantity, cooking_time) -> List[str]:
+        """Processo completo di frittura delle patatine."""
+        try:
+            await self.heat_oil()
+            self.load_potatoes(quantity)
+            await self.fry(cooking_time)
+            await self.shutdown()
+            return self.remove_fries()
+        except Exception as e:
+            self._emit(Error, message=str(e))
+            await self.shutdown()
+            raise
+        finally:
+            if self.is_heating:
+                await self.shutdown()
+
+
+async def cook_many(orders: List[Tuple[AsyncFrenchFryFryer, float, float]],
+                    max_concurrency: int = 100) -> List[Union[List[str], BaseException]]:
+    """Esegue più cicli di frittura in parallelo sullo stesso event loop.
+
+    Ogni ordine è una tupla (friggitrice, quantità, tempo di frittura). Al massimo
+    max_concurrency cicli sono attivi contemporaneamente; per ogni ordine viene
+    restituito il risultato oppure l'eccezione sollevata.
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency deve essere maggiore di zero")
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def run(fryer: AsyncFrenchFryFryer, quantity: float, cooking_time: float) -> List[str]:
+        async with semaphore:
+            return await fryer.cook_french_fries(quantity, cooking_time)
+    
+    return await asyncio.gather(*(run(*order) for order in orders), return_exceptions=True)
@@ -0,0 +1,139 @@
+"""Metriche di latenza per i comandi e le fasi della friggitrice"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Limiti superiori dei bucket in secondi (l'ultimo bucket, +Inf, è implicito)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class Histogram:
+    """Istogramma a bucket fissi, nello stile di Prometheus."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Inizializza un istogramma vuoto."""
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Non cumulativi, +Inf in fondo
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Registra un valore."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Restituisce le coppie (le, conteggio cumulativo)."""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return result
+
+
+class MetricsRegistry:
+    """Raccoglie latenze dei comandi e durate delle fasi, per friggitrice.
+
+    È thread-safe e può essere esportato in formato testuale Prometheus o
+    in JSON, anche direttamente su file.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """Inizializza un registro vuoto."""
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # (nome metrica, etichette ordinate) -> istogramma
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """Registra una durata per la metrica e le etichette indicate."""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None)))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def observe_action(self, action: str, seconds: float, fryer_id: Optional[int] = None) -> None:
+        """Registra la latenza di un comando inviato alla friggitrice."""
+        self.observe("fryer_command_duration_seconds", seconds, action=action, fryer_id=fryer_id)
+
+    def observe_phase(self, phase: str, seconds: float, fryer_id: Optional[int] = None) -> None:
+        """Registra la durata di una fase del ciclo di frittura."""
+        self.observe("fryer_phase_duration_seconds", seconds, phase=phase, fryer_id=fryer_id)
+
+    @contextmanager
+    def time_action(self, action: str, fryer_id: Optional[int] = None) -> Iterator[None]:
+        """Misura la latenza del comando eseguito nel blocco."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_action(action, time.perf_counter() - start, fryer_id)
+
+    @contextmanager
+    def time_phase(self, phase: str, fryer_id: Optional[int] = None) -> Iterator[None]:
+        """Misura la durata della fase eseguita nel blocco."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - start, fryer_id)
+
+    def get(self, name: str, **labels: Any) -> Optional[Histogram]:
+        """Restituisce l'istogramma per metrica ed etichette, se esiste."""
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None)))
+        return self._histograms.get(key)
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Esporta le metriche come dizionario serializzabile in JSON."""
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                result.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "buckets": dict(histogram.cumulative()),
+                })
+        return result
+
+    def to_json(self) -> str:
+        """Esporta le metriche in JSON."""
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Esporta le metriche nel formato testuale di Prometheus."""
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+        current = None
+        for (name, labels), histogram in items:
+            if name != current:
+                lines.append(f"# TYPE {name} histogram")
+                current = name
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            prefix = label_text + "," if label_text else ""
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+            suffix = "{" + label_text + "}" if label_text else ""
+            lines.append(f"{name}_sum{suffix} {histogram.sum}")
+            lines.append(f"{name}_count{suffix} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, fmt: str = "prometheus") -> None:
+        """Scrive le metriche su file, in formato 'prometheus' o 'json'."""
+        if fmt == "prometheus":
+            text = self.to_prometheus()
+        elif fmt == "json":
+            text = self.to_json()
+        else:
+            raise ValueError(f"Formato non supportato: {fmt}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
@@ -0,0 +1,203 @@
+"""Esecuzione di molti cicli simulati su più processi
+
+I cicli vengono divisi in blocchi ed eseguiti da un ProcessPoolExecutor.
+I processi non restituiscono i risultati come oggetti serializzati: li
+scrivono direttamente in un blocco di memoria condivisa
+(multiprocessing.shared_memory), in cui ogni ciclo ha una riga fissa per le
+metriche e due per la traccia delle temperature. Il processo principale
+legge il blocco alla fine e aggrega i risultati.
+
+Uso:
+    python parallel.py --cycles 10000 --workers 4
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fryer import SimulatedFryer
+from main import FrenchFryFryer
+from polling import AdaptivePolling
+from timeseries import TimeSeriesStore
+
+# Colonne della riga delle metriche di ogni ciclo
+METRICS = ("seed", "ok", "virtual_seconds", "reads", "wall_seconds", "max_temperature", "samples")
+_COLUMN = {name: index for index, name in enumerate(METRICS)}
+
+
+class _Layout:
+    """Posizioni (in double) delle sezioni nel blocco condiviso."""
+
+    def __init__(self, cycles: int, trace_length: int):
+        self.cycles = cycles
+        self.trace_length = trace_length
+        self.timestamps = cycles * len(METRICS)
+        self.temperatures = self.timestamps + cycles * trace_length
+        self.size = self.temperatures + cycles * trace_length
+
+    def row(self, cycle: int) -> int:
+        return cycle * len(METRICS)
+
+
+def _run_cycle(seed: int, quantity: float, cooking_time: float, initial_temp: Optional[float],
+               trace_length: int) -> Tuple[bool, float, int, array, array]:
+    """Esegue un ciclo simulato; restituisce esito, durata virtuale, letture e traccia."""
+    sim = SimulatedFryer(seed=seed, initial_temp=initial_temp)
+    history = TimeSeriesStore(capacity=trace_length, bucket_capacity=1, clock=sim.now)
+    fryer = FrenchFryFryer(transport=sim, history=history, polling=AdaptivePolling(deadline=600.0, clock=sim.now))
+    try:
+        fryer.cook_french_fries(quantity, cooking_time)
+        ok = True
+    except (RuntimeError, TimeoutError, ValueError):
+        ok = False
+    timestamps, temperatures = history.query(fryer.fryer_id)
+    return ok, sim.now(), fryer.cache_misses, timestamps, temperatures
+
+
+def _run_shard(name: str, cycles: int, trace_length: int, start: int, stop: int,
+               quantity: float, cooking_time: float, initial_temp: Optional[float]) -> int:
+    """Esegue i cicli [start, stop) e ne scrive i risultati nel blocco condiviso."""
+    layout = _Layout(cycles, trace_length)
+    shm = shared_memory.SharedMemory(name=name)
+    data = shm.buf.cast("d")
+    try:
+        for cycle in range(start, stop):
+            row = layout.row(cycle)
+            began = time.perf_counter()
+            ok, virtual_seconds, reads, timestamps, temperatures = _run_cycle(
+                int(data[row + _COLUMN["seed"]]), quantity, cooking_time, initial_temp, trace_length)
+            wall_seconds = time.perf_counter() - began
+            samples = len(temperatures)
+            offset = cycle * trace_length
+            data[layout.timestamps + offset:layout.timestamps + offset + samples] = timestamps
+            data[layout.temperatures + offset:layout.temperatures + offset + samples] = temperatures
+            data[row + 1:row + len(METRICS)] = array("d", (
+                float(ok), virtual_seconds, reads, wall_seconds, max(temperatures, default=math.nan), samples))
+        return stop - start
+    finally:
+        data.release()
+        shm.close()
+
+
+class ParallelReport:
+    """Risultati aggregati dei cicli eseguiti in parallelo."""
+
+    def __init__(self, data: array, layout: _Layout, workers: int, wall_seconds: float):
+        """Inizializza il report a partire da una copia del blocco condiviso."""
+        self._data = data
+        self._layout = layout
+        self.cycles = layout.cycles
+        self.workers = workers
+        self.wall_seconds = wall_seconds
+
+    def metric(self, name: str) -> array:
+        """Restituisce la colonna indicata (vedi METRICS) per tutti i cicli."""
+        column = _COLUMN[name]
+        return self._data[column:self._layout.timestamps:len(METRICS)]
+
+    def trace(self, cycle: int) -> Tuple[array, array]:
+        """Restituisce timestamp e temperature lette durante il ciclo indicato."""
+        if not 0 <= cycle < self.cycles:
+            raise IndexError(f"Ciclo inesistente: {cycle}")
+        samples = int(self._data[self._layout.row(cycle) + _COLUMN["samples"]])
+        offset = cycle * self._layout.trace_length
+        timestamps = self._data[self._layout.timestamps + offset:self._layout.timestamps + offset + samples]
+        temperatures = self._data[self._layout.temperatures + offset:self._layout.temperatures + offset + samples]
+        return timestamps, temperatures
+
+    @property
+    def completed(self) -> int:
+        """Numero di cicli completati con successo."""
+        return int(sum(self.metric("ok")))
+
+    @property
+    def failed(self) -> int:
+        """Numero di cicli terminati con un errore."""
+        return self.cycles - self.completed
+
+    @property
+    def cycles_per_second(self) -> float:
+        """Cicli eseguiti per secondo di tempo reale."""
+        return self.cycles / self.wall_seconds if self.wall_seconds else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """Riepilogo dei risultati."""
+        virtual = self.metric("virtual_seconds")
+        return {
+            "cycles": self.cycles,
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wall_seconds": self.wall_seconds,
+            "cycles_per_second": self.cycles_per_second,
+            "mean_virtual_seconds": sum(virtual) / self.cycles if self.cycles else 0.0,
+            "mean_reads": sum(self.metric("reads")) / self.cycles if self.cycles else 0.0,
+        }
+
+
+def _shards(cycles: int, count: int) -> List[Tuple[int, int]]:
+    """Divide [0, cycles) in al più count intervalli contigui di dimensioni simili."""
+    size = max(1, math.ceil(cycles / count))
+    return [(start, min(start + size, cycles)) for start in range(0, cycles, size)]
+
+
+def run_parallel(seeds: Sequence[int], workers: Optional[int] = None, quantity: float = 1.0,
+                 cooking_time: float = 180.0, initial_temp: Optional[float] = None,
+                 trace_length: int = 64, shards_per_worker: int = 4) -> ParallelReport:
+    """Esegue un ciclo simulato per ogni seed, distribuendo i cicli su più processi.
+
+    Ogni processo riceve solo il nome del blocco condiviso e l'intervallo di
+    cicli da eseguire; delle tracce vengono conservate le ultime
+    trace_length letture.
+    """
+    if trace_length <= 0:
+        raise ValueError("trace_length deve essere maggiore di zero")
+    workers = workers or os.cpu_count() or 1
+    layout = _Layout(len(seeds), trace_length)
+    shm = shared_memory.SharedMemory(create=True, size=max(8, layout.size * 8))
+    data = shm.buf.cast("d")
+    try:
+        data[:layout.size] = array("d", [math.nan]) * layout.size
+        for cycle, seed in enumerate(seeds):
+            data[layout.row(cycle) + _COLUMN["seed"]] = seed
+        began = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_shard, shm.name, layout.cycles, trace_length, start, stop,
+                                       quantity, cooking_time, initial_temp)
+                       for start, stop in _shards(layout.cycles, workers * shards_per_worker)]
+            for future in futures:
+                future.result()
+        wall_seconds = time.perf_counter() - began
+        result = array("d")
+        result.frombytes(shm.buf[:layout.size * 8])
+    finally:
+        data.release()
+        shm.close()
+        shm.unlink()
+    return ParallelReport(result, layout, workers, wall_seconds)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto di ingresso da riga di comando."""
+    parser = argparse.ArgumentParser(description="Esegue cicli di frittura simulati su più processi")
+    parser.add_argument("--cycles", type=int, default=10000)
+    parser.add_argument("--workers", type=int, help="numero di processi (predefinito: numero di core)")
+    parser.add_argument("--initial-temp", type=float, help="temperatura iniziale dell'olio")
+    parser.add_argument("--trace-length", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    report = run_parallel(range(args.cycles), args.workers, initial_temp=args.initial_temp,
+                          trace_length=args.trace_length)
+    for key, value in report.summary().items():
+        print(f"{key:<22} {value:.2f}" if isinstance(value, float) else f"{key:<22} {value}")
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Strategie di polling per il riscaldamento dell'olio"""
+
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+
+class FixedPolling:
+    """Attende sempre lo stesso intervallo, per un numero massimo di tentativi."""
+
+    def __init__(self, interval: float = 5.0, max_attempts: int = 6):
+        """Inizializza la strategia con intervallo fisso."""
+        if interval <= 0:
+            raise ValueError("L'intervallo deve essere maggiore di zero")
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.attempts = 0
+
+    def reset(self) -> None:
+        """Prepara la strategia per un nuovo riscaldamento."""
+        self.attempts = 0
+
+    def next_interval(self, temperature: float, target: float) -> Optional[float]:
+        """Restituisce quanti secondi attendere, o None se bisogna arrendersi."""
+        if self.attempts >= self.max_attempts:
+            return None
+        self.attempts += 1
+        return self.interval
+
+    def describe_limit(self) -> str:
+        """Descrive il limite raggiunto, per il messaggio di timeout."""
+        return f"dopo {self.max_attempts} tentativi"
+
+
+class AdaptivePolling:
+    """Stima la velocità di riscaldamento e attende fino all'incrocio previsto del target.
+
+    La velocità è calcolata sulle ultime `window` letture; l'attesa è limitata
+    tra min_interval e max_interval e il riscaldamento viene abbandonato quando
+    il tempo trascorso dal reset supera la deadline. Il tempo trascorso è
+    misurato con clock (SimulatedFryer.now per il tempo virtuale), quindi
+    include le letture lente e le attese più lunghe del previsto; non è mai
+    inferiore alla somma delle attese richieste.
+    """
+
+    def __init__(self, min_interval: float = 0.5, max_interval: float = 10.0,
+                 deadline: float = 120.0, window: int = 3, initial_interval: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """Inizializza la strategia adattiva."""
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Deve valere 0 < min_interval <= max_interval")
+        if window < 2:
+            raise ValueError("Servono almeno due letture per stimare la velocità")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.deadline = deadline
+        self.initial_interval = initial_interval
+        self.clock = clock
+        self.elapsed = 0.0  # Secondi trascorsi dal reset
+        self.readings: Deque[Tuple[float, float]] = deque(maxlen=window)
+        self._started: Optional[float] = None
+        self._requested = 0.0  # Secondi di attesa richiesti finora
+
+    def reset(self) -> None:
+        """Prepara la strategia per un nuovo riscaldamento."""
+        self.elapsed = 0.0
+        self.readings.clear()
+        self._started = self.clock()
+        self._requested = 0.0
+
+    def heating_rate(self) -> Optional[float]:
+        """Stima la velocità di riscaldamento in °C/s, se possibile."""
+        if len(self.readings) < 2:
+            return None
+        (t0, temp0), (t1, temp1) = self.readings[0], self.readings[-1]
+        if t1 <= t0:
+            return None
+        return (temp1 - temp0) / (t1 - t0)
+
+    def next_interval(self, temperature: float, target: float) -> Optional[float]:
+        """Restituisce quanti secondi attendere, o None se la deadline è scaduta."""
+        now = self.clock()
+        if self._started is None:
+            self._started = now
+        self.elapsed = max(self._requested, now - self._started)
+        remaining = self.deadline - self.elapsed
+        if remaining <= 0:
+            return None
+        self.readings.append((self.elapsed, temperature))
+
+        rate = self.heating_rate()
+        if rate is None or rate <= 0:
+            # Nessuna stima affidabile: si attende l'intervallo iniziale
+            interval = self.initial_interval
+        else:
+            interval = (target - temperature) / rate
+        interval = min(max(interval, self.min_interval), self.max_interval, remaining)
+        self._requested = self.elapsed + interval
+        return interval
+
+    def describe_limit(self) -> str:
+        """Descrive il limite raggiunto, per il messaggio di timeout."""
+        return f"entro {self.deadline} secondi"
@@ -0,0 +1,267 @@
+"""Invio dei comandi alla friggitrice con retry, timeout e circuit breaker"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Type
+
+from fryer import FryerConnection, async_send_to_fryer, send_to_fryer
+
+# Comandi che si possono ripetere senza effetti collaterali
+IDEMPOTENT_COMMANDS = frozenset({"read_temperature", "read_temperatures", "heat"})
+
+
+class CircuitOpenError(RuntimeError):
+    """La friggitrice è esclusa perché ha fallito troppe volte di seguito."""
+
+
+class CommandTimeout(TimeoutError):
+    """Il comando non ha risposto entro il tempo massimo.
+
+    worker è il thread del tentativo scaduto, che potrebbe essere ancora in
+    corso.
+    """
+
+    def __init__(self, message: str, worker: Optional[threading.Thread] = None):
+        super().__init__(message)
+        self.worker = worker
+
+
+class RetryPolicy:
+    """Decide quali comandi ripetere e quanto attendere tra un tentativo e l'altro.
+
+    Vengono ripetuti solo i comandi idempotenti che falliscono con uno degli
+    errori in retry_on. L'attesa cresce esponenzialmente con jitter completo:
+    un valore casuale tra 0 e min(max_delay, base_delay * 2 ** tentativo).
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.05, max_delay: float = 1.0,
+                 retry_on: Tuple[Type[BaseException], ...] = (OSError, TimeoutError),
+                 idempotent: FrozenSet[str] = IDEMPOTENT_COMMANDS, seed: Optional[int] = None):
+        """Inizializza la politica di retry."""
+        if max_attempts <= 0:
+            raise ValueError("max_attempts deve essere maggiore di zero")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.idempotent = idempotent
+        self._random = random.Random(seed)
+
+    def should_retry(self, action: str, error: BaseException, attempt: int) -> bool:
+        """Indica se ripetere il comando dopo il tentativo attempt (contato da 1)."""
+        return attempt < self.max_attempts and action in self.idempotent and isinstance(error, self.retry_on)
+
+    def delay(self, attempt: int) -> float:
+        """Secondi da attendere prima del tentativo successivo ad attempt."""
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Circuit breaker di una singola friggitrice.
+
+    Dopo failure_threshold comandi falliti di seguito il circuito si apre e
+    i comandi vengono rifiutati subito. Trascorsi reset_timeout secondi passa
+    in semiaperto: il primo comando fa da prova e, se riesce, il circuito si
+    richiude.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """Inizializza il circuit breaker chiuso."""
+        if failure_threshold <= 0:
+            raise ValueError("failure_threshold deve essere maggiore di zero")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0  # Fallimenti consecutivi
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Stato attuale del circuito."""
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Indica se un comando può essere inviato."""
+        with self._lock:
+            if self._state() == self.HALF_OPEN:
+                # Un solo comando di prova: gli altri attendono un nuovo reset_timeout
+                self._opened_at = self.clock()
+                return True
+            return self._state() == self.CLOSED
+
+    def record_success(self) -> None:
+        """Registra un comando riuscito e chiude il circuito."""
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Registra un comando fallito, aprendo il circuito oltre la soglia."""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+
+
+class CommandPipeline:
+    """Trasporto che invia i comandi con retry, timeout e circuit breaker.
+
+    Avvolge una FryerConnection (o send_to_fryer) e si inietta in
+    FrenchFryFryer al suo posto. timeouts associa ad alcune azioni il tempo
+    massimo di risposta in secondi: ogni invio di quei comandi ha un thread
+    dedicato, che in caso di timeout viene abbandonato. I comandi bloccati
+    non occupano quindi risorse condivise e non ritardano i successivi, che
+    rispondono appena il dispositivo torna disponibile. Un comando scaduto
+    non viene ripetuto mentre il tentativo precedente è ancora in corso,
+    per non inviare due volte lo stesso comando in parallelo.
+    """
+
+    def __init__(self, transport: Optional[FryerConnection] = None, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, timeouts: Optional[Dict[str, float]] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        """Inizializza la pipeline."""
+        self.transport = transport
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker
+        self.timeouts = dict(timeouts or {})
+        self.sleep = sleep
+        self.retries = 0   # Tentativi ripetuti
+        self.failures = 0  # Comandi falliti dopo tutti i tentativi
+        self.rejected = 0  # Comandi rifiutati a circuito aperto
+        self._abandoned: List[threading.Thread] = []  # Tentativi scaduti
+        self._lock = threading.Lock()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _check_breaker(self, action: str) -> None:
+        if self.breaker is not None and not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"Friggitrice esclusa dopo troppi errori, comando '{action}' rifiutato")
+
+    def _finish(self, error: Optional[BaseException]) -> None:
+        """Aggiorna il circuit breaker con l'esito finale del comando."""
+        if self.breaker is None:
+            return
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, self.retry.retry_on):
+            # Gli errori di utilizzo (ValueError, ...) non indicano un guasto del dispositivo
+            self.breaker.record_failure()
+
+    def _call(self, action: str, arguments: Optional[Dict[str, Any]]) -> Any:
+        send = self.transport.send if self.transport is not None else send_to_fryer
+        args = (action,) if arguments is None else (action, arguments)
+        timeout = self.timeouts.get(action)
+        if timeout is None:
+            return send(*args)
+        outcome: List[Tuple[bool, Any]] = []
+
+        def run() -> None:
+            try:
+                outcome.append((True, send(*args)))
+            except BaseException as e:
+                outcome.append((False, e))
+
+        worker = threading.Thread(target=run, name=f"fryer-command-{action}", daemon=True)
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            with self._lock:
+                self._abandoned = [t for t in self._abandoned if t.is_alive()] + [worker]
+            raise CommandTimeout(f"Nessuna risposta a '{action}' entro {timeout:g} s", worker)
+        succeeded, value = outcome[0]
+        if not succeeded:
+            raise value
+        return value
+
+    @staticmethod
+    def _still_running(error: BaseException) -> bool:
+        """Indica se l'errore è un timeout il cui tentativo è ancora in corso."""
+        return isinstance(error, CommandTimeout) and error.worker is not None and error.worker.is_alive()
+
+    @property
+    def abandoned(self) -> int:
+        """Comandi scaduti ancora in attesa di una risposta dal dispositivo."""
+        with self._lock:
+            return sum(1 for worker in self._abandoned if worker.is_alive())
+
+    def send(self, action: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        """Invia un comando, ripetendolo se fallisce ed è idempotente."""
+        self._check_breaker(action)
+        attempt = 1
+        while True:
+            try:
+                result = self._call(action, arguments)
+            except Exception as e:
+                retry = self.retry.should_retry(action, e, attempt)
+                if retry:
+                    self.sleep(self.retry.delay(attempt))
+                    # Il nuovo tentativo non deve sovrapporsi a quello scaduto ancora in corso
+                    retry = not self._still_running(e)
+                if not retry:
+                    self._count("failures")
+                    self._finish(e)
+                    raise
+                self._count("retries")
+                attempt += 1
+                continue
+            self._finish(None)
+            return result
+
+    async def _call_async(self, action: str, arguments: Optional[Dict[str, Any]]) -> Any:
+        send = self.transport.send_async if self.transport is not None else async_send_to_fryer
+        args = (action,) if arguments is None else (action, arguments)
+        timeout = self.timeouts.get(action)
+        if timeout is None:
+            return await send(*args)
+        try:
+            return await asyncio.wait_for(send(*args), timeout)
+        except asyncio.TimeoutError:
+            raise CommandTimeout(f"Nessuna risposta a '{action}' entro {timeout:g} s") from None
+
+    async def send_async(self, action: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        """Variante asincrona di send: le attese tra i tentativi non bloccano l'event loop."""
+        self._check_breaker(action)
+        attempt = 1
+        while True:
+            try:
+                result = await self._call_async(action, arguments)
+            except Exception as e:
+                if not self.retry.should_retry(action, e, attempt):
+                    self._count("failures")
+                    self._finish(e)
+                    raise
+                self._count("retries")
+                await asyncio.sleep(self.retry.delay(attempt))
+                attempt += 1
+                continue
+            self._finish(None)
+            return result
+
+    @property
+    def available(self) -> bool:
+        """Indica se la friggitrice può ricevere comandi (circuito non aperto)."""
+        return self.breaker is None or self.breaker.state != CircuitBreaker.OPEN
+
+    def close(self) -> None:
+        """Chiude il trasporto sottostante; i comandi scaduti ancora in corso vengono abbandonati."""
+        if self.transport is not None:
+            self.transport.close()
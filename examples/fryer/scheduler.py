@@ -0,0 +1,198 @@
+"""Scheduler per la frittura in batch su un banco di friggitrici"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+
+from events import Error
+from main import MAX_LOAD_KG, AsyncFrenchFryFryer, FrenchFryFryer
+from resilience import CircuitOpenError
+
+
+class Order(NamedTuple):
+    """Ordine di patatine da friggere."""
+    order_id: str
+    quantity: float              # Quantità in kg
+    cooking_time: float = 180.0  # Tempo di frittura in secondi
+
+
+class Batch(NamedTuple):
+    """Porzione di un ordine che entra in un solo cestello."""
+    order_id: str
+    quantity: float
+    cooking_time: float
+
+
+class SchedulerReport:
+    """Risultato di un'esecuzione dello scheduler."""
+
+    def __init__(self):
+        """Inizializza un report vuoto."""
+        self.fries: Dict[str, List[str]] = {}     # Patatine per ordine
+        self.errors: Dict[str, List[Exception]] = {}  # Errori per ordine
+        self.batches_per_fryer: Dict[int, int] = {}
+        self.out_of_rotation: List[int] = []  # Friggitrici escluse dal circuit breaker
+        self.cooked_kg = 0.0
+        self.elapsed = 0.0  # Secondi
+
+    @property
+    def kg_per_hour(self) -> float:
+        """Throughput in kg di patatine fritte all'ora."""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.cooked_kg / (self.elapsed / 3600)
+
+
+def split_order(order: Order, max_batch: float = MAX_LOAD_KG) -> List[Batch]:
+    """Divide un ordine in batch che non superano la capienza del cestello."""
+    if order.quantity <= 0:
+        raise ValueError("La quantità dell'ordine deve essere maggiore di zero")
+    batches = []
+    remaining = order.quantity
+    while remaining > 1e-9:
+        quantity = min(remaining, max_batch)
+        batches.append(Batch(order.order_id, quantity, order.cooking_time))
+        remaining -= quantity
+    return batches
+
+
+class _BatchQueue:
+    """Coda dei batch che tiene conto anche di quelli in lavorazione.
+
+    get attende finché c'è un batch da prelevare e restituisce None solo
+    quando la coda è vuota e nessun batch è in lavorazione: un batch in corso
+    potrebbe ancora tornare in coda se la sua friggitrice esce dalla rotazione.
+    """
+
+    def __init__(self, batches: List[Batch]):
+        self._batches: Deque[Batch] = deque(batches)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def get(self) -> Optional[Batch]:
+        """Preleva un batch, o None se non resta più lavoro."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._batches or not self._in_flight)
+            if not self._batches:
+                return None
+            self._in_flight += 1
+            return self._batches.popleft()
+
+    def done(self, batch: Batch, requeue: bool = False) -> None:
+        """Segna il batch come concluso, oppure lo rimette in coda per un'altra friggitrice."""
+        with self._cond:
+            self._in_flight -= 1
+            if requeue:
+                self._batches.append(batch)
+            self._cond.notify_all()
+
+    def leftovers(self) -> List[Batch]:
+        """Batch rimasti in coda."""
+        with self._cond:
+            return list(self._batches)
+
+
+class BatchScheduler:
+    """Distribuisce gli ordini su più friggitrici lavorando in pipeline.
+
+    Ogni friggitrice ha un proprio thread che preleva i batch da una coda
+    condivisa: mentre una frigge, un'altra può caricare. L'olio resta caldo
+    tra un batch e il successivo e le friggitrici vengono spente solo alla
+    fine della coda. Una friggitrice il cui trasporto ha il circuit breaker
+    aperto (vedi resilience.CommandPipeline) esce dalla rotazione e il suo
+    batch torna in coda per le altre, che restano attive finché ci sono
+    batch in lavorazione.
+    """
+
+    def __init__(self, fryers: List[FrenchFryFryer], clock: Callable[[], float] = time.monotonic):
+        """Inizializza lo scheduler con le friggitrici disponibili."""
+        if not fryers:
+            raise ValueError("Serve almeno una friggitrice")
+        for fryer in fryers:
+            # I metodi di AsyncFrenchFryFryer sono coroutine: chiamati dai thread non verrebbero mai eseguiti
+            if isinstance(fryer, AsyncFrenchFryFryer):
+                raise TypeError(f"La friggitrice {fryer.fryer_id} è asincrona: usare cook_many")
+        self.fryers = list(fryers)
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def run(self, orders: List[Order]) -> SchedulerReport:
+        """Frigge tutti gli ordini e restituisce il report."""
+        batches = _BatchQueue([batch for order in orders for batch in split_order(order)])
+
+        report = SchedulerReport()
+        for order in orders:
+            report.fries[order.order_id] = []
+        start = self.clock()
+
+        workers = [threading.Thread(target=self._work, args=(fryer, batches, report))
+                   for fryer in self.fryers]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # Batch rimasti senza friggitrici disponibili
+        for batch in batches.leftovers():
+            report.errors.setdefault(batch.order_id, []).append(
+                CircuitOpenError("Nessuna friggitrice disponibile per il batch"))
+
+        report.elapsed = self.clock() - start
+        return report
+
+    def _work(self, fryer: FrenchFryFryer, batches: _BatchQueue, report: SchedulerReport) -> None:
+        """Ciclo di lavoro di una friggitrice: un batch dopo l'altro."""
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                requeue = False
+                try:
+                    fries = self._cook_batch(fryer, batch)
+                except Exception as e:
+                    fryer.event_log.emit(Error, fryer_id=fryer.fryer_id, message=str(e))
+                    self._shutdown(fryer)
+                    if not self._available(fryer):
+                        requeue = True
+                        with self._lock:
+                            report.out_of_rotation.append(fryer.fryer_id)
+                        return
+                    with self._lock:
+                        report.errors.setdefault(batch.order_id, []).append(e)
+                    continue
+                finally:
+                    batches.done(batch, requeue)
+                with self._lock:
+                    report.fries[batch.order_id].extend(fries)
+                    report.cooked_kg += batch.quantity
+                    report.batches_per_fryer[fryer.fryer_id] = report.batches_per_fryer.get(fryer.fryer_id, 0) + 1
+        finally:
+            # Spegne la friggitrice solo quando non resta più lavoro
+            self._shutdown(fryer)
+
+    @staticmethod
+    def _available(fryer: FrenchFryFryer) -> bool:
+        """Indica se la friggitrice può restare in rotazione."""
+        return getattr(fryer.transport, "available", True)
+
+    @staticmethod
+    def _shutdown(fryer: FrenchFryFryer) -> None:
+        """Spegne la friggitrice; se è irraggiungibile registra l'errore invece di sollevarlo."""
+        try:
+            fryer.shutdown()
+        except Exception as e:
+            fryer.event_log.emit(Error, fryer_id=fryer.fryer_id, message=str(e))
+
+    def _cook_batch(self, fryer: FrenchFryFryer, batch: Batch) -> List[str]:
+        """Frigge un singolo batch, riscaldando l'olio solo se è spento."""
+        if not fryer.is_heating:
+            fryer.heat_oil()
+        fryer.load_potatoes(batch.quantity)
+        try:
+            fryer.fry(batch.cooking_time)
+        finally:
+            # Il cestello va sempre svuotato, anche se la frittura fallisce
+            fries = fryer.remove_fries()
+        return fries
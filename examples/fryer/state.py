@@ -0,0 +1,54 @@
+"""Stati della friggitrice e istantanee pubblicate per il monitoraggio"""
+
+from enum import Enum
+from typing import Dict, FrozenSet, NamedTuple, Optional
+
+
+class FryerState(Enum):
+    """Fase del ciclo di frittura."""
+    IDLE = "idle"          # Riscaldamento spento, cestello vuoto
+    HEATING = "heating"    # Olio in riscaldamento
+    READY = "ready"        # Olio alla temperatura target, cestello vuoto
+    LOADED = "loaded"      # Patatine nel cestello, in attesa di friggere
+    FRYING = "frying"      # Frittura in corso
+    DONE = "done"          # Patatine fritte, ancora nel cestello
+
+
+# Transizioni ammesse (oltre a restare nello stesso stato)
+TRANSITIONS: Dict[FryerState, FrozenSet[FryerState]] = {
+    FryerState.IDLE: frozenset({FryerState.HEATING, FryerState.LOADED}),
+    FryerState.HEATING: frozenset({FryerState.READY, FryerState.LOADED, FryerState.IDLE}),
+    FryerState.READY: frozenset({FryerState.LOADED, FryerState.HEATING, FryerState.IDLE}),
+    FryerState.LOADED: frozenset({FryerState.FRYING, FryerState.READY, FryerState.IDLE}),
+    FryerState.FRYING: frozenset({FryerState.DONE, FryerState.LOADED}),
+    FryerState.DONE: frozenset({FryerState.READY, FryerState.IDLE}),
+}
+
+
+class FryerSnapshot(NamedTuple):
+    """Istantanea immutabile dello stato di una friggitrice.
+
+    Viene sostituita per intero a ogni cambiamento, quindi chi la legge da un
+    altro thread vede sempre valori coerenti tra loro senza prendere lock.
+    """
+    fryer_id: int
+    state: FryerState = FryerState.IDLE
+    heater_on: bool = False
+    potatoes_loaded: bool = False
+    temperature: Optional[float] = None  # Ultima temperatura letta
+    version: int = 0                     # Incrementata a ogni pubblicazione
+
+
+def check_transition(current: FryerState, new: FryerState) -> None:
+    """Solleva RuntimeError se la transizione non è ammessa."""
+    if new is not current and new not in TRANSITIONS[current]:
+        raise RuntimeError(f"Transizione non valida: {current.value} -> {new.value}")
+
+
+def state_for(heater_on: bool, potatoes_loaded: bool, current: FryerState) -> FryerState:
+    """Stato coerente con i flag indicati, partendo da quello attuale."""
+    if potatoes_loaded:
+        return current if current in (FryerState.LOADED, FryerState.FRYING, FryerState.DONE) else FryerState.LOADED
+    if heater_on:
+        return current if current in (FryerState.HEATING, FryerState.READY) else FryerState.HEATING
+    return FryerState.IDLE
@@ -3,8 +3,10 @@
 import unittest
 from unittest.mock import patch
 import time
-from fryer import send_to_fryer
+from fryer import SimulatedFryer, send_to_fryer
 from main import FrenchFryFryer
+from parallel import _run_cycle, run_parallel
+from polling import AdaptivePolling
 
 
 class TestFryerIntegration(unittest.TestCase):
@@ -141,5 +143,91 @@ class TestEndToEndFrying(unittest.TestCase):
         self.assertEqual(mock_send.call_args[0][1], {"action": "stop"})
 
 
+class TestSimulatedFrying(unittest.TestCase):
+    """
+    Test di integrazione che usano la friggitrice simulata al posto
+    delle patch su time.sleep e random.uniform.
+    """
+    
+    def test_complete_cycle_on_virtual_time(self):
+        """
+        Un ciclo completo con 180 secondi di frittura avanza l'orologio
+        virtuale senza attese reali.
+        """
+        sim = SimulatedFryer(seed=1)
+        fryer = FrenchFryFryer(target_temp=180.0, transport=sim,
+                               polling=AdaptivePolling(deadline=600.0))
+        
+        start = time.perf_counter()
+        fries = fryer.cook_french_fries(quantity=2.0, cooking_time=180.0)
+        
+        self.assertEqual(len(fries), 10)
+        self.assertGreaterEqual(sim.now(), 180.0)
+        self.assertFalse(sim.heater_on)
+        self.assertLess(time.perf_counter() - start, 1.0)
+    
+    def test_cold_oil_times_out_with_fixed_polling(self):
+        """
+        Partendo da olio freddo, 6 tentativi da 5 secondi non bastano
+        per raggiungere la temperatura target.
+        """
+        sim = SimulatedFryer(seed=1)
+        fryer = FrenchFryFryer(target_temp=180.0, transport=sim)
+        
+        with self.assertRaises(TimeoutError):
+            fryer.cook_french_fries(quantity=1.0, cooking_time=180.0)
+        
+        self.assertFalse(sim.heater_on)
+        self.assertEqual(sim.now(), 30.0)
+    
+    def test_many_simulated_cycles(self):
+        """
+        Molti cicli simulati con seed diversi vengono completati tutti.
+        """
+        for seed in range(200):
+            sim = SimulatedFryer(seed=seed, initial_temp=175.0)
+            fryer = FrenchFryFryer(transport=sim)
+            self.assertEqual(len(fryer.cook_french_fries(quantity=1.0, cooking_time=180.0)), 10)
+
+
+class TestParallelCycles(unittest.TestCase):
+    """
+    Test di integrazione per l'esecuzione dei cicli simulati su più processi.
+    """
+    
+    def test_results_independent_of_worker_count(self):
+        """
+        Gli stessi seed danno gli stessi risultati con uno o più processi.
+        """
+        single = run_parallel(range(40), workers=1, trace_length=16)
+        multi = run_parallel(range(40), workers=3, trace_length=16)
+        
+        self.assertEqual(single.completed, 40)
+        for name in ("seed", "ok", "virtual_seconds", "reads", "max_temperature", "samples"):
+            self.assertEqual(single.metric(name), multi.metric(name), name)
+        self.assertEqual(single.trace(39), multi.trace(39))
+    
+    def test_traces_match_in_process_cycle(self):
+        """
+        La traccia letta dalla memoria condivisa coincide con quella del ciclo
+        eseguito nel processo corrente.
+        """
+        report = run_parallel([7, 8], workers=2, initial_temp=175.0, trace_length=8)
+        ok, virtual_seconds, reads, timestamps, temperatures = _run_cycle(8, 1.0, 180.0, 175.0, 8)
+        
+        self.assertTrue(ok)
+        self.assertEqual(report.trace(1), (timestamps, temperatures))
+        self.assertEqual(report.metric("reads")[1], reads)
+        self.assertEqual(report.summary()["failed"], 0)
+    
+    def test_failed_cycles_counted(self):
+        """
+        Una quantità non valida fa fallire i cicli senza interrompere gli altri processi.
+        """
+        report = run_parallel(range(4), workers=2, quantity=5.0)
+        
+        self.assertEqual((report.completed, report.failed), (0, 4))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,8 +1,29 @@
 """Test unitari."""
 
 import unittest
-from unittest.mock import patch, call
-from main import FrenchFryFryer
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch, call
+from benchmark import compare, run_benchmarks
+from events import (Error, EventLog, FryCompleted, HeatStarted, JsonLinesSink, MemorySink,
+                    Shutdown, TemperatureRead)
+from fryer import FryerConnection, SimulatedFryer
+from array import array
+from main import AsyncFrenchFryFryer, FrenchFryFryer, FryerBank, cook_many
+from metrics import Histogram, MetricsRegistry
+from polling import AdaptivePolling, FixedPolling
+from resilience import CircuitBreaker, CircuitOpenError, CommandPipeline, CommandTimeout, RetryPolicy
+from scheduler import BatchScheduler, Order, split_order
+from state import FryerState
+from testrunner import DependencyRecorder, module_hashes, select_tests, shard, source_files
+from timeseries import TemperatureSeries, TimeSeriesStore
 
 class TestFrenchFryFryer(unittest.TestCase):
     """Test per la classe FrenchFryFryer."""
@@ -237,6 +258,1080 @@ class TestFrenchFryFryer(unittest.TestCase):
             mock_shutdown.assert_called_once()
             # If this doesn't work with current implementation, you'd need to change the implementation
 
+    @patch('main.send_to_fryer')
+    def test_injected_transport(self, mock_send):
+        """Verifica che, con un trasporto iniettato, i comandi passino dalla connessione."""
+        # Setup
+        transport = MagicMock()
+        transport.send.return_value = 175.5
+        fryer = FrenchFryFryer(transport=transport)
+        
+        # Esecuzione
+        result = fryer.check_temperature()
+        
+        # Verifiche
+        transport.send.assert_called_once_with("read_temperature")
+        mock_send.assert_not_called()
+        self.assertEqual(result, 175.5)
+
+
+class TestTemperatureCache(unittest.TestCase):
+    """Test per la cache della temperatura."""
+    
+    @patch('main.send_to_fryer')
+    def test_cache_hit_within_ttl(self, mock_send):
+        """Verifica che le letture ravvicinate vengano servite dalla cache."""
+        mock_send.return_value = 175.5
+        fryer = FrenchFryFryer(temperature_ttl=60.0)
+        
+        self.assertEqual(fryer.check_temperature(), 175.5)
+        self.assertEqual(fryer.check_temperature(), 175.5)
+        
+        mock_send.assert_called_once_with("read_temperature")
+        self.assertEqual((fryer.cache_hits, fryer.cache_misses), (1, 1))
+    
+    @patch('main.send_to_fryer')
+    def test_cache_expires(self, mock_send):
+        """Verifica che una lettura scaduta venga ripetuta."""
+        mock_send.return_value = 175.5
+        clock = MagicMock(side_effect=[0.0, 0.5, 2.0, 2.0])
+        fryer = FrenchFryFryer(temperature_ttl=1.0, clock=clock)
+        
+        fryer.check_temperature()
+        fryer.check_temperature()
+        fryer.check_temperature()
+        
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertEqual((fryer.cache_hits, fryer.cache_misses), (1, 2))
+    
+    @patch('main.send_to_fryer')
+    def test_heat_command_invalidates(self, mock_send):
+        """Verifica che un comando heat invalidi la cache."""
+        mock_send.return_value = 175.5
+        fryer = FrenchFryFryer(temperature_ttl=60.0)
+        
+        fryer.check_temperature()
+        fryer.is_heating = True
+        fryer.shutdown()
+        fryer.check_temperature()
+        
+        reads = [c for c in mock_send.call_args_list if c[0][0] == "read_temperature"]
+        self.assertEqual(len(reads), 2)
+    
+    @patch('main.send_to_fryer')
+    def test_load_command_invalidates(self, mock_send):
+        """Verifica che fry rilegga la temperatura dopo il carico delle patatine."""
+        mock_send.side_effect = lambda action, args=None: 185.0 if action == "read_temperature" else None
+        fryer = FrenchFryFryer(temperature_ttl=60.0)
+        
+        fryer.heat_oil()
+        fryer.check_temperature()
+        fryer.load_potatoes(1.0)
+        fryer.fry(1.0)
+        
+        reads = [c for c in mock_send.call_args_list if c[0][0] == "read_temperature"]
+        self.assertEqual(len(reads), 2)
+        self.assertEqual(fryer.cache_hits, 1)
+    
+    def test_cold_load_refused_with_ttl(self):
+        """Verifica che il calo di temperatura dovuto al carico blocchi la frittura anche con la cache."""
+        for ttl in (0.0, 5.0):
+            with self.subTest(ttl=ttl):
+                sim = SimulatedFryer(initial_temp=185.0, load_drop=15.0, noise=0.0)
+                fryer = FrenchFryFryer(transport=sim, temperature_ttl=ttl, clock=sim.now,
+                                       event_log=EventLog())
+                fryer.heat_oil()
+                fryer.load_potatoes(2.0)
+                
+                with self.assertRaisesRegex(RuntimeError, "Temperatura troppo bassa: 155.0"):
+                    fryer.fry(1.0)
+    
+    def test_ttl_uses_injected_clock(self):
+        """Verifica che la validità della cache segua l'orologio virtuale del simulatore."""
+        sim = SimulatedFryer(initial_temp=185.0, noise=0.0)
+        fryer = FrenchFryFryer(transport=sim, temperature_ttl=5.0, clock=sim.now, event_log=EventLog())
+        
+        fryer.check_temperature()
+        sim.advance(4.0)
+        fryer.check_temperature()
+        sim.advance(2.0)
+        fryer.check_temperature()
+        
+        self.assertEqual((fryer.cache_hits, fryer.cache_misses), (1, 2))
+
+
+class TestMetrics(unittest.TestCase):
+    """Test per il registro delle metriche."""
+    
+    def test_histogram_buckets(self):
+        """Verifica che i bucket cumulativi contino correttamente."""
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.observe(value)
+        
+        self.assertEqual(histogram.cumulative(), [("0.1", 1), ("1", 3), ("+Inf", 4)])
+        self.assertAlmostEqual(histogram.sum, 6.25)
+    
+    @patch('main.send_to_fryer')
+    def test_fryer_records_actions_and_phases(self, mock_send):
+        """Verifica che la friggitrice registri latenze dei comandi e durate delle fasi."""
+        mock_send.side_effect = lambda action, args=None: 185.0 if action == "read_temperature" else None
+        registry = MetricsRegistry()
+        fryer = FrenchFryFryer(metrics=registry, fryer_id=7)
+        
+        fryer.cook_french_fries(quantity=1.0, cooking_time=1.0)
+        
+        self.assertEqual(registry.get("fryer_command_duration_seconds", action="read_temperature", fryer_id=7).count, 2)
+        self.assertEqual(registry.get("fryer_command_duration_seconds", action="heat", fryer_id=7).count, 2)
+        for phase in ("heat_oil", "load_potatoes", "fry", "remove_fries", "cook_french_fries"):
+            self.assertEqual(registry.get("fryer_phase_duration_seconds", phase=phase, fryer_id=7).count, 1)
+    
+    def test_prometheus_format(self):
+        """Verifica l'esportazione nel formato testuale di Prometheus."""
+        registry = MetricsRegistry(buckets=(1.0,))
+        registry.observe_action("sleep", 0.5, fryer_id=1)
+        
+        text = registry.to_prometheus()
+        
+        self.assertIn("# TYPE fryer_command_duration_seconds histogram", text)
+        self.assertIn('fryer_command_duration_seconds_bucket{action="sleep",fryer_id="1",le="1"} 1', text)
+        self.assertIn('fryer_command_duration_seconds_count{action="sleep",fryer_id="1"} 1', text)
+    
+    def test_dump_json(self):
+        """Verifica il salvataggio delle metriche in JSON su file."""
+        registry = MetricsRegistry()
+        registry.observe_phase("fry", 3.0)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.json")
+            registry.dump(path, fmt="json")
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        
+        entry = data["fryer_phase_duration_seconds"][0]
+        self.assertEqual(entry["labels"], {"phase": "fry"})
+        self.assertEqual(entry["count"], 1)
+
+
+class TestEventLog(unittest.TestCase):
+    """Test per il log strutturato degli eventi."""
+    
+    def setUp(self):
+        """Crea un log con un sink in memoria."""
+        self.log = EventLog()
+        self.sink = MemorySink()
+        self.log.add_sink(self.sink)
+    
+    def tearDown(self):
+        self.log.close()
+    
+    @patch('main.send_to_fryer')
+    def test_cook_cycle_events(self, mock_send):
+        """Verifica gli eventi emessi durante un ciclo completo."""
+        mock_send.side_effect = lambda action, args=None: 185.0 if action == "read_temperature" else None
+        fryer = FrenchFryFryer(fryer_id=3, event_log=self.log)
+        
+        fryer.cook_french_fries(quantity=1.0, cooking_time=2.0)
+        self.assertTrue(self.log.flush(timeout=5))
+        
+        kinds = [type(event).__name__ for event in self.sink.events]
+        self.assertEqual(kinds[0], "HeatStarted")
+        self.assertIn("FryCompleted", kinds)
+        self.assertEqual(kinds[-1], "FriesRemoved")
+        self.assertEqual(self.sink.of_type(TemperatureRead)[0].temperature, 185.0)
+        self.assertEqual(self.sink.of_type(FryCompleted)[0].frying_time, 2.0)
+        self.assertTrue(all(event.fryer_id == 3 for event in self.sink.events))
+    
+    @patch('main.send_to_fryer')
+    def test_error_event(self, mock_send):
+        """Verifica che un errore nel ciclo emetta un evento Error."""
+        mock_send.side_effect = lambda action, args=None: 185.0 if action == "read_temperature" else None
+        fryer = FrenchFryFryer(event_log=self.log)
+        
+        with self.assertRaises(ValueError):
+            fryer.cook_french_fries(quantity=5.0, cooking_time=2.0)
+        self.log.flush(timeout=5)
+        
+        self.assertIn("2 kg", self.sink.of_type(Error)[0].message)
+        self.assertEqual(len(self.sink.of_type(Shutdown)), 1)
+    
+    def test_emit_without_sinks(self):
+        """Verifica che senza sink l'emissione non costruisca eventi né thread."""
+        log = EventLog()
+        
+        with patch.object(HeatStarted, '__init__') as mock_init:
+            log.emit(HeatStarted, fryer_id=1)
+        
+        mock_init.assert_not_called()
+        self.assertFalse(log.enabled)
+        self.assertIsNone(log._writer)
+    
+    def test_json_lines_sink(self):
+        """Verifica che il sink JSON scriva un oggetto per riga."""
+        stream = io.StringIO()
+        self.log.add_sink(JsonLinesSink(stream))
+        
+        self.log.emit(TemperatureRead, fryer_id=1, temperature=150.0)
+        self.log.flush(timeout=5)
+        
+        record = json.loads(stream.getvalue().splitlines()[0])
+        self.assertEqual(record["event"], "TemperatureRead")
+        self.assertEqual(record["temperature"], 150.0)
+
+
+class TestFryerConnection(unittest.TestCase):
+    """Test per la classe FryerConnection."""
+    
+    def test_send_requires_open_connection(self):
+        """Verifica che non si possano inviare comandi a connessione chiusa."""
+        connection = FryerConnection()
+        
+        with self.assertRaises(RuntimeError):
+            connection.send("read_temperature")
+    
+    @patch('time.sleep')
+    def test_context_manager(self, mock_sleep):
+        """Verifica che il context manager apra e chiuda la connessione."""
+        with FryerConnection() as connection:
+            self.assertTrue(connection.is_open)
+            connection.send("sleep", {"seconds": 1})
+        
+        mock_sleep.assert_called_once_with(1)
+        self.assertFalse(connection.is_open)
+    
+    def test_unsupported_action(self):
+        """Verifica che un'azione sconosciuta sollevi ValueError."""
+        with FryerConnection() as connection:
+            with self.assertRaises(ValueError):
+                connection.send("explode")
+
+
+class TestPolling(unittest.TestCase):
+    """Test per le strategie di polling."""
+    
+    def heating_device(self, start=100.0, rate=2.0):
+        """Simula un olio che si scalda linearmente durante gli sleep."""
+        state = {"temp": start, "reads": 0}
+        
+        def device(action, args=None):
+            if action == "read_temperature":
+                state["reads"] += 1
+                return state["temp"]
+            if action == "sleep":
+                state["temp"] += rate * args["seconds"]
+            return None
+        return device, state
+    
+    def test_fixed_polling_limit(self):
+        """Verifica che la strategia fissa si arrenda dopo max_attempts."""
+        polling = FixedPolling(interval=5, max_attempts=2)
+        
+        self.assertEqual(polling.next_interval(100.0, 180.0), 5)
+        self.assertEqual(polling.next_interval(100.0, 180.0), 5)
+        self.assertIsNone(polling.next_interval(100.0, 180.0))
+    
+    def test_adaptive_interval_is_bounded(self):
+        """Verifica che l'intervallo stimato resti tra i limiti configurati."""
+        polling = AdaptivePolling(min_interval=1.0, max_interval=10.0, deadline=100.0)
+        
+        polling.next_interval(100.0, 180.0)
+        # 1°C/s con 79°C mancanti: la stima (79 s) viene limitata a 10 s
+        self.assertEqual(polling.next_interval(105.0, 180.0), 10.0)
+        # Quasi al target: la stima viene alzata a min_interval
+        self.assertEqual(polling.next_interval(179.9, 180.0), 1.0)
+    
+    @patch('main.send_to_fryer')
+    def test_adaptive_heat_oil_fewer_reads(self, mock_send):
+        """Verifica che il polling adattivo raggiunga il target con meno letture."""
+        device, state = self.heating_device()
+        mock_send.side_effect = device
+        fryer = FrenchFryFryer(target_temp=180.0)
+        
+        result = fryer.heat_oil(polling=AdaptivePolling(min_interval=0.5, max_interval=60.0))
+        
+        self.assertTrue(result)
+        # Con attese fisse di 5 s servirebbero 9 letture
+        self.assertLessEqual(state["reads"], 4)
+    
+    @patch('main.send_to_fryer')
+    def test_adaptive_deadline(self, mock_send):
+        """Verifica che superata la deadline venga sollevato TimeoutError."""
+        device, state = self.heating_device(rate=0.0)
+        mock_send.side_effect = device
+        fryer = FrenchFryFryer(target_temp=180.0)
+        
+        with self.assertRaises(TimeoutError) as context:
+            fryer.heat_oil(polling=AdaptivePolling(deadline=30.0))
+        
+        self.assertIn("entro 30.0 secondi", str(context.exception))
+        self.assertFalse(fryer.is_heating)
+    
+    def test_adaptive_deadline_counts_slow_reads(self):
+        """Verifica che anche il tempo delle letture conti per la deadline."""
+        class SlowReadFryer(SimulatedFryer):
+            def _read_temperature(self, arguments):
+                self.advance(4.0)  # Ogni lettura impiega 4 s di tempo virtuale
+                return super()._read_temperature(arguments)
+        
+        sim = SlowReadFryer(heating_rate=0.0, noise=0.0)
+        fryer = FrenchFryFryer(transport=sim, event_log=EventLog())
+        
+        with self.assertRaises(TimeoutError):
+            fryer.heat_oil(polling=AdaptivePolling(min_interval=1.0, max_interval=1.0, deadline=30.0,
+                                                   clock=sim.now))
+        
+        # Con le sole attese richieste sarebbero servite 30 letture
+        self.assertLess(sim.now(), 30.0 + 4.0 + 1.0)
+
+
+class TestBatchScheduler(unittest.TestCase):
+    """Test per lo scheduler dei batch."""
+    
+    def test_split_order(self):
+        """Verifica che gli ordini oltre la capienza vengano divisi in più batch."""
+        batches = split_order(Order("A", 5.0, 60.0))
+        
+        self.assertEqual([batch.quantity for batch in batches], [2.0, 2.0, 1.0])
+        self.assertTrue(all(batch.order_id == "A" for batch in batches))
+    
+    def test_split_order_invalid(self):
+        """Verifica che un ordine vuoto sollevi ValueError."""
+        with self.assertRaises(ValueError):
+            split_order(Order("A", 0.0))
+    
+    def test_rejects_async_fryers(self):
+        """Verifica che le friggitrici asincrone non vengano accettate dallo scheduler a thread."""
+        fryers = [FrenchFryFryer(fryer_id=0), AsyncFrenchFryFryer(fryer_id=1, transport=SimulatedFryer())]
+        
+        with self.assertRaisesRegex(TypeError, "friggitrice 1"):
+            BatchScheduler(fryers)
+    
+    @patch('main.send_to_fryer')
+    def test_run_keeps_oil_hot(self, mock_send):
+        """Verifica che l'olio venga riscaldato una sola volta per friggitrice."""
+        mock_send.side_effect = lambda action, args=None: 185.0 if action == "read_temperature" else None
+        fryers = [FrenchFryFryer(fryer_id=i) for i in range(2)]
+        scheduler = BatchScheduler(fryers)
+        
+        report = scheduler.run([Order("A", 5.0, 1.0), Order("B", 1.5, 1.0)])
+        
+        self.assertAlmostEqual(report.cooked_kg, 6.5)
+        self.assertEqual(len(report.fries["A"]), 30)
+        self.assertEqual(len(report.fries["B"]), 10)
+        self.assertEqual(sum(report.batches_per_fryer.values()), 4)
+        heat_starts = [c for c in mock_send.call_args_list if c[0] == ("heat", {"action": "start"})]
+        self.assertLessEqual(len(heat_starts), 2)
+        self.assertFalse(any(fryer.is_heating for fryer in fryers))
+    
+    @patch('main.send_to_fryer')
+    def test_run_records_errors(self, mock_send):
+        """Verifica che un batch fallito venga registrato senza fermare gli altri."""
+        temps = iter([185.0, 185.0, 100.0])
+        mock_send.side_effect = lambda action, args=None: next(temps, 185.0) if action == "read_temperature" else None
+        scheduler = BatchScheduler([FrenchFryFryer()])
+        
+        report = scheduler.run([Order("A", 4.0, 1.0)])
+        
+        self.assertEqual(len(report.errors["A"]), 1)
+        self.assertEqual(len(report.fries["A"]), 10)
+        self.assertAlmostEqual(report.cooked_kg, 2.0)
+    
+    def test_kg_per_hour(self):
+        """Verifica il calcolo del throughput."""
+        clock = iter([0.0, 1800.0])
+        with patch('main.send_to_fryer', side_effect=lambda action, args=None: 185.0 if action == "read_temperature" else None):
+            report = BatchScheduler([FrenchFryFryer()], clock=lambda: next(clock)).run([Order("A", 1.0, 1.0)])
+        
+        self.assertAlmostEqual(report.kg_per_hour, 2.0)
+
+
+class TestFryerBank(unittest.TestCase):
+    """Test per la classe FryerBank."""
+    
+    def setUp(self):
+        """Crea un banco di tre friggitrici."""
+        self.bank = FryerBank([FrenchFryFryer(fryer_id=i, target_temp=180.0) for i in range(3)])
+    
+    @patch('main.send_to_fryer')
+    def test_poll_single_command(self, mock_send):
+        """Verifica che il poll invii un solo comando per tutto il banco."""
+        mock_send.return_value = array("d", [100.0, 170.0, 185.0])
+        
+        temps = self.bank.poll()
+        
+        mock_send.assert_called_once_with("read_temperatures", {"fryer_ids": [0, 1, 2]})
+        self.assertEqual(list(temps), [100.0, 170.0, 185.0])
+    
+    @patch('main.send_to_fryer')
+    def test_threshold_checks(self, mock_send):
+        """Verifica i controlli di soglia sull'intero banco."""
+        mock_send.return_value = array("d", [100.0, 170.0, 185.0])
+        self.bank.poll()
+        
+        self.assertEqual(self.bank.ready(), [2])
+        self.assertEqual(self.bank.below(0.9), [0])
+    
+    @patch('main.send_to_fryer')
+    def test_poll_wrong_length(self, mock_send):
+        """Verifica che una risposta incompleta sollevi un errore."""
+        mock_send.return_value = array("d", [100.0])
+        
+        with self.assertRaises(RuntimeError):
+            self.bank.poll()
+    
+    @patch('main.send_to_fryer')
+    def test_poll_updates_fryers(self, mock_send):
+        """Verifica che le letture del banco arrivino a cache e istantanea di ogni friggitrice."""
+        mock_send.return_value = array("d", [100.0, 170.0, 185.0])
+        for fryer in self.bank.fryers:
+            fryer.temperature_ttl = 60.0
+        
+        self.bank.poll()
+        
+        self.assertEqual([fryer.snapshot.temperature for fryer in self.bank.fryers], [100.0, 170.0, 185.0])
+        self.assertEqual(self.bank.fryers[2].check_temperature(), 185.0)
+        mock_send.assert_called_once()
+    
+    def test_poll_uses_fryer_transports(self):
+        """Verifica che friggitrici con un proprio trasporto vengano lette tramite quello."""
+        history = TimeSeriesStore()
+        fryers = [FrenchFryFryer(fryer_id=i, transport=SimulatedFryer(seed=i, initial_temp=185.0, noise=0.0),
+                                 history=history, event_log=EventLog()) for i in range(3)]
+        bank = FryerBank(fryers)
+        
+        temps = bank.poll()
+        
+        self.assertEqual(list(temps), [185.0, 185.0, 185.0])
+        self.assertEqual(bank.ready(), [0, 1, 2])
+        self.assertEqual([len(history.query(i)[1]) for i in range(3)], [1, 1, 1])
+
+
+class TestSimulatedFryer(unittest.TestCase):
+    """Test per il modello termico della friggitrice simulata."""
+    
+    def test_heating_and_virtual_clock(self):
+        """Verifica che lo sleep faccia avanzare solo l'orologio virtuale."""
+        sim = SimulatedFryer(heating_rate=2.0, noise=0.0)
+        
+        sim.send("heat", {"action": "start"})
+        sim.send("sleep", {"seconds": 10})
+        
+        self.assertEqual(sim.now(), 10)
+        self.assertAlmostEqual(sim.send("read_temperature"), 40.0)
+    
+    def test_thermostat_limit(self):
+        """Verifica che la temperatura non superi il limite del termostato."""
+        sim = SimulatedFryer(max_temp=190.0, noise=0.0)
+        
+        sim.send("heat", {"action": "start"})
+        sim.send("sleep", {"seconds": 3600})
+        
+        self.assertEqual(sim.send("read_temperature"), 190.0)
+    
+    def test_cooling_towards_ambient(self):
+        """Verifica che a riscaldamento spento l'olio si raffreddi verso l'ambiente."""
+        sim = SimulatedFryer(initial_temp=180.0, ambient=20.0, noise=0.0)
+        
+        sim.send("sleep", {"seconds": 600})
+        temp = sim.send("read_temperature")
+        
+        self.assertLess(temp, 180.0)
+        self.assertGreater(temp, 20.0)
+    
+    def test_load_drops_temperature(self):
+        """Verifica il calo di temperatura quando si caricano le patatine."""
+        sim = SimulatedFryer(initial_temp=180.0, load_drop=5.0, noise=0.0)
+        
+        sim.send("load", {"quantity": 2.0})
+        
+        self.assertEqual(sim.send("read_temperature"), 170.0)
+    
+    def test_seeded_readings_are_deterministic(self):
+        """Verifica che lo stesso seed produca le stesse letture."""
+        first = [SimulatedFryer(seed=42).send("read_temperature") for _ in range(2)]
+        
+        self.assertEqual(first[0], first[1])
+        self.assertNotEqual(first[0], SimulatedFryer(seed=43).send("read_temperature"))
+
+
+class TestFryerStateMachine(unittest.TestCase):
+    """Test per la macchina a stati e le istantanee della friggitrice."""
+    
+    def setUp(self):
+        self.sim = SimulatedFryer(seed=1, initial_temp=185.0)
+        self.fryer = FrenchFryFryer(transport=self.sim)
+    
+    def test_cycle_states(self):
+        """Verifica la sequenza di stati di un ciclo completo."""
+        states = [self.fryer.state]
+        self.fryer.heat_oil()
+        states.append(self.fryer.state)
+        self.fryer.load_potatoes(1.0)
+        states.append(self.fryer.state)
+        self.fryer.fry(180.0)
+        states.append(self.fryer.state)
+        self.fryer.remove_fries()
+        states.append(self.fryer.state)
+        self.fryer.shutdown()
+        states.append(self.fryer.state)
+        
+        self.assertEqual(states, [FryerState.IDLE, FryerState.READY, FryerState.LOADED, FryerState.DONE,
+                                  FryerState.READY, FryerState.IDLE])
+    
+    def test_invalid_transitions(self):
+        """Verifica che le operazioni fuori sequenza vengano rifiutate."""
+        self.fryer.heat_oil()
+        self.fryer.load_potatoes(1.0)
+        with self.assertRaises(RuntimeError):
+            self.fryer.load_potatoes(1.0)
+        self.fryer.fry(1.0)
+        with self.assertRaises(RuntimeError):
+            self.fryer.fry(1.0)
+        self.assertEqual(self.fryer.state, FryerState.DONE)
+    
+    def test_failed_fry_returns_to_loaded(self):
+        """Verifica che un errore durante la frittura lasci le patatine caricate."""
+        self.fryer.heat_oil()
+        self.fryer.load_potatoes(1.0)
+        self.sim.close()
+        
+        with self.assertRaises(RuntimeError):
+            self.fryer.fry(1.0)
+        
+        self.assertEqual(self.fryer.state, FryerState.LOADED)
+        self.assertEqual(len(self.fryer.remove_fries()), 10)
+    
+    def test_snapshot_is_immutable_and_versioned(self):
+        """Verifica che l'istantanea non cambi dopo essere stata letta."""
+        before = self.fryer.snapshot
+        self.fryer.heat_oil()
+        after = self.fryer.snapshot
+        
+        self.assertEqual(before.state, FryerState.IDLE)
+        self.assertIsNone(before.temperature)
+        self.assertTrue(after.heater_on)
+        self.assertGreater(after.version, before.version)
+        with self.assertRaises(AttributeError):
+            after.state = FryerState.IDLE
+    
+    def test_slots(self):
+        """Verifica che la friggitrice non abbia un __dict__."""
+        for fryer in (self.fryer, AsyncFrenchFryFryer()):
+            with self.assertRaises(AttributeError):
+                fryer.unknown = 1
+    
+    def test_concurrent_reader_sees_consistent_snapshots(self):
+        """Verifica che un thread di monitoraggio veda sempre istantanee coerenti."""
+        stop = threading.Event()
+        seen = []
+        
+        def monitor():
+            while not stop.is_set():
+                seen.append(self.fryer.snapshot)
+        
+        reader = threading.Thread(target=monitor)
+        reader.start()
+        try:
+            for _ in range(50):
+                self.fryer.cook_french_fries(quantity=1.0, cooking_time=10.0)
+        finally:
+            stop.set()
+            reader.join()
+        
+        loaded_states = {FryerState.LOADED, FryerState.FRYING, FryerState.DONE}
+        for snapshot in seen:
+            self.assertEqual(snapshot.potatoes_loaded, snapshot.state in loaded_states, snapshot)
+            if snapshot.state in (FryerState.HEATING, FryerState.READY, FryerState.FRYING):
+                self.assertTrue(snapshot.heater_on, snapshot)
+        versions = [snapshot.version for snapshot in seen]
+        self.assertEqual(versions, sorted(versions))
+
+
+class TestTimeSeries(unittest.TestCase):
+    """Test per lo storico delle temperature."""
+    
+    def test_ring_buffer_bounded(self):
+        """Verifica che la serie tenga solo le letture più recenti."""
+        series = TemperatureSeries(capacity=10)
+        for second in range(25):
+            series.append(float(second), 100.0 + second)
+        
+        timestamps, values = series.range()
+        
+        self.assertEqual(len(series), 10)
+        self.assertEqual(list(timestamps), [float(t) for t in range(15, 25)])
+        self.assertEqual(values[0], 115.0)
+        self.assertEqual(series.nbytes(), TemperatureSeries(capacity=10).nbytes())
+    
+    def test_range_query(self):
+        """Verifica la ricerca per finestra temporale [start, end)."""
+        series = TemperatureSeries(capacity=8)
+        for second in range(12):
+            series.append(float(second), float(second))
+        
+        self.assertEqual(list(series.range(6.0, 9.0)[0]), [6.0, 7.0, 8.0])
+        self.assertEqual(list(series.range(10.5)[1]), [11.0])
+        self.assertEqual(len(series.range(20.0)[0]), 0)
+    
+    def test_downsampling(self):
+        """Verifica l'aggregazione in bucket con minimo, massimo e media."""
+        series = TemperatureSeries(capacity=4, bucket_seconds=10.0, bucket_capacity=2)
+        for second, temp in [(1, 170.0), (5, 190.0), (9, 180.0), (12, 100.0), (25, 150.0)]:
+            series.append(float(second), temp)
+        
+        first, last = series.buckets()
+        
+        self.assertEqual((first.start, first.minimum, first.maximum, first.mean, first.count),
+                         (10.0, 100.0, 100.0, 100.0, 1))
+        self.assertEqual(last.start, 20.0)
+        self.assertEqual(series.buckets(start=0.0, end=10.0), [])
+    
+    def test_segment_persistence(self):
+        """Verifica che lo storico su file si ritrovi alla riapertura."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with TimeSeriesStore(tmp, capacity=16, bucket_seconds=5.0) as store:
+                for second in range(20):
+                    store.record(3, 150.0 + second, timestamp=float(second))
+            
+            with TimeSeriesStore(tmp) as reopened:
+                timestamps, values = reopened.query(3, start=10.0)
+                buckets = reopened.downsampled(3)
+                self.assertEqual(reopened.fryer_ids(), [3])
+                self.assertEqual(reopened.series(3).capacity, 16)
+            
+            with open(os.path.join(tmp, "broken.seg"), "wb") as f:
+                f.write(b"\0" * 64)
+            with self.assertRaises(ValueError):
+                TemperatureSeries(path=os.path.join(tmp, "broken.seg"))
+        
+        self.assertEqual(list(values), [160.0 + i for i in range(10)])
+        self.assertEqual([b.count for b in buckets], [5, 5, 5, 5])
+    
+    def test_fryer_records_history(self):
+        """Verifica che la friggitrice registri ogni lettura effettiva sull'orologio indicato."""
+        sim = SimulatedFryer(seed=1, initial_temp=150.0)
+        store = TimeSeriesStore(clock=sim.now)
+        fryer = FrenchFryFryer(transport=sim, fryer_id=7, temperature_ttl=60.0, history=store,
+                               polling=AdaptivePolling(deadline=600.0))
+        
+        fryer.heat_oil()
+        fryer.check_temperature()  # Servita dalla cache, non registrata
+        
+        timestamps, values = store.query(7)
+        self.assertEqual(len(values), fryer.cache_misses)
+        self.assertEqual(values[-1], fryer.snapshot.temperature)
+        self.assertEqual(timestamps[-1], sim.now())
+        self.assertEqual(store.query(8), (array("d"), array("d")))
+
+
+class FlakyFryer(SimulatedFryer):
+    """Friggitrice simulata le cui letture falliscono nelle chiamate indicate."""
+    
+    def __init__(self, failing_reads=(), always_fail=False, latency=0.0, gate=None, **kwargs):
+        super().__init__(**kwargs)
+        self.failing_reads = set(failing_reads)
+        self.always_fail = always_fail
+        self.latency = latency            # Secondi reali di attesa prima di ogni comando
+        self.gate = gate                  # Evento da attendere prima di ogni comando
+        self.started = threading.Event()  # Impostato al primo comando ricevuto
+        self.reads = 0
+        self.heat_starts = 0
+    
+    def send(self, action, arguments=None):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait()
+        if self.latency:
+            time.sleep(self.latency)
+        if self.always_fail:
+            raise ConnectionError("Friggitrice non raggiungibile")
+        if action == "read_temperature":
+            self.reads += 1
+            if self.reads in self.failing_reads:
+                raise OSError("Lettura non riuscita")
+        if action == "heat" and arguments == {"action": "start"}:
+            self.heat_starts += 1
+        return super().send(action, arguments)
+
+
+class TestCommandPipeline(unittest.TestCase):
+    """Test per retry, timeout e circuit breaker dei comandi."""
+    
+    def make_pipeline(self, transport, **kwargs):
+        self.delays = []
+        kwargs.setdefault("retry", RetryPolicy(max_attempts=3, base_delay=0.1, seed=1))
+        return CommandPipeline(transport, sleep=self.delays.append, **kwargs)
+    
+    def test_transient_read_retried(self):
+        """Verifica che una lettura fallita venga ripetuta con backoff."""
+        pipeline = self.make_pipeline(FlakyFryer(failing_reads={1, 2}, initial_temp=150.0, noise=0.0))
+        
+        self.assertEqual(pipeline.send("read_temperature"), 150.0)
+        self.assertEqual(pipeline.retries, 2)
+        self.assertEqual(len(self.delays), 2)
+        self.assertTrue(0 <= self.delays[0] <= 0.1 and 0 <= self.delays[1] <= 0.2)
+    
+    def test_non_idempotent_not_retried(self):
+        """Verifica che load e gli errori di utilizzo non vengano ripetuti."""
+        transport = MagicMock()
+        transport.send.side_effect = OSError("guasto")
+        pipeline = self.make_pipeline(transport)
+        
+        with self.assertRaises(OSError):
+            pipeline.send("load", {"quantity": 1.0})
+        transport.send.side_effect = ValueError("argomento mancante")
+        with self.assertRaises(ValueError):
+            pipeline.send("read_temperature")
+        
+        self.assertEqual(transport.send.call_count, 2)
+        self.assertEqual(pipeline.failures, 2)
+    
+    def test_backoff_is_bounded(self):
+        """Verifica che l'attesa non superi max_delay."""
+        policy = RetryPolicy(base_delay=1.0, max_delay=2.0, seed=3)
+        
+        self.assertTrue(all(0 <= policy.delay(attempt) <= 2.0 for attempt in range(1, 20)))
+    
+    def test_circuit_breaker(self):
+        """Verifica apertura, rifiuto immediato, prova e richiusura del circuito."""
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])
+        transport = FlakyFryer(always_fail=True)
+        pipeline = self.make_pipeline(transport, retry=RetryPolicy(max_attempts=1), breaker=breaker)
+        
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                pipeline.send("read_temperature")
+        with self.assertRaises(CircuitOpenError):
+            pipeline.send("read_temperature")
+        self.assertFalse(pipeline.available)
+        self.assertEqual(pipeline.rejected, 1)
+        
+        now[0] = 10.0
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        transport.always_fail = False
+        pipeline.send("read_temperature")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+    
+    def test_command_timeout(self):
+        """Verifica che un comando bloccato scada e non venga ripetuto mentre è ancora in corso."""
+        release = threading.Event()
+        transport = MagicMock()
+        transport.send.side_effect = lambda action, arguments=None: release.wait()
+        pipeline = self.make_pipeline(transport, retry=RetryPolicy(max_attempts=2), timeouts={"heat": 0.05})
+        
+        try:
+            with self.assertRaises(CommandTimeout):
+                pipeline.send("heat", {"action": "start"})
+            self.assertEqual(pipeline.abandoned, 1)
+        finally:
+            release.set()
+            pipeline.close()
+        self.assertEqual(transport.send.call_count, 1)
+        self.assertEqual(pipeline.retries, 0)
+    
+    def test_hung_commands_do_not_starve_later_ones(self):
+        """Verifica che molti comandi bloccati non ritardino quelli inviati dopo il ripristino."""
+        release = threading.Event()
+        hung = threading.Event()
+        hung.set()
+        transport = MagicMock()
+        transport.send.side_effect = lambda action, arguments=None: release.wait() if hung.is_set() else 175.0
+        pipeline = self.make_pipeline(transport, retry=RetryPolicy(max_attempts=1),
+                                      timeouts={"read_temperature": 0.02})
+        
+        try:
+            for _ in range(8):
+                with self.assertRaises(CommandTimeout):
+                    pipeline.send("read_temperature")
+            hung.clear()  # Il dispositivo torna a rispondere, i comandi precedenti restano bloccati
+            
+            self.assertEqual(pipeline.send("read_temperature"), 175.0)
+            self.assertEqual(pipeline.abandoned, 8)
+        finally:
+            release.set()
+            pipeline.close()
+    
+    def test_timeout_retried_once_attempt_finished(self):
+        """Verifica che un timeout venga ripetuto se il tentativo scaduto nel frattempo è terminato."""
+        calls = []
+        
+        def send(action, arguments=None):
+            calls.append(action)
+            if len(calls) == 1:
+                time.sleep(0.1)
+            return 175.0
+        
+        transport = MagicMock()
+        transport.send.side_effect = send
+        pipeline = CommandPipeline(transport, retry=RetryPolicy(max_attempts=2), timeouts={"read_temperature": 0.02},
+                                   sleep=lambda seconds: time.sleep(0.2))
+        
+        self.assertEqual(pipeline.send("read_temperature"), 175.0)
+        self.assertEqual((len(calls), pipeline.retries), (2, 1))
+    
+    def test_async_retry(self):
+        """Verifica il retry dei comandi inviati in modo asincrono."""
+        transport = FlakyFryer(failing_reads={1}, initial_temp=150.0, noise=0.0)
+        pipeline = CommandPipeline(transport, retry=RetryPolicy(base_delay=0.001))
+        
+        self.assertEqual(asyncio.run(pipeline.send_async("read_temperature")), 150.0)
+        self.assertEqual(pipeline.retries, 1)
+    
+    def test_cycle_survives_transient_reads(self):
+        """Verifica che letture fallite non interrompano il ciclo né facciano riscaldare di nuovo."""
+        transport = FlakyFryer(failing_reads={1, 3, 4}, seed=1, initial_temp=175.0)
+        fryer = FrenchFryFryer(transport=self.make_pipeline(transport),
+                               polling=AdaptivePolling(deadline=600.0))
+        
+        self.assertEqual(len(fryer.cook_french_fries(quantity=1.0, cooking_time=180.0)), 10)
+        self.assertEqual(transport.heat_starts, 1)
+    
+    def test_scheduler_removes_failing_fryer(self):
+        """Verifica che una friggitrice guasta esca dalla rotazione e le altre finiscano gli ordini."""
+        broken = CommandPipeline(FlakyFryer(always_fail=True), retry=RetryPolicy(max_attempts=1),
+                                 breaker=CircuitBreaker(failure_threshold=1))
+        healthy = CommandPipeline(SimulatedFryer(seed=1, initial_temp=185.0))
+        fryers = [FrenchFryFryer(fryer_id=0, transport=broken),
+                  FrenchFryFryer(fryer_id=1, transport=healthy, polling=AdaptivePolling(deadline=600.0))]
+        
+        report = BatchScheduler(fryers).run([Order("A", 6.0, 60.0)])
+        
+        self.assertEqual(report.out_of_rotation, [0])
+        self.assertEqual(report.errors, {})
+        self.assertAlmostEqual(report.cooked_kg, 6.0)
+        self.assertEqual(report.batches_per_fryer, {1: 3})
+    
+    def test_scheduler_requeue_after_queue_drained(self):
+        """Verifica che il batch di una friggitrice guasta venga ripreso anche a coda già svuotata."""
+        broken_transport = FlakyFryer(always_fail=True, latency=0.2)
+        broken = CommandPipeline(broken_transport, retry=RetryPolicy(max_attempts=1),
+                                 breaker=CircuitBreaker(failure_threshold=1))
+        # La friggitrice sana parte solo dopo che quella guasta ha preso il primo batch
+        healthy = FlakyFryer(gate=broken_transport.started, seed=1, initial_temp=185.0)
+        fryers = [FrenchFryFryer(fryer_id=0, transport=broken),
+                  FrenchFryFryer(fryer_id=1, transport=healthy, polling=AdaptivePolling(deadline=600.0))]
+        
+        report = BatchScheduler(fryers).run([Order("A", 4.0, 60.0)])
+        
+        self.assertEqual(report.out_of_rotation, [0])
+        self.assertEqual(report.errors, {})
+        self.assertAlmostEqual(report.cooked_kg, 4.0)
+        self.assertEqual(report.batches_per_fryer, {1: 2})
+    
+    def test_scheduler_without_available_fryers(self):
+        """Verifica che i batch rimasti senza friggitrici vengano riportati come errori."""
+        broken = CommandPipeline(FlakyFryer(always_fail=True), retry=RetryPolicy(max_attempts=1),
+                                 breaker=CircuitBreaker(failure_threshold=1))
+        
+        report = BatchScheduler([FrenchFryFryer(transport=broken)]).run([Order("A", 4.0, 60.0)])
+        
+        self.assertEqual(len(report.errors["A"]), 2)
+        self.assertIsInstance(report.errors["A"][0], CircuitOpenError)
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test per il confronto dei benchmark con la baseline."""
+    
+    def test_compare_flags_regressions(self):
+        """Verifica che solo i rallentamenti oltre la soglia vengano segnalati."""
+        baseline = {"fast": 1e-6, "slow": 1e-6, "removed": 1e-6}
+        current = {"fast": 1.1e-6, "slow": 1.5e-6, "new": 1e-6}
+        
+        regressions = compare(current, baseline, threshold=0.2)
+        
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("slow:"))
+    
+    def test_compare_per_benchmark_thresholds(self):
+        """Verifica che la soglia di un benchmark rumoroso prevalga solo se più alta."""
+        baseline = {"noisy": 1e-6, "stable": 1e-6}
+        current = {"noisy": 1.3e-6, "stable": 1.3e-6}
+        
+        regressions = compare(current, baseline, threshold=0.2, thresholds={"noisy": 0.4})
+        
+        self.assertEqual([line.split(":")[0] for line in regressions], ["stable"])
+        self.assertEqual(compare(current, baseline, threshold=0.5, thresholds={"noisy": 0.1}), [])
+    
+    def test_quick_run(self):
+        """Verifica che l'esecuzione ridotta produca tutti i risultati attesi."""
+        results = run_benchmarks(quick=True)
+        
+        self.assertIn("cook_cycle", results)
+        self.assertIn("concurrent_cycles_10", results)
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
+
+
+class TestTestRunner(unittest.TestCase):
+    """Test per la scelta dei test interessati dalle modifiche."""
+    
+    SOURCE = (
+        "LIMIT = 3\n"
+        "def double(x):\n"
+        "    return 2 * x\n"
+        "class Basket:\n"
+        "    def fill(self):\n"
+        "        return [double(i) for i in range(LIMIT)]\n"
+    )
+    
+    def hashes(self, source):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sample.py")
+            with open(path, "w") as f:
+                f.write(source)
+            return module_hashes(path, "sample")
+    
+    def test_module_hashes_ignore_comments(self):
+        """Verifica che le impronte cambino solo per la funzione modificata."""
+        before = self.hashes(self.SOURCE)
+        commented = self.hashes("# commento\n" + self.SOURCE.replace("2 * x", "2 * x  # doppio"))
+        changed = self.hashes(self.SOURCE.replace("2 * x", "x + x"))
+        
+        self.assertEqual(set(before), {"sample:double", "sample:Basket.fill", "sample:<module>"})
+        self.assertEqual(before, commented)
+        self.assertEqual({key for key in before if before[key] != changed[key]}, {"sample:double"})
+        self.assertNotEqual(before["sample:<module>"], self.hashes(self.SOURCE.replace("3", "4"))["sample:<module>"])
+    
+    def test_select_tests(self):
+        """Verifica che vengano scelti i test nuovi, falliti o che toccano funzioni modificate."""
+        previous = {
+            "functions": {"m:a": "1", "m:b": "1", "m:gone": "1"},
+            "tests": {"t.A.test_a": ["m:a"], "t.A.test_b": ["m:b"], "t.A.test_gone": ["m:gone"],
+                      "t.A.test_failed": ["m:a"]},
+            "failed": ["t.A.test_failed"],
+        }
+        current = {"m:a": "1", "m:b": "2"}
+        test_ids = ["t.A.test_a", "t.A.test_b", "t.A.test_gone", "t.A.test_failed", "t.A.test_new"]
+        
+        selected = select_tests(test_ids, current, previous)
+        
+        self.assertEqual(selected, ["t.A.test_b", "t.A.test_gone", "t.A.test_failed", "t.A.test_new"])
+        self.assertEqual(select_tests(test_ids, current, None), test_ids)
+    
+    def test_select_tests_with_whole_module(self):
+        """Verifica che una dipendenza modulo:* copra ogni funzione modificata del modulo."""
+        previous = {"functions": {"m:a": "1", "n:a": "1"},
+                    "tests": {"t.A.test_m": ["m:*"], "t.A.test_n": ["n:*"]}, "failed": []}
+        
+        selected = select_tests(["t.A.test_m", "t.A.test_n"], {"m:a": "2", "n:a": "1"}, previous)
+        
+        self.assertEqual(selected, ["t.A.test_m"])
+    
+    def test_shard_keeps_classes_together(self):
+        """Verifica che i test della stessa classe finiscano nello stesso processo."""
+        test_ids = [f"t.A.test_{i}" for i in range(4)] + [f"t.B.test_{i}" for i in range(2)] + ["t.C.test_0"]
+        
+        shards = shard(test_ids, 2)
+        
+        self.assertEqual(sorted(map(len, shards)), [3, 4])
+        self.assertEqual(sorted(test_id for s in shards for test_id in s), sorted(test_ids))
+        for prefix in ("t.A.", "t.B."):
+            self.assertEqual(sum(any(test_id.startswith(prefix) for test_id in s) for s in shards), 1)
+        self.assertEqual(shard(test_ids[:1], 4), [test_ids[:1]])
+    
+    def test_recorder_maps_calls_to_functions(self):
+        """Verifica che vengano registrate le funzioni eseguite, anche da altri thread."""
+        files = {path: module for path, module in source_files().items() if module in ("main", "state")}
+        recorder = DependencyRecorder(files)
+        fryer = FrenchFryFryer()
+        fryer.potatoes_loaded = True
+        
+        recorder.start()
+        thread = threading.Thread(target=fryer.remove_fries)
+        thread.start()
+        thread.join()
+        keys = recorder.stop()
+        
+        self.assertIn("main:FrenchFryFryer.remove_fries", keys)
+        self.assertIn("state:check_transition", keys)
+        self.assertNotIn("main:FrenchFryFryer.fry", keys)
+        self.assertFalse(any(key.startswith("test_unit:") for key in keys))
+    
+    def test_recorder_covers_child_processes(self):
+        """Verifica che avviare un processo renda il test dipendente dai moduli già importati."""
+        files = {path: module for path, module in source_files().items() if module == "main"}
+        recorder = DependencyRecorder(files)
+        
+        recorder.start()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        keys = recorder.stop()
+        
+        self.assertIn("main:*", keys)
+    
+    def test_recorder_covers_existing_threads(self):
+        """Verifica che il lavoro di un thread avviato prima della registrazione venga coperto."""
+        files = {path: module for path, module in source_files().items() if module == "events"}
+        log = EventLog()
+        sink = MemorySink()
+        log.add_sink(sink)
+        self.addCleanup(log.close)
+        recorder = DependencyRecorder(files)
+        
+        recorder.start()
+        log.emit(HeatStarted, fryer_id=0)
+        log.flush()
+        keys = recorder.stop()
+        
+        self.assertEqual(len(sink.events), 1)
+        self.assertIn("events:*", keys)
+
+
+class TestAsyncFrenchFryFryer(unittest.IsolatedAsyncioTestCase):
+    """Test per la classe AsyncFrenchFryFryer."""
+    
+    @patch('main.async_send_to_fryer', new_callable=AsyncMock)
+    async def test_cook_french_fries(self, mock_send):
+        """Verifica che il ciclo asincrono completo restituisca le patatine."""
+        # Setup
+        mock_send.side_effect = lambda action, args=None: 185.0 if action == "read_temperature" else None
+        fryer = AsyncFrenchFryFryer()
+        
+        # Esecuzione
+        result = await fryer.cook_french_fries(quantity=1.0, cooking_time=3.0)
+        
+        # Verifiche
+        self.assertEqual(len(result), 10)
+        self.assertFalse(fryer.is_heating)
+        mock_send.assert_any_await("sleep", {"seconds": 3.0})
+    
+    @patch('main.async_send_to_fryer')
+    async def test_cook_many_bounded_concurrency(self, mock_send):
+        """Verifica che cook_many non superi il limite di concorrenza."""
+        active = 0
+        peak = 0
+        
+        async def fake_send(action, args=None):
+            nonlocal active, peak
+            if action == "read_temperature":
+                return 185.0
+            if action == "sleep":
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0)
+                active -= 1
+            return None
+        mock_send.side_effect = fake_send
+        
+        # Esecuzione
+        orders = [(AsyncFrenchFryFryer(), 1.0, 1.0) for _ in range(20)]
+        results = await cook_many(orders, max_concurrency=3)
+        
+        # Verifiche
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(len(fries) == 10 for fries in results))
+        self.assertLessEqual(peak, 3)
+    
+    @patch('main.async_send_to_fryer', new_callable=AsyncMock)
+    async def test_cook_many_collects_errors(self, mock_send):
+        """Verifica che un ordine fallito non interrompa gli altri."""
+        mock_send.side_effect = lambda action, args=None: 185.0 if action == "read_temperature" else None
+        
+        results = await cook_many([(AsyncFrenchFryFryer(), 1.0, 1.0),
+                                   (AsyncFrenchFryFryer(), 5.0, 1.0)])
+        
+        self.assertEqual(len(results[0]), 10)
+        self.assertIsInstance(results[1], ValueError)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,355 @@
+"""Esecuzione incrementale e parallela dei test della friggitrice
+
+Durante ogni test viene registrato quali funzioni dei moduli di questa
+cartella vengono eseguite (con sys.setprofile). La mappa test -> funzioni e
+l'impronta di ogni funzione (calcolata sull'AST, quindi insensibile a
+commenti e formattazione) vengono salvate in .testdeps.json. All'esecuzione
+successiva partono solo i test che toccano funzioni modificate, i test nuovi
+e quelli falliti l'ultima volta. Il codice eseguito da processi figli o da
+thread già attivi non è visibile al profiler: in quei casi il test dipende
+da interi moduli (vedi DependencyRecorder).
+
+I test vengono distribuiti su più processi raggruppati per classe, così
+setUpClass e l'import dei moduli avvengono una sola volta per processo.
+
+Uso:
+    python testrunner.py                # solo i test interessati dalle modifiche
+    python testrunner.py --all          # tutti i test, ricostruendo la mappa
+    python testrunner.py --workers 4 --list
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEPS_FILE = os.path.join(HERE, ".testdeps.json")
+_DEPS_VERSION = 1
+MODULE_KEY = "<module>"  # Codice a livello di modulo (import, costanti, attributi di classe)
+WILDCARD = "*"          # modulo:* = qualsiasi funzione del modulo
+
+# File della libreria standard la cui esecuzione indica l'avvio di processi figli
+_PROCESS_FILES = (
+    os.path.join("multiprocessing", "process.py"),
+    os.path.join("concurrent", "futures", "process.py"),
+    "subprocess.py",
+)
+
+
+def _spawns_processes(filename: str) -> bool:
+    return filename.endswith(_PROCESS_FILES)
+
+
+class TestOutcome(NamedTuple):
+    """Esito di un test e funzioni che ha eseguito."""
+    test_id: str
+    status: str             # passed, failed, error, skipped
+    message: str
+    dependencies: Tuple[str, ...]
+
+
+def _function_nodes(body: List[ast.stmt], prefix: str) -> Iterable[Tuple[str, ast.AST]]:
+    """Restituisce (qualname, nodo) per ogni funzione, anche annidata, come in co_qualname."""
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            qualname = prefix + node.name
+            yield qualname, node
+            yield from _function_nodes(node.body, qualname + ".<locals>.")
+        elif isinstance(node, ast.ClassDef):
+            yield from _function_nodes(node.body, prefix + node.name + ".")
+        elif isinstance(node, (ast.If, ast.Try, ast.With)):
+            for field in ("body", "orelse", "finalbody", "handlers"):
+                yield from _function_nodes(getattr(node, field, []), prefix)
+        elif isinstance(node, ast.ExceptHandler):
+            yield from _function_nodes(node.body, prefix)
+
+
+def module_hashes(path: str, module: str) -> Dict[str, str]:
+    """Impronte delle funzioni di un modulo e del suo codice di livello superiore."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    hashes = {}
+    for qualname, node in _function_nodes(tree.body, ""):
+        hashes[f"{module}:{qualname}"] = hashlib.sha1(ast.dump(node).encode()).hexdigest()
+
+    class StripFunctions(ast.NodeTransformer):
+        def visit_FunctionDef(self, node):
+            return ast.Pass()
+
+        visit_AsyncFunctionDef = visit_FunctionDef
+
+    top_level = StripFunctions().visit(tree)
+    hashes[f"{module}:{MODULE_KEY}"] = hashlib.sha1(ast.dump(top_level).encode()).hexdigest()
+    return hashes
+
+
+def source_files(directory: str = HERE) -> Dict[str, str]:
+    """Moduli Python della cartella (percorso assoluto -> nome del modulo), escluso questo."""
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py") and name != os.path.basename(__file__):
+            files[os.path.join(os.path.abspath(directory), name)] = name[:-3]
+    return files
+
+
+def source_hashes(directory: str = HERE) -> Dict[str, str]:
+    """Impronte di tutte le funzioni dei moduli della cartella."""
+    hashes: Dict[str, str] = {}
+    for path, module in source_files(directory).items():
+        hashes.update(module_hashes(path, module))
+    return hashes
+
+
+class DependencyRecorder:
+    """Registra le funzioni dei moduli osservati eseguite tra start e stop.
+
+    Usa sys.setprofile (e threading.setprofile per i thread avviati nel
+    frattempo): vengono osservate solo le chiamate di funzione, non le
+    singole righe, quindi il rallentamento resta contenuto.
+
+    Il codice eseguito fuori dalla portata del profiler viene coperto per
+    modulo intero, con chiavi modulo:* (WILDCARD):
+    - se il test avvia processi (multiprocessing, concurrent.futures,
+      subprocess), ogni modulo osservato già importato, perché i processi
+      figli possono eseguirne qualsiasi funzione;
+    - per i thread già attivi prima di start, i moduli osservati presenti
+      nel loro stack all'inizio o alla fine della registrazione. Il lavoro
+      che un thread inattivo di un pool già esistente riceve durante il
+      test resta invisibile.
+    """
+
+    def __init__(self, files: Dict[str, str], known: Optional[Set[str]] = None):
+        """Inizializza il registratore per i file indicati (percorso -> modulo)."""
+        self.files = files
+        self.known = known  # Chiavi esistenti, per ricondurre lambda e comprensioni alla funzione
+        self._codes: Set = set()
+        self._previous = (None, None)
+        self._threads: Set[int] = set()
+        self._thread_modules: Set[str] = set()
+
+    def _profile(self, frame, event, arg):
+        if event == "call":
+            self._codes.add(frame.f_code)
+
+    def _modules_in_other_threads(self) -> Set[str]:
+        """Moduli osservati nello stack dei thread già attivi all'avvio."""
+        modules = set()
+        for ident, frame in sys._current_frames().items():
+            if ident not in self._threads:
+                continue
+            while frame is not None:
+                module = self.files.get(frame.f_code.co_filename)
+                if module is not None:
+                    modules.add(module)
+                frame = frame.f_back
+        return modules
+
+    def start(self) -> None:
+        """Inizia la registrazione."""
+        self._codes = set()
+        self._threads = {thread.ident for thread in threading.enumerate()} - {threading.get_ident()}
+        self._thread_modules = self._modules_in_other_threads()
+        self._previous = (sys.getprofile(), threading.getprofile())
+        threading.setprofile(self._profile)
+        sys.setprofile(self._profile)
+
+    def stop(self) -> Set[str]:
+        """Termina la registrazione e restituisce le chiavi modulo:funzione eseguite."""
+        sys.setprofile(self._previous[0])
+        threading.setprofile(self._previous[1])
+        keys = {f"{module}:{WILDCARD}" for module in self._thread_modules | self._modules_in_other_threads()}
+        for code in self._codes:
+            if _spawns_processes(code.co_filename):
+                keys.update(f"{module}:{WILDCARD}" for module in self._imported_modules())
+            module = self.files.get(code.co_filename)
+            if module is None:
+                continue
+            keys.add(f"{module}:{MODULE_KEY}")
+            qualname = code.co_qualname
+            while qualname and self.known is not None and f"{module}:{qualname}" not in self.known:
+                # <lambda>, <listcomp>, ... appartengono alla funzione che li contiene
+                qualname = qualname.rpartition(".<locals>.")[0]
+            if qualname and qualname != MODULE_KEY:
+                keys.add(f"{module}:{qualname}")
+        return keys
+
+    def _imported_modules(self) -> Set[str]:
+        """Moduli osservati già importati nel processo."""
+        loaded = {getattr(module, "__file__", None) for module in list(sys.modules.values())}
+        return {module for path, module in self.files.items() if path in loaded}
+
+
+class _RecordingResult(unittest.TestResult):
+    """TestResult che registra le dipendenze di ogni test."""
+
+    def __init__(self, recorder: DependencyRecorder):
+        super().__init__()
+        self.recorder = recorder
+        self.outcomes: List[TestOutcome] = []
+        self._status: Tuple[str, str] = ("passed", "")
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._status = ("passed", "")
+        self.recorder.start()
+
+    def stopTest(self, test):
+        dependencies = self.recorder.stop()
+        super().stopTest(test)
+        self.outcomes.append(TestOutcome(test.id(), *self._status, tuple(sorted(dependencies))))
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._status = ("failed", self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._status = ("error", self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._status = ("skipped", reason)
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            failed = issubclass(err[0], test.failureException)
+            self._status = ("failed" if failed else "error", (self.failures if failed else self.errors)[-1][1])
+
+
+def run_tests(test_ids: List[str], directory: str = HERE) -> List[TestOutcome]:
+    """Esegue i test indicati nel processo corrente registrandone le dipendenze."""
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    hashes = source_hashes(directory)
+    result = _RecordingResult(DependencyRecorder(source_files(directory), set(hashes)))
+    unittest.defaultTestLoader.loadTestsFromNames(test_ids).run(result)
+    return result.outcomes
+
+
+def discover(directory: str = HERE) -> List[str]:
+    """Restituisce gli id di tutti i test della cartella."""
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    ids: List[str] = []
+
+    def flatten(suite):
+        for item in suite:
+            if isinstance(item, unittest.TestSuite):
+                flatten(item)
+            else:
+                ids.append(item.id())
+
+    flatten(unittest.defaultTestLoader.discover(directory, pattern="test_*.py", top_level_dir=directory))
+    return ids
+
+
+def select_tests(test_ids: List[str], current: Dict[str, str], previous: Optional[Dict]) -> List[str]:
+    """Sceglie i test da eseguire rispetto all'esecuzione precedente.
+
+    Vengono scelti i test nuovi, quelli falliti l'ultima volta e quelli
+    che dipendono da una funzione aggiunta, modificata o rimossa (o da
+    tutto il suo modulo, con modulo:*).
+    """
+    if previous is None:
+        return list(test_ids)
+    old = previous["functions"]
+    changed = {key for key in set(current) | set(old) if current.get(key) != old.get(key)}
+    changed |= {key.partition(":")[0] + ":" + WILDCARD for key in changed}
+    tests, failed = previous["tests"], set(previous["failed"])
+    return [test_id for test_id in test_ids
+            if test_id not in tests or test_id in failed or not changed.isdisjoint(tests[test_id])]
+
+
+def shard(test_ids: List[str], workers: int) -> List[List[str]]:
+    """Divide i test tra i processi mantenendo insieme quelli della stessa classe."""
+    classes: Dict[str, List[str]] = {}
+    for test_id in test_ids:
+        classes.setdefault(test_id.rpartition(".")[0], []).append(test_id)
+    shards: List[List[str]] = [[] for _ in range(max(1, workers))]
+    for group in sorted(classes.values(), key=len, reverse=True):
+        min(shards, key=len).extend(group)
+    return [s for s in shards if s]
+
+
+def load_dependencies(path: str = DEPS_FILE) -> Optional[Dict]:
+    """Legge la mappa delle dipendenze; None se manca o non è valida."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if data.get("version") == _DEPS_VERSION else None
+
+
+def save_dependencies(outcomes: List[TestOutcome], test_ids: List[str], current: Dict[str, str],
+                      previous: Optional[Dict], path: str = DEPS_FILE) -> None:
+    """Aggiorna la mappa con i test appena eseguiti, mantenendo gli altri."""
+    tests = dict(previous["tests"]) if previous else {}
+    failed = set(previous["failed"]) if previous else set()
+    for outcome in outcomes:
+        tests[outcome.test_id] = list(outcome.dependencies)
+        if outcome.status in ("failed", "error"):
+            failed.add(outcome.test_id)
+        else:
+            failed.discard(outcome.test_id)
+    existing = set(test_ids)
+    data = {
+        "version": _DEPS_VERSION,
+        "functions": current,
+        "tests": {test_id: deps for test_id, deps in sorted(tests.items()) if test_id in existing},
+        "failed": sorted(failed & existing),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def run(selected: List[str], workers: int = 1, directory: str = HERE) -> List[TestOutcome]:
+    """Esegue i test scelti, su più processi se workers > 1."""
+    shards = shard(selected, workers)
+    if workers <= 1 or len(shards) <= 1:
+        return run_tests(selected, directory)
+    outcomes: List[TestOutcome] = []
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        for shard_outcomes in executor.map(run_tests, shards, [directory] * len(shards)):
+            outcomes.extend(shard_outcomes)
+    return outcomes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto di ingresso da riga di comando."""
+    parser = argparse.ArgumentParser(description="Esegue solo i test interessati dalle modifiche")
+    parser.add_argument("--all", action="store_true", help="esegue tutti i test")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--deps", default=DEPS_FILE, help="file della mappa delle dipendenze")
+    parser.add_argument("--list", action="store_true", help="mostra i test scelti senza eseguirli")
+    args = parser.parse_args(argv)
+
+    test_ids = discover()
+    current = source_hashes()
+    previous = None if args.all else load_dependencies(args.deps)
+    selected = select_tests(test_ids, current, previous)
+    if args.list:
+        for test_id in selected:
+            print(test_id)
+        return 0
+
+    outcomes = run(selected, args.workers)
+    save_dependencies(outcomes, test_ids, current, previous, args.deps)
+
+    problems = [outcome for outcome in outcomes if outcome.status in ("failed", "error")]
+    for outcome in problems:
+        print(f"{outcome.status.upper()}: {outcome.test_id}\n{outcome.message}")
+    print(f"Eseguiti {len(outcomes)}/{len(test_ids)} test, {len(problems)} falliti")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Storico compatto delle temperature delle friggitrici
+
+Ogni friggitrice ha una TemperatureSeries con due buffer circolari di
+dimensione fissa: le letture grezze più recenti e, per la conservazione a
+lungo termine, i bucket aggregati (minimo, massimo, media) di bucket_seconds
+secondi. La memoria occupata per friggitrice non cresce con il tempo.
+
+Con una directory, ogni serie vive in un file di segmento mappato in
+memoria: le scritture finiscono direttamente nel file e lo storico si
+ritrova alla riapertura.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+_MAGIC = b"FRTS"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIIIQQd")  # magic, versione, capacità, capacità bucket, scritti, bucket, durata
+_HEADER_SIZE = 64
+_BUCKET_FIELDS = 5  # inizio, minimo, massimo, somma, conteggio
+
+Buffer = Union[array, memoryview]
+
+
+class Bucket(NamedTuple):
+    """Aggregato delle letture di un intervallo di tempo."""
+    start: float
+    minimum: float
+    maximum: float
+    mean: float
+    count: int
+
+
+def _copy(view: Buffer, start: int, end: int) -> array:
+    """Copia una porzione di buffer in un nuovo array('d')."""
+    out = array("d")
+    out.frombytes(memoryview(view)[start:end].cast("B"))
+    return out
+
+
+class TemperatureSeries:
+    """Serie temporale a memoria limitata di una singola friggitrice.
+
+    I timestamp devono essere non decrescenti: una lettura con timestamp
+    precedente all'ultima viene registrata all'istante dell'ultima. Le
+    scritture vanno fatte da un solo thread; le letture possono avvenire
+    in parallelo.
+    """
+
+    def __init__(self, capacity: int = 4096, bucket_seconds: float = 60.0, bucket_capacity: int = 1440,
+                 path: Optional[str] = None):
+        """Crea la serie, in memoria oppure nel file di segmento indicato.
+
+        Se il file esiste già viene riaperto con i suoi parametri.
+        """
+        if capacity <= 0 or bucket_capacity <= 0:
+            raise ValueError("Le capacità devono essere maggiori di zero")
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds deve essere maggiore di zero")
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        if path is None:
+            self.capacity, self.bucket_capacity, self.bucket_seconds = capacity, bucket_capacity, bucket_seconds
+            self.written = 0         # Letture registrate in totale
+            self.bucket_count = 0    # Bucket aperti in totale
+            self._timestamps: Buffer = array("d", bytes(8 * capacity))
+            self._values: Buffer = array("d", bytes(8 * capacity))
+            self._buckets: Buffer = array("d", bytes(8 * _BUCKET_FIELDS * bucket_capacity))
+        else:
+            self._open_segment(path, capacity, bucket_seconds, bucket_capacity)
+
+    def _open_segment(self, path: str, capacity: int, bucket_seconds: float, bucket_capacity: int) -> None:
+        """Apre (o crea) il file di segmento e vi mappa i buffer."""
+        exists = os.path.exists(path) and os.path.getsize(path) >= _HEADER_SIZE
+        with open(path, "r+b" if exists else "w+b") as f:
+            if exists:
+                magic, version, capacity, bucket_capacity, written, buckets, bucket_seconds = \
+                    _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or version != _VERSION:
+                    raise ValueError(f"File di segmento non valido: {path}")
+            else:
+                written = buckets = 0
+            size = _HEADER_SIZE + 8 * (2 * capacity + _BUCKET_FIELDS * bucket_capacity)
+            if not exists:
+                f.truncate(size)
+            elif os.path.getsize(path) != size:
+                raise ValueError(f"File di segmento troncato: {path}")
+            self._mmap = mmap.mmap(f.fileno(), size)
+        self.capacity, self.bucket_capacity, self.bucket_seconds = capacity, bucket_capacity, bucket_seconds
+        self.written, self.bucket_count = written, buckets
+        view = memoryview(self._mmap)
+        raw_end = _HEADER_SIZE + 8 * capacity
+        self._timestamps = view[_HEADER_SIZE:raw_end].cast("d")
+        self._values = view[raw_end:raw_end + 8 * capacity].cast("d")
+        self._buckets = view[raw_end + 8 * capacity:].cast("d")
+        self._write_header()
+
+    def _write_header(self) -> None:
+        if self._mmap is not None:
+            _HEADER.pack_into(self._mmap, 0, _MAGIC, _VERSION, self.capacity, self.bucket_capacity,
+                              self.written, self.bucket_count, self.bucket_seconds)
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def append(self, timestamp: float, temperature: float) -> None:
+        """Registra una lettura e aggiorna il bucket corrente."""
+        if self.written:
+            timestamp = max(timestamp, self._timestamps[(self.written - 1) % self.capacity])
+        index = self.written % self.capacity
+        self._timestamps[index] = timestamp
+        self._values[index] = temperature
+        self.written += 1
+        self._add_to_bucket(timestamp, temperature)
+        self._write_header()
+
+    def _add_to_bucket(self, timestamp: float, temperature: float) -> None:
+        start = timestamp - timestamp % self.bucket_seconds
+        buckets = self._buckets
+        if self.bucket_count:
+            base = ((self.bucket_count - 1) % self.bucket_capacity) * _BUCKET_FIELDS
+            if buckets[base] == start:
+                buckets[base + 1] = min(buckets[base + 1], temperature)
+                buckets[base + 2] = max(buckets[base + 2], temperature)
+                buckets[base + 3] += temperature
+                buckets[base + 4] += 1
+                return
+        base = (self.bucket_count % self.bucket_capacity) * _BUCKET_FIELDS
+        buckets[base:base + _BUCKET_FIELDS] = array("d", (start, temperature, temperature, temperature, 1.0))
+        self.bucket_count += 1
+
+    def _first_index(self, start: Optional[float], written: int) -> int:
+        """Posizione logica (0 = lettura più vecchia) della prima lettura con timestamp >= start."""
+        low, high = 0, min(written, self.capacity)
+        if start is None:
+            return low
+        oldest = written - high
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamps[(oldest + middle) % self.capacity] < start:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def range(self, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[array, array]:
+        """Restituisce timestamp e temperature delle letture con start <= t < end."""
+        written = self.written  # Le letture aggiunte durante la query vengono ignorate
+        size = min(written, self.capacity)
+        first = self._first_index(start, written)
+        last = size if end is None else self._first_index(end, written)
+        if last <= first:
+            return array("d"), array("d")
+        oldest = written - size
+        begin, stop = (oldest + first) % self.capacity, (oldest + last - 1) % self.capacity + 1
+        if begin < stop:
+            return _copy(self._timestamps, begin, stop), _copy(self._values, begin, stop)
+        timestamps = _copy(self._timestamps, begin, self.capacity) + _copy(self._timestamps, 0, stop)
+        values = _copy(self._values, begin, self.capacity) + _copy(self._values, 0, stop)
+        return timestamps, values
+
+    def buckets(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Bucket]:
+        """Restituisce i bucket aggregati che iniziano tra start (incluso) ed end (escluso)."""
+        count = min(self.bucket_count, self.bucket_capacity)
+        result = []
+        for logical in range(self.bucket_count - count, self.bucket_count):
+            base = (logical % self.bucket_capacity) * _BUCKET_FIELDS
+            bucket_start, minimum, maximum, total, samples = self._buckets[base:base + _BUCKET_FIELDS]
+            if (start is None or bucket_start >= start) and (end is None or bucket_start < end):
+                result.append(Bucket(bucket_start, minimum, maximum, total / samples, int(samples)))
+        return result
+
+    def nbytes(self) -> int:
+        """Memoria occupata dai buffer, in byte."""
+        return 8 * (2 * self.capacity + _BUCKET_FIELDS * self.bucket_capacity)
+
+    def flush(self) -> None:
+        """Forza la scrittura su disco del segmento."""
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self) -> None:
+        """Chiude il file di segmento, se presente."""
+        if self._mmap is None:
+            return
+        self.flush()
+        for view in (self._timestamps, self._values, self._buckets):
+            view.release()
+        self._mmap.close()
+        self._mmap = None
+
+
+class TimeSeriesStore:
+    """Storico delle temperature di tutte le friggitrici, una serie per friggitrice.
+
+    Con directory ogni serie è salvata nel file fryer-<id>.seg.
+    """
+
+    def __init__(self, directory: Optional[str] = None, capacity: int = 4096, bucket_seconds: float = 60.0,
+                 bucket_capacity: int = 1440, clock: Callable[[], float] = time.time):
+        """Inizializza lo storico."""
+        self.directory = directory
+        self.capacity = capacity
+        self.bucket_seconds = bucket_seconds
+        self.bucket_capacity = bucket_capacity
+        self.clock = clock
+        self._series: Dict[int, TemperatureSeries] = {}
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            for name in sorted(os.listdir(directory)):
+                if name.startswith("fryer-") and name.endswith(".seg"):
+                    self.series(int(name[len("fryer-"):-len(".seg")]))
+
+    def series(self, fryer_id: int) -> TemperatureSeries:
+        """Restituisce la serie della friggitrice, creandola se necessario."""
+        series = self._series.get(fryer_id)
+        if series is None:
+            with self._lock:
+                series = self._series.get(fryer_id)
+                if series is None:
+                    path = None if self.directory is None else os.path.join(self.directory, f"fryer-{fryer_id}.seg")
+                    series = TemperatureSeries(self.capacity, self.bucket_seconds, self.bucket_capacity, path)
+                    self._series[fryer_id] = series
+        return series
+
+    def fryer_ids(self) -> List[int]:
+        """Restituisce gli id delle friggitrici con uno storico."""
+        return sorted(self._series)
+
+    def record(self, fryer_id: int, temperature: float, timestamp: Optional[float] = None) -> None:
+        """Registra una lettura, all'istante attuale se timestamp non è indicato."""
+        self.series(fryer_id).append(self.clock() if timestamp is None else timestamp, temperature)
+
+    def query(self, fryer_id: int, start: Optional[float] = None,
+              end: Optional[float] = None) -> Tuple[array, array]:
+        """Letture grezze della friggitrice nell'intervallo [start, end)."""
+        if fryer_id not in self._series:
+            return array("d"), array("d")
+        return self._series[fryer_id].range(start, end)
+
+    def downsampled(self, fryer_id: int, start: Optional[float] = None,
+                    end: Optional[float] = None) -> List[Bucket]:
+        """Bucket aggregati della friggitrice nell'intervallo [start, end)."""
+        if fryer_id not in self._series:
+            return []
+        return self._series[fryer_id].buckets(start, end)
+
+    def flush(self) -> None:
+        """Forza la scrittura su disco di tutti i segmenti."""
+        for series in list(self._series.values()):
+            series.flush()
+
+    def close(self) -> None:
+        """Chiude tutti i file di segmento."""
+        with self._lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
+
+    def __enter__(self) -> "TimeSeriesStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,189 @@
+"""Cache su disco delle risposte HTTP, con rivalidazione tramite ETag"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+from client import HttpClient, Response
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+
+class CachedEntry:
+    """Risposta letta dalla cache."""
+
+    def __init__(self, response: Response, etag: Optional[str], last_modified: Optional[str], stored_at: float):
+        """Inizializza la voce di cache."""
+        self.response = response
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+
+class ResponseCache:
+    """Cache persistente delle risposte, indicizzata per URL risolto.
+
+    I corpi sono compressi con zlib in un database SQLite. Quando la
+    dimensione totale supera max_bytes vengono eliminate le voci usate meno
+    di recente (LRU).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, clock=time.time):
+        """Apre (o crea) la cache nel file indicato."""
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[CachedEntry]:
+        """Restituisce la voce per l'URL, aggiornandone l'ultimo accesso."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, body, etag, last_modified, stored_at FROM responses WHERE url = ?",
+                (url,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE url = ?", (self.clock(), url))
+            self._db.commit()
+        status, headers, body, etag, last_modified, stored_at = row
+        response = Response(status, json.loads(headers), zlib.decompress(body), 0.0)
+        return CachedEntry(response, etag, last_modified, stored_at)
+
+    def put(self, url: str, response: Response) -> None:
+        """Salva una risposta ed eventualmente libera spazio."""
+        body = zlib.compress(response.body)
+        headers = json.dumps(response.headers)
+        size = len(body) + len(headers) + len(url)
+        now = self.clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status, headers, body, response.headers.get("etag"),
+                 response.headers.get("last-modified"), now, now, size))
+            self._evict()
+            self._db.commit()
+
+    def touch(self, url: str) -> None:
+        """Segna come appena rivalidata la voce per l'URL."""
+        now = self.clock()
+        with self._lock:
+            self._db.execute("UPDATE responses SET stored_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, size FROM responses ORDER BY last_access ASC").fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+
+    def size(self) -> int:
+        """Restituisce la dimensione totale occupata, in byte."""
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        """Chiude il database."""
+        with self._lock:
+            self._db.close()
+
+
+class CachingClient:
+    """HttpClient che serve le GET dalla cache finché sono fresche.
+
+    Le voci più vecchie di ttl secondi vengono rivalidate con If-None-Match
+    / If-Modified-Since: un 304 rinnova la voce senza trasferire il corpo.
+    Vengono salvate solo le risposte 200 senza Cache-Control: no-store.
+    """
+
+    def __init__(self, client: HttpClient, cache: ResponseCache, ttl: float = 300.0):
+        """Inizializza il client con cache."""
+        self.client = client
+        self.cache = cache
+        self.ttl = ttl
+        self.hits = 0          # Servite dalla cache senza rete
+        self.revalidated = 0   # Confermate dal server con 304
+        self.misses = 0        # Scaricate per intero
+        self._lock = threading.Lock()
+
+    @property
+    def hit_ratio(self) -> float:
+        """Frazione di richieste che non hanno trasferito il corpo."""
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total else 0.0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                body: Optional[bytes] = None) -> Response:
+        """Esegue la richiesta passando dalla cache se è una GET."""
+        if method != "GET":
+            return self.client.request(method, url, headers, body)
+
+        start = time.perf_counter()
+        entry = self.cache.get(url)
+        if entry is not None and self.cache.clock() - entry.stored_at < self.ttl:
+            self._count("hits")
+            entry.response.elapsed_ms = (time.perf_counter() - start) * 1000
+            return entry.response
+
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        response = self.client.request(method, url, headers, body)
+
+        if response.status == 304 and entry is not None:
+            self._count("revalidated")
+            self.cache.touch(url)
+            entry.response.elapsed_ms = response.elapsed_ms
+            return entry.response
+
+        self._count("misses")
+        if response.status == 200 and "no-store" not in response.headers.get("cache-control", ""):
+            self.cache.put(url, response)
+        return response
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Esegue una richiesta GET."""
+        return self.request("GET", url, headers)
+
+    def close(self) -> None:
+        """Chiude il client e la cache."""
+        self.client.close()
+        self.cache.close()
+
+    def __enter__(self) -> "CachingClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
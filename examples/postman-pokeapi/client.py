@@ -0,0 +1,133 @@
+"""Client HTTP con pool di connessioni persistenti"""
+
+import http.client
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class Response:
+    """Risposta HTTP già letta per intero."""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes, elapsed_ms: float):
+        """Inizializza la risposta."""
+        self.status = status
+        self.headers = headers  # Nomi degli header in minuscolo
+        self.body = body
+        self.elapsed_ms = elapsed_ms
+
+    def text(self) -> str:
+        """Restituisce il corpo come testo."""
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        """Restituisce il corpo decodificato come JSON."""
+        return json.loads(self.body)
+
+
+class HttpClient:
+    """Client HTTP/HTTPS che riusa le connessioni verso lo stesso host.
+
+    Per ogni host viene mantenuto un pool di al massimo max_connections
+    connessioni keep-alive; è sicuro da usare da più thread.
+    """
+
+    def __init__(self, max_connections: int = 10, timeout: float = 10.0):
+        """Inizializza il client con pool vuoti."""
+        if max_connections <= 0:
+            raise ValueError("max_connections deve essere maggiore di zero")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._pools: Dict[Tuple[str, str], "queue.LifoQueue[http.client.HTTPConnection]"] = {}
+        self._slots: Dict[Tuple[str, str], threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, key: Tuple[str, str]) -> Tuple["queue.LifoQueue[http.client.HTTPConnection]", threading.Semaphore]:
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue()
+                self._slots[key] = threading.Semaphore(self.max_connections)
+            return self._pools[key], self._slots[key]
+
+    def _connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        if scheme == "http":
+            return http.client.HTTPConnection(netloc, timeout=self.timeout)
+        raise ValueError(f"Schema non supportato: {scheme}")
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                body: Optional[bytes] = None) -> Response:
+        """Esegue una richiesta e restituisce la risposta completa."""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        pool, slots = self._pool(key)
+
+        slots.acquire()
+        try:
+            try:
+                connection = pool.get_nowait()
+                reused = True
+            except queue.Empty:
+                connection = self._connect(*key)
+                reused = False
+            try:
+                response = self._send(connection, method, target, headers or {}, body)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # La connessione riusata era stata chiusa dal server: si riprova una volta
+                connection.close()
+                if not reused:
+                    raise
+                connection = self._connect(*key)
+                try:
+                    response = self._send(connection, method, target, headers or {}, body)
+                except Exception:
+                    connection.close()
+                    raise
+            except Exception:
+                connection.close()
+                raise
+            if response.headers.get("connection", "").lower() == "close":
+                connection.close()
+            else:
+                pool.put(connection)
+            return response
+        finally:
+            slots.release()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Response:
+        """Esegue una richiesta GET."""
+        return self.request("GET", url, headers)
+
+    @staticmethod
+    def _send(connection: http.client.HTTPConnection, method: str, target: str,
+              headers: Dict[str, str], body: Optional[bytes]) -> Response:
+        start = time.perf_counter()
+        connection.request(method, target, body=body, headers=headers)
+        raw = connection.getresponse()
+        data = raw.read()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return Response(raw.status, {k.lower(): v for k, v in raw.getheaders()}, data, elapsed_ms)
+
+    def close(self) -> None:
+        """Chiude tutte le connessioni nei pool."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+    def __enter__(self) -> "HttpClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
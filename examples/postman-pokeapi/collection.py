@@ -0,0 +1,232 @@
+"""Lettura della collection Postman e dell'environment della PokeAPI"""
+
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+VARIABLE_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Check(NamedTuple):
+    """Singola asserzione estratta da uno script di test.
+
+    kind è uno tra: status, header, property, eql, include,
+    response_time_below, text_not_empty, unsupported.
+    """
+    kind: str
+    path: Tuple[str, ...] = ()  # Percorso nel JSON di risposta ('*' = per ogni elemento)
+    value: Any = None           # Valore atteso o espressione (vedi parse_value)
+
+
+class PostmanTest(NamedTuple):
+    """Blocco pm.test con il suo nome e le sue asserzioni."""
+    name: str
+    checks: Tuple[Check, ...]
+
+
+class RequestSpec(NamedTuple):
+    """Richiesta della collection, con URL ancora da risolvere."""
+    name: str
+    folder: str
+    method: str
+    url: str
+    headers: Tuple[Tuple[str, str], ...]
+    tests: Tuple[PostmanTest, ...]
+    extracts: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()  # Variabili impostate dalla risposta
+
+
+def load_json(path: str) -> Dict[str, Any]:
+    """Legge un file JSON."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_variables(collection: Dict[str, Any], environment: Optional[Dict[str, Any]] = None,
+                   overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Unisce le variabili: collection < environment < overrides."""
+    variables = {v["key"]: str(v.get("value", "")) for v in collection.get("variable", [])}
+    if environment is not None:
+        for v in environment.get("values", []):
+            if v.get("enabled", True):
+                variables[v["key"]] = str(v.get("value", ""))
+    if overrides:
+        variables.update(overrides)
+    return variables
+
+
+def resolve(template: str, variables: Dict[str, str]) -> str:
+    """Sostituisce le {{variabili}} nel testo; quelle sconosciute restano invariate."""
+    return VARIABLE_PATTERN.sub(lambda m: variables.get(m.group(1), m.group(0)), template)
+
+
+def rebase_url(url: str, original_base: Optional[str], base_url: Optional[str]) -> str:
+    """Punta un URL a un altro base_url (ad esempio un server locale).
+
+    La collection contiene URL assoluti verso pokeapi.co: se l'URL inizia con
+    il base_url originale dell'environment viene sostituito con quello nuovo.
+    """
+    if base_url and original_base and url.startswith(original_base):
+        return base_url.rstrip("/") + url[len(original_base.rstrip("/")):]
+    return url
+
+
+# --- Interpretazione degli script di test ---------------------------------
+
+_TEST_BLOCK = re.compile(r'pm\.test\("([^"]+)",\s*function\s*\(\)\s*\{(.*?)\n\}\);', re.S)
+_MAP_ALIAS = re.compile(
+    r"var (\w+) = (\w+(?:\.\w+)*)\.map\(function\s*\((\w+)\)\s*\{\s*return\s+\3\.(\w+);\s*\}\);", re.S)
+_JSON_ALIAS = re.compile(r"var (\w+) = pm\.response\.json\(\);")
+_STATUS = re.compile(r"pm\.response\.to\.have\.status\((\d+)\)")
+_HEADER = re.compile(r'pm\.response\.to\.have\.header\("([^"]+)"\)')
+_PROPERTY = re.compile(r'pm\.expect\(([\w.]+)\)\.to\.have\.property\("([^"]+)"\)')
+_EQL = re.compile(r"pm\.expect\(([\w.]+)\)\.to\.eql\((.+)\);")
+_INCLUDE = re.compile(r"pm\.expect\(([\w.]+)\)\.to\.include\((.+)\);")
+_BELOW = re.compile(r"pm\.expect\(pm\.response\.responseTime\)\.to\.be\.below\((\d+)\)")
+_TEXT_NOT_EMPTY = re.compile(r"pm\.expect\(pm\.response\.text\(\)\)\.to\.not\.be\.empty")
+_SET_VARIABLE = re.compile(
+    r'pm\.(?:environment|collectionVariables|variables|globals)\.set\("(\w+)",\s*([\w.]+)\)')
+_VAR_GET = re.compile(r'^pm\.variables\.get\("(\w+)"\)')
+_TRANSFORM = re.compile(r'^\.(toLowerCase)\(\)|^\.(replace)\("([^"]*)",\s*"([^"]*)"\)')
+
+
+def parse_value(expression: str) -> Tuple:
+    """Converte un'espressione JavaScript del valore atteso in una tupla.
+
+    Supporta letterali JSON, pm.variables.get("x") seguito da .toLowerCase()
+    e .replace("a", "b"), e parseInt(...). Restituisce ("literal", valore)
+    oppure ("var", nome, trasformazioni).
+    """
+    expression = expression.strip()
+    if expression.startswith("parseInt(") and expression.endswith(")"):
+        inner = parse_value(expression[len("parseInt("):-1])
+        if inner[0] == "literal":
+            return ("literal", int(inner[1]))
+        return inner[:2] + (inner[2] + (("int",),),)
+    match = _VAR_GET.match(expression)
+    if match:
+        name = match.group(1)
+        rest = expression[match.end():]
+        transforms = []
+        while rest:
+            step = _TRANSFORM.match(rest)
+            if step is None:
+                raise ValueError(f"Espressione non supportata: {expression}")
+            if step.group(1):
+                transforms.append(("lower",))
+            else:
+                transforms.append(("replace", step.group(3), step.group(4)))
+            rest = rest[step.end():]
+        return ("var", name, tuple(transforms))
+    try:
+        return ("literal", json.loads(expression))
+    except json.JSONDecodeError:
+        raise ValueError(f"Espressione non supportata: {expression}") from None
+
+
+def _parse_path(expression: str, aliases: Dict[str, Tuple[str, ...]]) -> Tuple[str, ...]:
+    """Converte jsonData.a.b (o un alias) in un percorso."""
+    root, *segments = expression.split(".")
+    if root not in aliases:
+        raise ValueError(f"Variabile sconosciuta: {root}")
+    return aliases[root] + tuple(segments)
+
+
+def parse_test_script(lines: List[str]) -> Tuple[PostmanTest, ...]:
+    """Estrae i blocchi pm.test e le relative asserzioni da uno script Postman."""
+    script = "\n".join(lines)
+    tests = []
+    for name, body in _TEST_BLOCK.findall(script):
+        aliases: Dict[str, Tuple[str, ...]] = {}
+        for alias in _JSON_ALIAS.findall(body):
+            aliases[alias] = ()
+        for alias, source, _item, field in _MAP_ALIAS.findall(body):
+            aliases[alias] = _parse_path(source, aliases) + ("*", field)
+        checks = []
+        for statement in body.splitlines():
+            statement = statement.strip()
+            if "pm." not in statement or statement.startswith("//") or _JSON_ALIAS.search(statement):
+                continue
+            if _SET_VARIABLE.search(statement):
+                continue
+            checks.append(_parse_statement(statement, aliases))
+        tests.append(PostmanTest(name, tuple(checks)))
+    return tuple(tests)
+
+
+def parse_extractions(lines: List[str]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """Estrae le variabili impostate da uno script, ad esempio
+    pm.environment.set("x", jsonData.a.b), come coppie (nome, percorso).
+    """
+    script = "\n".join(lines)
+    aliases: Dict[str, Tuple[str, ...]] = {alias: () for alias in _JSON_ALIAS.findall(script)}
+    extracts = []
+    for name, source in _SET_VARIABLE.findall(script):
+        try:
+            extracts.append((name, _parse_path(source, aliases)))
+        except ValueError:
+            pass
+    return tuple(extracts)
+
+
+def _parse_statement(statement: str, aliases: Dict[str, Tuple[str, ...]]) -> Check:
+    """Converte una riga dello script in una Check."""
+    try:
+        match = _STATUS.search(statement)
+        if match:
+            return Check("status", value=int(match.group(1)))
+        match = _HEADER.search(statement)
+        if match:
+            return Check("header", value=match.group(1))
+        match = _BELOW.search(statement)
+        if match:
+            return Check("response_time_below", value=int(match.group(1)))
+        if _TEXT_NOT_EMPTY.search(statement):
+            return Check("text_not_empty")
+        match = _PROPERTY.search(statement)
+        if match:
+            return Check("property", _parse_path(match.group(1), aliases), match.group(2))
+        match = _EQL.search(statement)
+        if match:
+            return Check("eql", _parse_path(match.group(1), aliases), parse_value(match.group(2)))
+        match = _INCLUDE.search(statement)
+        if match:
+            return Check("include", _parse_path(match.group(1), aliases), parse_value(match.group(2)))
+    except ValueError:
+        pass
+    return Check("unsupported", value=statement)
+
+
+def _scripts(item: Dict[str, Any], listen: str) -> List[str]:
+    """Restituisce le righe degli script di un certo tipo ('test' o 'prerequest')."""
+    lines: List[str] = []
+    for event in item.get("event", []):
+        if event.get("listen") == listen:
+            lines.extend(event.get("script", {}).get("exec", []))
+    return lines
+
+
+def iter_requests(collection: Dict[str, Any]) -> List[RequestSpec]:
+    """Appiattisce la collection in una lista di RequestSpec.
+
+    Gli script di test a livello di collection vengono aggiunti a ogni richiesta.
+    """
+    global_tests = parse_test_script(_scripts(collection, "test"))
+    specs: List[RequestSpec] = []
+
+    def walk(items: List[Dict[str, Any]], folder: str) -> None:
+        for item in items:
+            if "item" in item:
+                walk(item["item"], item.get("name", ""))
+                continue
+            request = item["request"]
+            url = request["url"]
+            raw_url = url["raw"] if isinstance(url, dict) else url
+            headers = tuple((h["key"], h["value"]) for h in request.get("header", [])
+                            if not h.get("disabled", False))
+            script = _scripts(item, "test")
+            tests = parse_test_script(script) + global_tests
+            specs.append(RequestSpec(item["name"], folder, request.get("method", "GET"),
+                                     raw_url, headers, tests, parse_extractions(script)))
+
+    walk(collection.get("item", []), "")
+    return specs
@@ -0,0 +1,72 @@
+"""Iterazione a pagine sull'elenco dei Pokemon"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Union
+from urllib.parse import parse_qs, urlsplit
+
+from cache import CachingClient
+from client import HttpClient
+
+
+class PokemonPager:
+    """Scorre l'elenco paginato dei Pokemon seguendo i link `next`.
+
+    Le voci vengono restituite una alla volta e in memoria ci sono al massimo
+    la pagina corrente e quella successiva, che viene scaricata in background
+    mentre la corrente viene consumata. L'attributo `offset` indica la
+    posizione della prossima voce: salvandolo si può riprendere più tardi
+    con PokemonPager(..., offset=offset_salvato).
+    """
+
+    def __init__(self, client: Union[HttpClient, CachingClient], base_url: str,
+                 limit: int = 20, offset: int = 0, prefetch: bool = True):
+        """Inizializza il pager a partire dall'offset indicato."""
+        if limit <= 0:
+            raise ValueError("limit deve essere maggiore di zero")
+        if offset < 0:
+            raise ValueError("offset non può essere negativo")
+        self.client = client
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.offset = offset
+        self.prefetch = prefetch
+        self.count: Optional[int] = None  # Totale dichiarato dal server
+
+    def _fetch(self, url: str) -> Dict[str, Any]:
+        response = self.client.get(url)
+        if response.status != 200:
+            raise RuntimeError(f"Richiesta fallita ({response.status}): {url}")
+        return response.json()
+
+    @staticmethod
+    def _page_offset(url: str, default: int) -> int:
+        """Legge l'offset dall'URL di una pagina."""
+        values = parse_qs(urlsplit(url).query).get("offset")
+        return int(values[0]) if values else default
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        url: Optional[str] = f"{self.base_url}/pokemon?limit={self.limit}&offset={self.offset}"
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            pending: Optional[Future] = None
+            while url is not None:
+                page_offset = self._page_offset(url, self.offset)
+                page = pending.result() if pending is not None else self._fetch(url)
+                pending = None
+                self.count = page.get("count", self.count)
+                url = page.get("next")
+                if url is not None and executor is not None:
+                    pending = executor.submit(self._fetch, url)
+                for index, entry in enumerate(page.get("results", [])):
+                    self.offset = page_offset + index + 1
+                    yield entry
+                del page
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pokemon(client: Union[HttpClient, CachingClient], base_url: str,
+                 limit: int = 20, offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """Scorre tutti i Pokemon a partire da offset, una pagina alla volta."""
+    return iter(PokemonPager(client, base_url, limit=limit, offset=offset))
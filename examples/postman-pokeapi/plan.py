@@ -0,0 +1,400 @@
+"""Piano di esecuzione compilato della collection Postman della PokeAPI
+
+La collection viene interpretata una volta sola: URL e header vengono
+risolti, le asserzioni diventano funzioni pronte da chiamare e le richieste
+sono ordinate per livelli in base alle variabili che si passano l'una con
+l'altra (pm.environment.set). Il piano si salva in JSON e viene ricaricato
+senza rileggere gli script finché collection, environment e variabili non
+cambiano.
+
+Uso:
+    python plan.py --plan .pokeapi-plan.json
+    python plan.py --plan .pokeapi-plan.json --base-url http://localhost:8000/api/v2 --concurrency 16
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from cache import CachingClient, ResponseCache
+from client import HttpClient, Response
+from collection import (VARIABLE_PATTERN, Check, iter_requests, load_json, load_variables, rebase_url,
+                        resolve)
+from runner import (DEFAULT_COLLECTION, DEFAULT_ENVIRONMENT, MISSING, RequestResult, TestResult,
+                    describe_error, evaluate_value, parse_key_values, print_report, resolve_path)
+
+PLAN_VERSION = 1
+
+_NOT_JSON = object()
+
+# (risposta, JSON già decodificato o _NOT_JSON, variabili) -> None se passa, altrimenti il motivo
+Predicate = Callable[[Response, Any, Dict[str, str]], Optional[str]]
+
+
+def compile_check(check: Check, variables: Dict[str, str], dynamic: FrozenSet[str] = frozenset()) -> Predicate:
+    """Trasforma una Check in un predicato equivalente a runner.evaluate.
+
+    I valori attesi vengono calcolati subito, tranne quelli che dipendono da
+    variabili impostate durante l'esecuzione (dynamic).
+    """
+    kind, value = check.kind, check.value
+    if kind == "status":
+        def predicate(response, data, variables):
+            return None if response.status == value else f"status atteso {value}, ricevuto {response.status}"
+    elif kind == "header":
+        header = value.lower()
+
+        def predicate(response, data, variables):
+            return None if header in response.headers else f"header mancante: {value}"
+    elif kind == "response_time_below":
+        def predicate(response, data, variables):
+            if response.elapsed_ms >= value:
+                return f"tempo di risposta {response.elapsed_ms:.0f}ms >= {value}ms"
+            return None
+    elif kind == "text_not_empty":
+        def predicate(response, data, variables):
+            return None if response.body else "corpo della risposta vuoto"
+    elif kind in ("property", "eql", "include"):
+        return _compile_json_check(check, variables, dynamic)
+    else:
+        message = f"asserzione non supportata: {value}" if kind == "unsupported" else f"asserzione sconosciuta: {kind}"
+
+        def predicate(response, data, variables):
+            return message
+    return predicate
+
+
+def _compile_json_check(check: Check, variables: Dict[str, str], dynamic: FrozenSet[str]) -> Predicate:
+    kind, path, value = check.kind, check.path, check.value
+    label = ".".join(path) or "jsonData"
+    if kind == "property":
+        def predicate(response, data, variables):
+            if data is _NOT_JSON:
+                return "la risposta non è JSON"
+            actual = resolve_path(data, path)
+            if not isinstance(actual, dict) or value not in actual:
+                return f"proprietà mancante: {label}.{value}"
+            return None
+        return predicate
+
+    if value[0] == "var" and value[1] in dynamic:
+        def expected_of(variables):
+            return evaluate_value(value, variables)
+    else:
+        constant = evaluate_value(value, variables)
+
+        def expected_of(variables):
+            return constant
+
+    if kind == "eql":
+        def predicate(response, data, variables):
+            if data is _NOT_JSON:
+                return "la risposta non è JSON"
+            actual, expected = resolve_path(data, path), expected_of(variables)
+            return None if actual == expected else f"{label}: atteso {expected!r}, ricevuto {actual!r}"
+    else:
+        def predicate(response, data, variables):
+            if data is _NOT_JSON:
+                return "la risposta non è JSON"
+            actual, expected = resolve_path(data, path), expected_of(variables)
+            if actual is MISSING or expected not in actual:
+                return f"{label} non contiene {expected!r}"
+            return None
+    return predicate
+
+
+class PlannedTest(NamedTuple):
+    """Blocco pm.test con le asserzioni già compilate."""
+    name: str
+    checks: Tuple[Check, ...]
+    predicates: Tuple[Predicate, ...]
+
+
+class PlannedRequest(NamedTuple):
+    """Richiesta del piano, con URL e header già risolti."""
+    name: str
+    folder: str
+    method: str
+    url: str                       # Può contenere {{variabili}} impostate durante l'esecuzione
+    headers: Dict[str, str]
+    tests: Tuple[PlannedTest, ...]
+    extracts: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    depends_on: Tuple[int, ...]    # Indici delle richieste che producono le variabili usate
+    level: int                     # 0 = nessuna dipendenza
+    dynamic: bool                  # URL o header da risolvere durante l'esecuzione
+    needs_json: bool               # Almeno un'asserzione o estrazione legge il JSON
+
+
+def _variables_used(spec_url: str, headers: Sequence[Tuple[str, str]], checks: Sequence[Check]) -> Set[str]:
+    names = set(VARIABLE_PATTERN.findall(spec_url))
+    for key, value in headers:
+        names.update(VARIABLE_PATTERN.findall(key + value))
+    for check in checks:
+        if check.kind in ("eql", "include") and check.value[0] == "var":
+            names.add(check.value[1])
+    return names
+
+
+def _plan_request(name: str, folder: str, method: str, url: str, headers: Dict[str, str],
+                  tests: Sequence[Tuple[str, Tuple[Check, ...]]], extracts: Tuple[Tuple[str, Tuple[str, ...]], ...],
+                  depends_on: Tuple[int, ...], level: int, variables: Dict[str, str],
+                  dynamic: FrozenSet[str]) -> PlannedRequest:
+    planned_tests = tuple(
+        PlannedTest(test_name, checks, tuple(compile_check(check, variables, dynamic) for check in checks))
+        for test_name, checks in tests)
+    text = url + "".join(key + value for key, value in headers.items())
+    is_dynamic = any(name in dynamic for name in VARIABLE_PATTERN.findall(text))
+    needs_json = bool(extracts) or any(check.kind in ("property", "eql", "include")
+                                       for test in planned_tests for check in test.checks)
+    return PlannedRequest(name, folder, method, url, headers, planned_tests, extracts, depends_on, level,
+                          is_dynamic, needs_json)
+
+
+class Plan:
+    """Piano di esecuzione compilato, serializzabile in JSON."""
+
+    def __init__(self, requests: List[PlannedRequest], variables: Dict[str, str],
+                 original_base: Optional[str], fingerprint: str = ""):
+        """Inizializza il piano."""
+        self.requests = requests
+        self.variables = variables
+        self.original_base = original_base
+        self.fingerprint = fingerprint
+
+    def levels(self) -> List[List[int]]:
+        """Raggruppa gli indici delle richieste per livello di dipendenza."""
+        levels: List[List[int]] = [[] for _ in range(max((r.level for r in self.requests), default=-1) + 1)]
+        for index, request in enumerate(self.requests):
+            levels[request.level].append(index)
+        return levels
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte il piano in un dizionario serializzabile."""
+        return {
+            "version": PLAN_VERSION,
+            "fingerprint": self.fingerprint,
+            "variables": self.variables,
+            "original_base": self.original_base,
+            "requests": [{
+                "name": r.name,
+                "folder": r.folder,
+                "method": r.method,
+                "url": r.url,
+                "headers": r.headers,
+                "tests": [{"name": t.name, "checks": [list(check) for check in t.checks]} for t in r.tests],
+                "extracts": [[name, list(path)] for name, path in r.extracts],
+                "depends_on": list(r.depends_on),
+                "level": r.level,
+            } for r in self.requests],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Plan":
+        """Ricostruisce il piano (e ricompila i predicati) da un dizionario."""
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"Versione del piano non supportata: {data.get('version')}")
+        variables = data["variables"]
+        dynamic = frozenset(name for r in data["requests"] for name, _path in r["extracts"])
+        requests = [
+            _plan_request(r["name"], r["folder"], r["method"], r["url"], r["headers"],
+                          [(t["name"], tuple(_check_from_list(c) for c in t["checks"])) for t in r["tests"]],
+                          tuple((name, tuple(path)) for name, path in r["extracts"]),
+                          tuple(r["depends_on"]), r["level"], variables, dynamic)
+            for r in data["requests"]]
+        return cls(requests, variables, data["original_base"], data["fingerprint"])
+
+    def save(self, path: str) -> None:
+        """Salva il piano su file."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "Plan":
+        """Carica un piano salvato con save."""
+        return cls.from_dict(load_json(path))
+
+
+def _check_from_list(item: List[Any]) -> Check:
+    """Ricostruisce una Check dalla sua forma JSON (le tuple diventano liste)."""
+    kind, path, value = item
+    if kind in ("eql", "include"):
+        if value[0] == "var":
+            value = ("var", value[1], tuple(tuple(step) for step in value[2]))
+        else:
+            value = tuple(value)
+    return Check(kind, tuple(path), value)
+
+
+def compile_plan(collection: Dict[str, Any], environment: Optional[Dict[str, Any]] = None,
+                 overrides: Optional[Dict[str, str]] = None, fingerprint: str = "") -> Plan:
+    """Compila la collection in un piano di esecuzione.
+
+    Una richiesta dipende dall'ultima richiesta precedente che imposta una
+    delle variabili che usa (nell'URL, negli header o nei valori attesi).
+    """
+    variables = load_variables(collection, environment, overrides)
+    specs = iter_requests(collection)
+    dynamic = frozenset(name for spec in specs for name, _path in spec.extracts)
+    static = {k: v for k, v in variables.items() if k not in dynamic}
+
+    producers: Dict[str, int] = {}
+    requests: List[PlannedRequest] = []
+    for index, spec in enumerate(specs):
+        checks = [check for test in spec.tests for check in test.checks]
+        used = _variables_used(spec.url, spec.headers, checks)
+        depends_on = tuple(sorted({producers[name] for name in used if name in producers}))
+        level = max((requests[i].level + 1 for i in depends_on), default=0)
+        headers = {resolve(k, static): resolve(v, static) for k, v in spec.headers}
+        requests.append(_plan_request(spec.name, spec.folder, spec.method, resolve(spec.url, static), headers,
+                                      [(test.name, test.checks) for test in spec.tests], spec.extracts,
+                                      depends_on, level, variables, dynamic))
+        for name, _path in spec.extracts:
+            producers[name] = index
+    return Plan(requests, variables, variables.get("base_url"), fingerprint)
+
+
+def fingerprint(collection_path: str, environment_path: Optional[str] = None,
+                overrides: Optional[Dict[str, str]] = None) -> str:
+    """Impronta dei file sorgente e delle variabili: cambia quando il piano va ricompilato."""
+    digest = hashlib.sha256(f"v{PLAN_VERSION}".encode())
+    for path in (collection_path, environment_path):
+        if path is not None:
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(json.dumps(overrides or {}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def load_or_compile(collection_path: str, environment_path: Optional[str] = None,
+                    overrides: Optional[Dict[str, str]] = None, path: Optional[str] = None) -> Plan:
+    """Carica il piano salvato in path se è aggiornato, altrimenti lo compila e lo salva."""
+    current = fingerprint(collection_path, environment_path, overrides)
+    if path is not None and os.path.exists(path):
+        try:
+            plan = Plan.load(path)
+        except (ValueError, KeyError, TypeError):
+            plan = None
+        if plan is not None and plan.fingerprint == current:
+            return plan
+    environment = load_json(environment_path) if environment_path is not None else None
+    plan = compile_plan(load_json(collection_path), environment, overrides, current)
+    if path is not None:
+        plan.save(path)
+    return plan
+
+
+class PlanRunner:
+    """Esegue un piano compilato con il minimo lavoro per richiesta.
+
+    Le richieste dello stesso livello partono in parallelo; un livello
+    inizia quando il precedente ha impostato le sue variabili.
+    """
+
+    def __init__(self, plan: Plan, base_url: Optional[str] = None, concurrency: int = 8,
+                 client: Optional[Union[HttpClient, CachingClient]] = None):
+        """Inizializza il runner, puntando gli URL del piano a base_url."""
+        if concurrency <= 0:
+            raise ValueError("concurrency deve essere maggiore di zero")
+        self.plan = plan
+        self.base_url = base_url
+        self.variables = dict(plan.variables)
+        if base_url:
+            self.variables["base_url"] = base_url
+        self.concurrency = concurrency
+        self.client = client or HttpClient(max_connections=concurrency)
+        self._urls = [rebase_url(r.url, plan.original_base, base_url) for r in plan.requests]
+
+    def execute(self, index: int, variables: Dict[str, str]) -> Tuple[RequestResult, Dict[str, str]]:
+        """Esegue una richiesta; restituisce l'esito e le variabili che imposta."""
+        request = self.plan.requests[index]
+        url, headers = self._urls[index], request.headers
+        if request.dynamic:
+            url = rebase_url(resolve(request.url, variables), self.plan.original_base, self.base_url)
+            headers = {resolve(k, variables): resolve(v, variables) for k, v in headers.items()}
+        try:
+            response = self.client.request(request.method, url, headers)
+        except Exception as e:
+            return RequestResult(request.name, request.folder, url, None, 0.0, (), describe_error(e)), {}
+
+        data: Any = _NOT_JSON
+        if request.needs_json:
+            try:
+                data = response.json()
+            except ValueError:
+                pass
+        tests = []
+        for test in request.tests:
+            result = TestResult(test.name, True)
+            for predicate in test.predicates:
+                message = predicate(response, data, variables)
+                if message is not None:
+                    result = TestResult(test.name, False, message)
+                    break
+            tests.append(result)
+
+        extracted = {}
+        if data is not _NOT_JSON:
+            for name, path in request.extracts:
+                value = resolve_path(data, path)
+                if value is not MISSING:
+                    extracted[name] = str(value)
+        result = RequestResult(request.name, request.folder, url, response.status, response.elapsed_ms,
+                               tuple(tests))
+        return result, extracted
+
+    def _with_dependencies(self, names: Sequence[str]) -> Set[int]:
+        selected: Set[int] = set()
+        pending = [i for i, r in enumerate(self.plan.requests) if r.name in names]
+        while pending:
+            index = pending.pop()
+            if index not in selected:
+                selected.add(index)
+                pending.extend(self.plan.requests[index].depends_on)
+        return selected
+
+    def run(self, names: Optional[Sequence[str]] = None) -> List[RequestResult]:
+        """Esegue le richieste (tutte o quelle indicate, con le loro dipendenze) nell'ordine della collection."""
+        selected = self._with_dependencies(names) if names is not None else None
+        variables = dict(self.variables)
+        results: Dict[int, RequestResult] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for level in self.plan.levels():
+                indexes = [i for i in level if selected is None or i in selected]
+                outcomes = list(executor.map(self.execute, indexes, [variables] * len(indexes)))
+                for index, (result, extracted) in zip(indexes, outcomes):
+                    results[index] = result
+                    variables.update(extracted)
+        return [results[i] for i in sorted(results)
+                if names is None or self.plan.requests[i].name in names]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto di ingresso da riga di comando."""
+    parser = argparse.ArgumentParser(description="Esegue la collection della PokeAPI da un piano compilato")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--environment", default=DEFAULT_ENVIRONMENT)
+    parser.add_argument("--plan", metavar="FILE", help="piano compilato, ricompilato se non aggiornato")
+    parser.add_argument("--base-url", help="sostituisce base_url, ad esempio con un server locale")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--var", action="append", default=[], metavar="CHIAVE=VALORE",
+                        help="sovrascrive una variabile")
+    parser.add_argument("--cache", metavar="FILE", help="cache su disco delle risposte")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="validità della cache in secondi")
+    args = parser.parse_args(argv)
+
+    plan = load_or_compile(args.collection, args.environment, parse_key_values(args.var), args.plan)
+    client: Union[HttpClient, CachingClient] = HttpClient(max_connections=args.concurrency)
+    if args.cache:
+        client = CachingClient(client, ResponseCache(args.cache), ttl=args.cache_ttl)
+    runner = PlanRunner(plan, base_url=args.base_url, concurrency=args.concurrency, client=client)
+    with runner.client:
+        results = runner.run()
+    return 1 if print_report(results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Esecuzione parallela della collection Postman della PokeAPI
+
+Uso:
+    python runner.py
+    python runner.py --base-url http://localhost:8000/api/v2 --concurrency 16
+    python runner.py --cache .pokeapi-cache.sqlite --cache-ttl 3600
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from cache import CachingClient, ResponseCache
+from client import HttpClient, Response
+from collection import (Check, PostmanTest, RequestSpec, iter_requests, load_json, load_variables,
+                        rebase_url, resolve)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_COLLECTION = os.path.join(HERE, "pokeapi-postman-collection.json")
+DEFAULT_ENVIRONMENT = os.path.join(HERE, "environment-file.json")
+
+MISSING = object()  # Percorso assente nel JSON di risposta
+
+
+class TestResult(NamedTuple):
+    """Esito di un blocco pm.test."""
+    name: str
+    passed: bool
+    message: str = ""
+
+
+class RequestResult(NamedTuple):
+    """Esito di una richiesta della collection."""
+    name: str
+    folder: str
+    url: str
+    status: Optional[int]
+    elapsed_ms: float
+    tests: Tuple[TestResult, ...]
+    error: Optional[str] = None  # Errore di rete, se la richiesta non è andata a buon fine
+
+    @property
+    def passed(self) -> bool:
+        """Indica se la richiesta è riuscita e tutti i test sono passati."""
+        return self.error is None and all(test.passed for test in self.tests)
+
+
+def evaluate_value(expression: Tuple, variables: Dict[str, str]) -> Any:
+    """Calcola il valore atteso di un'espressione prodotta da parse_value."""
+    if expression[0] == "literal":
+        return expression[1]
+    _kind, name, transforms = expression
+    value: Any = variables.get(name, "")
+    for transform in transforms:
+        if transform[0] == "lower":
+            value = value.lower()
+        elif transform[0] == "replace":
+            # Come in JavaScript, replace con una stringa sostituisce solo la prima occorrenza
+            value = value.replace(transform[1], transform[2], 1)
+        elif transform[0] == "int":
+            value = int(value)
+    return value
+
+
+def resolve_path(data: Any, path: Sequence[str]) -> Any:
+    """Segue un percorso nel JSON; restituisce MISSING se non esiste."""
+    for index, segment in enumerate(path):
+        if segment == "*":
+            if not isinstance(data, list):
+                return MISSING
+            return [resolve_path(item, path[index + 1:]) for item in data]
+        if segment == "length" and isinstance(data, (list, str)):
+            data = len(data)
+        elif isinstance(data, dict) and segment in data:
+            data = data[segment]
+        else:
+            return MISSING
+    return data
+
+
+def evaluate(check: Check, response: Response, variables: Dict[str, str]) -> Optional[str]:
+    """Valuta una singola asserzione; restituisce None se passa, altrimenti il motivo."""
+    if check.kind == "status":
+        if response.status != check.value:
+            return f"status atteso {check.value}, ricevuto {response.status}"
+        return None
+    if check.kind == "header":
+        if check.value.lower() not in response.headers:
+            return f"header mancante: {check.value}"
+        return None
+    if check.kind == "response_time_below":
+        if response.elapsed_ms >= check.value:
+            return f"tempo di risposta {response.elapsed_ms:.0f}ms >= {check.value}ms"
+        return None
+    if check.kind == "text_not_empty":
+        return None if response.body else "corpo della risposta vuoto"
+    if check.kind == "unsupported":
+        return f"asserzione non supportata: {check.value}"
+
+    try:
+        data = response.json()
+    except ValueError:
+        return "la risposta non è JSON"
+    actual = resolve_path(data, check.path)
+    label = ".".join(check.path) or "jsonData"
+    if check.kind == "property":
+        if not isinstance(actual, dict) or check.value not in actual:
+            return f"proprietà mancante: {label}.{check.value}"
+        return None
+    expected = evaluate_value(check.value, variables)
+    if check.kind == "eql":
+        if actual != expected:
+            return f"{label}: atteso {expected!r}, ricevuto {actual!r}"
+        return None
+    if check.kind == "include":
+        if actual is MISSING or expected not in actual:
+            return f"{label} non contiene {expected!r}"
+        return None
+    return f"asserzione sconosciuta: {check.kind}"
+
+
+def run_test(test: PostmanTest, response: Response, variables: Dict[str, str]) -> TestResult:
+    """Esegue un blocco pm.test: passa se tutte le sue asserzioni passano."""
+    for check in test.checks:
+        message = evaluate(check, response, variables)
+        if message is not None:
+            return TestResult(test.name, False, message)
+    return TestResult(test.name, True)
+
+
+def describe_error(error: Exception) -> str:
+    """Descrive l'errore di una richiesta fallita senza risposta.
+
+    I runner catturano qualsiasi eccezione (anche risposte troncate o
+    malformate e URL non validi): l'errore di una richiesta non deve
+    interrompere le altre.
+    """
+    return f"{type(error).__name__}: {error}"
+
+
+class CollectionRunner:
+    """Esegue le richieste della collection in parallelo e ne valuta i test.
+
+    Le richieste condividono un HttpClient con pool di connessioni; al massimo
+    `concurrency` richieste sono in volo contemporaneamente. Con base_url si
+    può puntare la collection a un server locale.
+    """
+
+    def __init__(self, collection: Dict[str, Any], environment: Optional[Dict[str, Any]] = None,
+                 base_url: Optional[str] = None, concurrency: int = 8,
+                 client: Optional[Union[HttpClient, CachingClient]] = None,
+                 overrides: Optional[Dict[str, str]] = None):
+        """Inizializza il runner."""
+        if concurrency <= 0:
+            raise ValueError("concurrency deve essere maggiore di zero")
+        self.variables = load_variables(collection, environment, overrides)
+        self.original_base = self.variables.get("base_url")
+        if base_url:
+            self.variables["base_url"] = base_url
+        self.base_url = base_url
+        self.requests = iter_requests(collection)
+        self.concurrency = concurrency
+        self.client = client or HttpClient(max_connections=concurrency)
+
+    def prepare(self, spec: RequestSpec) -> Tuple[str, Dict[str, str]]:
+        """Risolve URL e header di una richiesta."""
+        url = rebase_url(resolve(spec.url, self.variables), self.original_base, self.base_url)
+        headers = {resolve(k, self.variables): resolve(v, self.variables) for k, v in spec.headers}
+        return url, headers
+
+    def execute(self, spec: RequestSpec) -> RequestResult:
+        """Esegue una richiesta e i relativi test."""
+        url, headers = self.prepare(spec)
+        try:
+            response = self.client.request(spec.method, url, headers)
+        except Exception as e:
+            return RequestResult(spec.name, spec.folder, url, None, 0.0, (), describe_error(e))
+        tests = tuple(run_test(test, response, self.variables) for test in spec.tests)
+        return RequestResult(spec.name, spec.folder, url, response.status, response.elapsed_ms, tests)
+
+    def run(self, names: Optional[Sequence[str]] = None) -> List[RequestResult]:
+        """Esegue le richieste (tutte o quelle indicate) mantenendo l'ordine della collection."""
+        specs = [spec for spec in self.requests if names is None or spec.name in names]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(self.execute, specs))
+
+
+def parse_key_values(pairs: Sequence[str]) -> Dict[str, str]:
+    """Converte argomenti 'chiave=valore' in un dizionario."""
+    overrides = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Formato atteso chiave=valore: {pair}")
+        overrides[key] = value
+    return overrides
+
+
+def print_report(results: Sequence[RequestResult]) -> int:
+    """Stampa l'esito di ogni richiesta e restituisce il numero di richieste fallite."""
+    for result in results:
+        mark = "OK " if result.passed else "KO "
+        status = result.status if result.status is not None else "-"
+        print(f"{mark} {result.folder}/{result.name} [{status}] {result.elapsed_ms:.0f}ms")
+        if result.error:
+            print(f"      errore: {result.error}")
+        for test in result.tests:
+            if not test.passed:
+                print(f"      {test.name}: {test.message}")
+    failed = sum(not result.passed for result in results)
+    print(f"{len(results) - failed}/{len(results)} richieste superate")
+    return failed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto di ingresso da riga di comando."""
+    parser = argparse.ArgumentParser(description="Esegue la collection Postman della PokeAPI")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--environment", default=DEFAULT_ENVIRONMENT)
+    parser.add_argument("--base-url", help="sostituisce base_url, ad esempio con un server locale")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--var", action="append", default=[], metavar="CHIAVE=VALORE",
+                        help="sovrascrive una variabile")
+    parser.add_argument("--cache", metavar="FILE", help="cache su disco delle risposte")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="validità della cache in secondi")
+    args = parser.parse_args(argv)
+
+    client: Union[HttpClient, CachingClient] = HttpClient(max_connections=args.concurrency)
+    if args.cache:
+        client = CachingClient(client, ResponseCache(args.cache), ttl=args.cache_ttl)
+    runner = CollectionRunner(load_json(args.collection), load_json(args.environment),
+                              base_url=args.base_url, concurrency=args.concurrency,
+                              client=client, overrides=parse_key_values(args.var))
+    with runner.client:
+        results = runner.run()
+
+    failed = print_report(results)
+    if isinstance(client, CachingClient):
+        print(f"Cache: {client.hits} hit, {client.revalidated} rivalidate, {client.misses} miss "
+              f"({client.hit_ratio:.0%})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""Server locale che simula la PokeAPI a partire da risposte registrate
+
+Uso:
+    python stub_server.py --port 8000 --latency-ms 20 --jitter-ms 5
+    python stub_server.py --error-rate 0.01 --rate-limit 2000
+    python stub_server.py --record https://pokeapi.co/api/v2   # aggiorna le fixture
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from client import HttpClient
+from collection import load_json
+from runner import DEFAULT_COLLECTION, DEFAULT_ENVIRONMENT, CollectionRunner
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES = os.path.join(HERE, "fixtures.json.gz")
+API_PREFIX = "/api/v2"
+RECORDED_BASE_URL = "https://pokeapi.co" + API_PREFIX  # URL base dei link nelle fixture
+
+
+def fixture_key(path: str) -> str:
+    """Normalizza percorso e query (parametri ordinati) per la ricerca nelle fixture."""
+    parts = urlsplit(path)
+    query = urlencode(sorted(parse_qsl(parts.query)))
+    return parts.path.rstrip("/") + ("?" + query if query else "")
+
+
+class Fixture:
+    """Risposta registrata, già serializzata."""
+
+    def __init__(self, status: int, content_type: str, body: bytes):
+        """Inizializza la fixture e ne calcola l'ETag."""
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+
+def load_fixtures(path: str = DEFAULT_FIXTURES) -> Dict[str, Fixture]:
+    """Legge il file compresso delle fixture."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    fixtures = {}
+    for key, entry in data["responses"].items():
+        body = entry["body"]
+        raw = body.encode() if isinstance(body, str) else json.dumps(body, separators=(",", ":")).encode()
+        fixtures[fixture_key(key)] = Fixture(entry["status"], entry["content_type"], raw)
+    return fixtures
+
+
+def rebase_fixtures(fixtures: Dict[str, Fixture], base_url: str) -> Dict[str, Fixture]:
+    """Riscrive i link assoluti delle fixture (RECORDED_BASE_URL) verso base_url."""
+    old, new = RECORDED_BASE_URL.encode(), base_url.rstrip("/").encode()
+    return {key: Fixture(fixture.status, fixture.content_type, fixture.body.replace(old, new))
+            if old in fixture.body else fixture
+            for key, fixture in fixtures.items()}
+
+
+def _replace_base(value: Any, source: str) -> Any:
+    """Sostituisce source con RECORDED_BASE_URL in tutte le stringhe di un corpo JSON."""
+    if isinstance(value, str):
+        return RECORDED_BASE_URL + value[len(source):] if value.startswith(source) else value
+    if isinstance(value, list):
+        return [_replace_base(item, source) for item in value]
+    if isinstance(value, dict):
+        return {key: _replace_base(item, source) for key, item in value.items()}
+    return value
+
+
+def normalise_responses(responses: Dict[str, Dict[str, Any]], source_base_url: str) -> Dict[str, Dict[str, Any]]:
+    """Rende le risposte registrate indipendenti dal servizio sorgente e coerenti tra loro.
+
+    I link verso source_base_url diventano link verso RECORDED_BASE_URL.
+    Nelle pagine di un elenco i link next/previous verso pagine non
+    registrate vengono rimossi e count ridotto alle voci raggiungibili,
+    così chi scorre l'elenco sul server stub non esce mai verso il servizio
+    reale.
+    """
+    source = source_base_url.rstrip("/")
+    recorded = {fixture_key(key) for key in responses}
+    normalised = {}
+    for key, entry in responses.items():
+        body = _replace_base(entry["body"], source)
+        if isinstance(body, dict) and isinstance(body.get("results"), list):
+            for link in ("next", "previous"):
+                url = body.get(link)
+                if url is not None and (not url.startswith(RECORDED_BASE_URL) or
+                                        fixture_key(API_PREFIX + url[len(RECORDED_BASE_URL):]) not in recorded):
+                    body[link] = None
+            if body.get("next") is None and "count" in body:
+                offset = dict(parse_qsl(urlsplit(key).query)).get("offset", "0")
+                body["count"] = int(offset) + len(body["results"])
+        normalised[key] = dict(entry, body=body)
+    return normalised
+
+
+def save_fixtures(responses: Dict[str, Dict[str, Any]], path: str = DEFAULT_FIXTURES) -> None:
+    """Scrive le fixture in formato JSON compresso."""
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"version": 1, "responses": responses}, f, separators=(",", ":"), sort_keys=True)
+
+
+class TokenBucket:
+    """Limitatore di frequenza: al massimo `rate` richieste al secondo, con burst."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """Inizializza il bucket pieno."""
+        self.rate = rate
+        self.capacity = burst if burst is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """Consuma un token; restituisce False se la richiesta va rifiutata."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class StubServer(ThreadingHTTPServer):
+    """Server HTTP che risponde con le fixture, iniettando latenza ed errori.
+
+    - latency/jitter: ritardo (in secondi) aggiunto a ogni risposta
+    - error_rate: frazione di richieste che ricevono un 500
+    - rate_limit: richieste al secondo oltre le quali si risponde 429
+    Le risposte 200 hanno un ETag e rispondono 304 a If-None-Match. I link
+    assoluti delle fixture puntano al server stesso.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address: Tuple[str, int], fixtures: Optional[Dict[str, Fixture]] = None,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit: Optional[float] = None, seed: Optional[int] = None):
+        """Inizializza il server sull'indirizzo indicato."""
+        super().__init__(address, StubHandler)
+        self.fixtures = rebase_fixtures(load_fixtures() if fixtures is None else fixtures, self.base_url)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.limiter = TokenBucket(rate_limit) if rate_limit else None
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.requests = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """URL base da passare come base_url alla collection."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def draw(self) -> Tuple[float, bool]:
+        """Estrae ritardo e fallimento per una richiesta."""
+        with self._random_lock:
+            delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+        return max(delay, 0.0), failed
+
+    def start(self) -> threading.Thread:
+        """Avvia il server in un thread in background."""
+        thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        """Ferma il server e chiude il socket."""
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Gestore delle richieste del server stub."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Header e corpo partono in due write separate
+    server: StubServer
+
+    def do_GET(self) -> None:
+        with self.server._count_lock:
+            self.server.requests += 1
+        if self.server.limiter is not None and not self.server.limiter.take():
+            self._reply(429, "text/plain", b"Too Many Requests", {"Retry-After": "1"})
+            return
+        delay, failed = self.server.draw()
+        if delay:
+            time.sleep(delay)
+        if failed:
+            self._reply(500, "text/plain", b"Internal Server Error")
+            return
+
+        fixture = self.server.fixtures.get(fixture_key(self.path))
+        if fixture is None:
+            self._reply(404, "text/plain", b"Not Found")
+        elif fixture.status == 200 and self.headers.get("If-None-Match") == fixture.etag:
+            self._reply(304, fixture.content_type, b"", {"ETag": fixture.etag})
+        else:
+            extra = {"ETag": fixture.etag} if fixture.status == 200 else {}
+            self._reply(fixture.status, fixture.content_type, fixture.body, extra)
+
+    def _reply(self, status: int, content_type: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Il log di ogni richiesta rallenterebbe i test di carico
+        pass
+
+
+def record(source_base_url: str, path: str = DEFAULT_FIXTURES) -> int:
+    """Registra le risposte reali per tutti gli URL della collection."""
+    runner = CollectionRunner(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT))
+    responses: Dict[str, Dict[str, Any]] = {}
+    with HttpClient() as client:
+        for spec in runner.requests:
+            url, headers = runner.prepare(spec)
+            original = runner.original_base.rstrip("/")
+            relative = url[len(original):] if url.startswith(original) else urlsplit(url).path
+            response = client.request(spec.method, source_base_url.rstrip("/") + relative, headers)
+            content_type = response.headers.get("content-type", "application/octet-stream")
+            try:
+                body: Any = response.json()
+            except ValueError:
+                body = response.text()
+            responses[API_PREFIX + relative] = {"status": response.status, "content_type": content_type,
+                                                "body": body}
+    save_fixtures(normalise_responses(responses, source_base_url), path)
+    return len(responses)
+
+
+def main() -> None:
+    """Punto di ingresso da riga di comando."""
+    parser = argparse.ArgumentParser(description="Server locale che simula la PokeAPI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, help="richieste al secondo prima di rispondere 429")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--record", metavar="BASE_URL", help="registra le fixture dal servizio reale ed esce")
+    args = parser.parse_args()
+
+    if args.record:
+        count = record(args.record, args.fixtures)
+        print(f"Registrate {count} risposte in {args.fixtures}")
+        return
+
+    server = StubServer((args.host, args.port), load_fixtures(args.fixtures),
+                        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                        error_rate=args.error_rate, rate_limit=args.rate_limit, seed=args.seed)
+    print(f"Stub PokeAPI in ascolto su {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""Test di integrazione."""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from cache import CachingClient, ResponseCache
+from client import HttpClient
+from collection import load_json
+from loadtest import LoadTest, build_targets
+from pagination import PokemonPager
+from plan import PlanRunner, compile_plan, load_or_compile
+from stub_server import StubServer
+from runner import DEFAULT_COLLECTION, DEFAULT_ENVIRONMENT, CollectionRunner
+from test_unit import CHAINED_COLLECTION
+
+POKEMON_COUNT = 45
+PIKACHU = {"id": 25, "name": "pikachu", "types": [], "abilities": [], "stats": []}
+ROUTES = {
+    "/api/v2/pokemon/pikachu": PIKACHU,
+    "/api/v2/pokemon/25": PIKACHU,
+    "/api/v2/type/electric": {
+        "name": "electric",
+        "damage_relations": {"double_damage_from": [], "double_damage_to": []},
+    },
+    "/api/v2/type": {"results": [{"name": n} for n in ("fire", "water", "grass", "electric")]},
+    "/api/v2/ability/static": {"name": "static", "effect_entries": []},
+    "/api/v2/item/potion": {"name": "potion", "cost": 200, "effect_entries": [], "sprites": {}},
+}
+
+
+class FakePokeAPIHandler(BaseHTTPRequestHandler):
+    """Risponde con dati minimi alle richieste della collection."""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/api/v2/pokemon":
+            query = parse_qs(parts.query)
+            limit = int(query.get("limit", ["20"])[0])
+            offset = int(query.get("offset", ["0"])[0])
+            base = f"http://{self.headers['Host']}/api/v2/pokemon"
+            end = min(offset + limit, POKEMON_COUNT)
+            data = {
+                "count": POKEMON_COUNT,
+                "next": f"{base}?offset={end}&limit={limit}" if end < POKEMON_COUNT else None,
+                "previous": f"{base}?offset={max(offset - limit, 0)}&limit={limit}" if offset else None,
+                "results": [{"name": f"pokemon-{i}"} for i in range(offset, end)],
+            }
+        else:
+            data = ROUTES.get(parts.path)
+        if data is None:
+            status, body, content_type = 404, b"Not Found", "text/plain"
+        else:
+            status, body, content_type = 200, json.dumps(data).encode(), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class TruncatingHandler(FakePokeAPIHandler):
+    """Come FakePokeAPIHandler, ma tronca il corpo della risposta per pikachu."""
+    
+    def do_GET(self):
+        if urlsplit(self.path).path != "/api/v2/pokemon/pikachu":
+            super().do_GET()
+            return
+        self.wfile.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: 100\r\n\r\nhello")
+        self.close_connection = True
+
+
+class LocalServerTestCase(unittest.TestCase):
+    """Avvia il server locale una volta per classe di test."""
+    
+    handler = FakePokeAPIHandler
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), cls.handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/api/v2"
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class TestCollectionRunner(LocalServerTestCase):
+    """Test del runner contro un server locale."""
+    
+    def make_runner(self, **kwargs):
+        return CollectionRunner(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT),
+                                base_url=self.base_url, **kwargs)
+    
+    def test_full_collection_passes(self):
+        """
+        Tutte le richieste della collection, incluso il 404, superano
+        i propri test contro il server locale.
+        """
+        runner = self.make_runner(concurrency=4)
+        with runner.client:
+            results = runner.run()
+        
+        self.assertEqual(len(results), 8)
+        for result in results:
+            self.assertTrue(result.passed, result)
+        self.assertEqual(results[-1].status, 404)
+    
+    def test_failed_assertion_reported(self):
+        """
+        Un valore diverso da quello atteso viene riportato come test fallito.
+        """
+        runner = self.make_runner(overrides={"pokemon_id": "26"})
+        with runner.client:
+            [result] = runner.run(names=["Get Pokemon by ID"])
+        
+        self.assertFalse(result.passed)
+        failed = [test for test in result.tests if not test.passed]
+        self.assertEqual(failed[0].name, "Status code is 200")
+    
+    def test_repeated_run_served_from_cache(self):
+        """
+        Una seconda esecuzione con la cache su disco non torna sul server
+        per le risposte 200.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.sqlite")
+            for _ in range(2):
+                client = CachingClient(HttpClient(), ResponseCache(path), ttl=60)
+                with client:
+                    results = self.make_runner(client=client).run()
+                self.assertTrue(all(result.passed for result in results))
+        
+        # Solo il 404 non viene salvato in cache
+        self.assertEqual((client.hits, client.misses), (7, 1))
+    
+    def test_connection_error(self):
+        """
+        Un server irraggiungibile produce un errore per richiesta, senza eccezioni.
+        """
+        runner = CollectionRunner(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT),
+                                  base_url="http://127.0.0.1:9/api/v2")
+        [result] = runner.run(names=["Get Pokemon by ID"])
+        
+        self.assertIsNotNone(result.error)
+        self.assertFalse(result.passed)
+
+
+class TestMalformedResponses(LocalServerTestCase):
+    """Test dei runner contro un server che tronca una risposta."""
+    
+    handler = TruncatingHandler
+    
+    def test_collection_runner_reports_truncated_body(self):
+        """
+        Una risposta troncata diventa l'errore della sua richiesta, le altre proseguono.
+        """
+        runner = CollectionRunner(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT),
+                                  base_url=self.base_url, concurrency=4)
+        with runner.client:
+            results = {result.name: result for result in runner.run()}
+        
+        failed = [result for result in results.values() if not result.passed]
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(failed), 1)
+        self.assertIsNone(failed[0].status)
+        self.assertIn("IncompleteRead", failed[0].error)
+    
+    def test_plan_runner_reports_truncated_body(self):
+        """
+        Anche il piano compilato riporta la risposta troncata come errore della sola richiesta.
+        """
+        runner = PlanRunner(compile_plan(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT)),
+                            base_url=self.base_url, concurrency=4)
+        with runner.client:
+            results = runner.run()
+        
+        failed = [result for result in results if not result.passed]
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(failed), 1)
+        self.assertIn("IncompleteRead", failed[0].error)
+    
+    def test_invalid_base_url(self):
+        """
+        Un URL base senza schema viene riportato come errore di ogni richiesta.
+        """
+        runner = CollectionRunner(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT),
+                                  base_url=f"127.0.0.1:{self.server.server_port}/api/v2")
+        with runner.client:
+            results = runner.run()
+        
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result.error for result in results))
+
+
+class TestPlanRunner(LocalServerTestCase):
+    """Test dell'esecuzione di un piano compilato contro un server locale."""
+    
+    def test_full_collection_passes(self):
+        """
+        Il piano compilato dà gli stessi esiti del runner interpretato.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            plan = load_or_compile(DEFAULT_COLLECTION, DEFAULT_ENVIRONMENT, path=os.path.join(tmp, "plan.json"))
+        runner = PlanRunner(plan, base_url=self.base_url, concurrency=4)
+        with runner.client:
+            results = runner.run()
+        
+        self.assertEqual([result.name for result in results], [spec.name for spec in
+                         CollectionRunner(load_json(DEFAULT_COLLECTION)).requests])
+        for result in results:
+            self.assertTrue(result.passed, result)
+        self.assertEqual(results[-1].status, 404)
+    
+    def test_dependent_request_uses_extracted_variable(self):
+        """
+        La richiesta che usa una variabile impostata da un'altra parte dopo
+        di essa, anche quando viene selezionata da sola.
+        """
+        runner = PlanRunner(compile_plan(CHAINED_COLLECTION), base_url=self.base_url)
+        with runner.client:
+            results = runner.run()
+            [selected] = runner.run(names=["Get Pokemon by Name"])
+        
+        self.assertEqual(results[1].url, f"{self.base_url}/pokemon/pikachu")
+        self.assertTrue(all(result.passed for result in results), results)
+        self.assertTrue(selected.passed, selected)
+
+
+class TestPokemonPager(LocalServerTestCase):
+    """Test del pager contro lo stesso server locale."""
+    
+    def test_iterates_all_pages(self):
+        """
+        Il pager segue i link next fino alla fine dell'elenco.
+        """
+        with HttpClient() as client:
+            names = [entry["name"] for entry in PokemonPager(client, self.base_url, limit=20)]
+        
+        self.assertEqual(names, [f"pokemon-{i}" for i in range(POKEMON_COUNT)])
+    
+    def test_resume_from_saved_offset(self):
+        """
+        Interrompendo l'iterazione si può riprendere dall'offset salvato.
+        """
+        with HttpClient() as client:
+            pager = PokemonPager(client, self.base_url, limit=10)
+            for entry in pager:
+                if entry["name"] == "pokemon-14":
+                    break
+            saved = pager.offset
+            
+            rest = [entry["name"] for entry in PokemonPager(client, self.base_url, limit=10, offset=saved)]
+        
+        self.assertEqual(saved, 15)
+        self.assertEqual(rest[0], "pokemon-15")
+        self.assertEqual(len(rest), POKEMON_COUNT - 15)
+    
+    def test_without_prefetch(self):
+        """
+        Senza prefetch il risultato non cambia.
+        """
+        with HttpClient() as client:
+            entries = list(PokemonPager(client, self.base_url, limit=7, prefetch=False))
+        
+        self.assertEqual(len(entries), POKEMON_COUNT)
+
+
+class TestStubServer(unittest.TestCase):
+    """Test del server stub con le fixture registrate."""
+    
+    def start(self, **kwargs):
+        server = StubServer(("127.0.0.1", 0), seed=1, **kwargs)
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+    
+    def test_collection_passes_against_fixtures(self):
+        """
+        Tutta la collection, incluso il 404, passa contro le fixture.
+        """
+        server = self.start()
+        runner = CollectionRunner(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT),
+                                  base_url=server.base_url)
+        with runner.client:
+            results = runner.run()
+        
+        for result in results:
+            self.assertTrue(result.passed, result)
+        self.assertEqual(server.requests, 8)
+    
+    def test_injected_latency(self):
+        """
+        La latenza configurata si riflette sul tempo di risposta.
+        """
+        server = self.start(latency=0.05)
+        with HttpClient() as client:
+            response = client.get(server.base_url + "/pokemon/25")
+        
+        self.assertGreaterEqual(response.elapsed_ms, 50)
+    
+    def test_injected_errors(self):
+        """
+        Con error_rate=1 tutte le richieste ricevono un 500.
+        """
+        server = self.start(error_rate=1.0)
+        with HttpClient() as client:
+            statuses = {client.get(server.base_url + "/pokemon/25").status for _ in range(5)}
+        
+        self.assertEqual(statuses, {500})
+    
+    def test_rate_limit(self):
+        """
+        Oltre il limite di frequenza il server risponde 429 con Retry-After.
+        """
+        server = self.start(rate_limit=2)
+        with HttpClient() as client:
+            responses = [client.get(server.base_url + "/type") for _ in range(5)]
+        
+        self.assertEqual([r.status for r in responses[:2]], [200, 200])
+        self.assertEqual(responses[-1].status, 429)
+        self.assertEqual(responses[-1].headers["retry-after"], "1")
+    
+    def test_etag_revalidation(self):
+        """
+        Il client con cache rivalida le voci scadute ricevendo un 304.
+        """
+        server = self.start()
+        with tempfile.TemporaryDirectory() as tmp:
+            client = CachingClient(HttpClient(), ResponseCache(os.path.join(tmp, "cache.sqlite")), ttl=0)
+            with client:
+                first = client.get(server.base_url + "/pokemon/pikachu")
+                second = client.get(server.base_url + "/pokemon/pikachu")
+        
+        self.assertEqual(second.body, first.body)
+        self.assertEqual((client.misses, client.revalidated), (1, 1))
+    
+    def test_pager_stays_on_stub(self):
+        """
+        I link delle fixture puntano al server stub e l'elenco finisce con le pagine registrate.
+        """
+        server = self.start()
+        with HttpClient() as client:
+            pager = PokemonPager(client, server.base_url)
+            entries = list(pager)
+            ability = client.get(server.base_url + "/ability/static").json()
+        
+        self.assertEqual(len(entries), 20)
+        self.assertEqual(pager.count, 20)
+        self.assertEqual(server.requests, 2)
+        self.assertTrue(all(entry["url"].startswith(server.base_url + "/pokemon/") for entry in entries))
+        self.assertNotIn("pokeapi.co", json.dumps(ability))
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test del generatore di carico contro il server stub."""
+    
+    def setUp(self):
+        self.server = StubServer(("127.0.0.1", 0))
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.runner = CollectionRunner(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT),
+                                       base_url=self.server.base_url)
+    
+    def test_open_loop_rate_and_warmup(self):
+        """
+        Alla frequenza richiesta vengono inviate le richieste previste e
+        quelle del warm-up non entrano nel report.
+        """
+        targets = build_targets(self.runner)
+        with HttpClient(max_connections=8) as client:
+            report = LoadTest(targets, rps=200, duration=0.5, warmup=0.2, workers=8,
+                              seed=1, client=client).run()
+        
+        summary = report.summary()
+        self.assertEqual(summary["TOTALE"]["count"], 100)
+        self.assertEqual(self.server.requests, 140)
+        self.assertEqual(summary["Not Found Pokemon"]["statuses"].keys(), {"404"})
+        self.assertGreater(summary["TOTALE"]["p99_ms"], 0)
+    
+    def test_weighted_mix(self):
+        """
+        Con peso zero una richiesta viene esclusa dal mix.
+        """
+        weights = {spec.name: 0 for spec in self.runner.requests}
+        weights["Get Pokemon by ID"] = 1
+        targets = build_targets(self.runner, weights)
+        with HttpClient() as client:
+            report = LoadTest(targets, rps=100, duration=0.2, client=client).run()
+        
+        self.assertEqual([name for name, h in report.histograms.items() if h.total], ["Get Pokemon by ID"])
+    
+    def test_unknown_weight(self):
+        """
+        Un peso per una richiesta inesistente è un errore.
+        """
+        with self.assertRaises(ValueError):
+            build_targets(self.runner, {"Get Digimon": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,415 @@
+"""Test unitari."""
+
+import http.client
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from cache import CachingClient, ResponseCache
+from client import HttpClient, Response
+from loadtest import LatencyHistogram, LoadTest, Target
+from collection import (Check, iter_requests, load_json, load_variables, parse_test_script,
+                        parse_value, rebase_url, resolve)
+from plan import _NOT_JSON, Plan, compile_check, compile_plan, load_or_compile
+from runner import DEFAULT_COLLECTION, DEFAULT_ENVIRONMENT, evaluate, evaluate_value, run_test
+from stub_server import RECORDED_BASE_URL, normalise_responses
+
+# Collection in cui la seconda richiesta usa una variabile impostata dalla prima
+CHAINED_COLLECTION = {
+    "variable": [{"key": "base_url", "value": "https://pokeapi.co/api/v2"}, {"key": "pokemon_id", "value": "25"}],
+    "item": [
+        {"name": "Get Pokemon by ID",
+         "request": {"method": "GET", "url": "{{base_url}}/pokemon/{{pokemon_id}}"},
+         "event": [{"listen": "test", "script": {"exec": [
+             'var jsonData = pm.response.json();',
+             'pm.environment.set("pokemon_name", jsonData.name);',
+         ]}}]},
+        {"name": "Get Pokemon by Name",
+         "request": {"method": "GET", "url": "{{base_url}}/pokemon/{{pokemon_name}}"},
+         "event": [{"listen": "test", "script": {"exec": [
+             'pm.test("Same Pokemon", function () {',
+             '    var jsonData = pm.response.json();',
+             '    pm.expect(jsonData.name).to.eql(pm.variables.get("pokemon_name"));',
+             '});',
+         ]}}]},
+        {"name": "Get Type", "request": {"method": "GET", "url": "{{base_url}}/type/electric"}},
+    ],
+}
+
+
+def make_response(data=None, status=200, elapsed_ms=10.0, body=None):
+    """Crea una risposta JSON finta."""
+    if body is None:
+        body = json.dumps(data).encode()
+    return Response(status, {"content-type": "application/json"}, body, elapsed_ms)
+
+
+class TestCollection(unittest.TestCase):
+    """Test per la lettura della collection e delle variabili."""
+    
+    def setUp(self):
+        self.collection = load_json(DEFAULT_COLLECTION)
+        self.environment = load_json(DEFAULT_ENVIRONMENT)
+    
+    def test_variables_precedence(self):
+        """Verifica che environment e override prevalgano sulle variabili della collection."""
+        variables = load_variables(self.collection, self.environment, {"pokemon_name": "bulbasaur"})
+        
+        self.assertEqual(variables["pokemon_name"], "bulbasaur")
+        self.assertEqual(variables["base_url"], "https://pokeapi.co/api/v2")
+        self.assertEqual(variables["limit"], "20")
+    
+    def test_resolve_and_rebase(self):
+        """Verifica la risoluzione delle variabili e il cambio di base_url."""
+        url = resolve("https://pokeapi.co/api/v2/pokemon/{{pokemon_name}}", {"pokemon_name": "pikachu"})
+        
+        self.assertEqual(url, "https://pokeapi.co/api/v2/pokemon/pikachu")
+        self.assertEqual(rebase_url(url, "https://pokeapi.co/api/v2", "http://localhost:8000/api/v2/"),
+                         "http://localhost:8000/api/v2/pokemon/pikachu")
+    
+    def test_all_requests_parsed(self):
+        """Verifica che tutte le richieste e tutte le asserzioni vengano riconosciute."""
+        specs = iter_requests(self.collection)
+        
+        self.assertEqual(len(specs), 8)
+        for spec in specs:
+            for test in spec.tests:
+                self.assertTrue(test.checks, f"{spec.name}: {test.name}")
+                for check in test.checks:
+                    self.assertNotEqual(check.kind, "unsupported", f"{spec.name}: {check.value}")
+    
+    def test_parse_value(self):
+        """Verifica la conversione delle espressioni JavaScript più comuni."""
+        self.assertEqual(parse_value('"fire"'), ("literal", "fire"))
+        self.assertEqual(parse_value('parseInt(pm.variables.get("limit"))'), ("var", "limit", (("int",),)))
+        self.assertEqual(parse_value('pm.variables.get("x").toLowerCase().replace(" ", "-")'),
+                         ("var", "x", (("lower",), ("replace", " ", "-"))))
+
+
+class TestAssertions(unittest.TestCase):
+    """Test per la valutazione delle asserzioni."""
+    
+    def test_eql_with_variable(self):
+        """Verifica il confronto con una variabile trasformata."""
+        check = Check("eql", ("name",), ("var", "ability_name", (("lower",), ("replace", " ", "-"))))
+        
+        self.assertIsNone(evaluate(check, make_response({"name": "lightning-rod"}), {"ability_name": "Lightning Rod"}))
+        self.assertIsNotNone(evaluate(check, make_response({"name": "static"}), {"ability_name": "Lightning Rod"}))
+    
+    def test_include_over_mapped_list(self):
+        """Verifica include su un elenco ottenuto con map."""
+        [test] = parse_test_script([
+            'pm.test("Types", function () {',
+            '    var jsonData = pm.response.json();',
+            '    var names = jsonData.results.map(function(result) {',
+            '        return result.name;',
+            '    });',
+            '    pm.expect(names).to.include("fire");',
+            '});',
+        ])
+        
+        self.assertTrue(run_test(test, make_response({"results": [{"name": "fire"}]}), {}).passed)
+        self.assertFalse(run_test(test, make_response({"results": [{"name": "water"}]}), {}).passed)
+    
+    def test_length_and_response_time(self):
+        """Verifica la lunghezza di una lista e il limite sul tempo di risposta."""
+        length = Check("eql", ("results", "length"), ("var", "limit", (("int",),)))
+        below = Check("response_time_below", value=1000)
+        
+        self.assertIsNone(evaluate(length, make_response({"results": [1, 2]}), {"limit": "2"}))
+        self.assertIsNotNone(evaluate(below, make_response({}, elapsed_ms=1500), {}))
+    
+    def test_property_on_non_json(self):
+        """Verifica che un corpo non JSON faccia fallire i controlli sulle proprietà."""
+        response = make_response(status=404, body=b"Not Found")
+        
+        self.assertEqual(evaluate(Check("property", (), "id"), response, {}), "la risposta non è JSON")
+        self.assertIsNone(evaluate(Check("text_not_empty"), response, {}))
+    
+    def test_unsupported_fails(self):
+        """Verifica che un'asserzione non riconosciuta non passi silenziosamente."""
+        [test] = parse_test_script([
+            'pm.test("Strano", function () {',
+            '    pm.expect(pm.response.code).to.be.oneOf([200, 201]);',
+            '});',
+        ])
+        
+        self.assertEqual(test.checks[0].kind, "unsupported")
+        self.assertFalse(run_test(test, make_response({}), {}).passed)
+    
+    def test_evaluate_value_literal(self):
+        """Verifica che i letterali vengano restituiti invariati."""
+        self.assertEqual(evaluate_value(("literal", 25), {}), 25)
+
+
+class TestPlan(unittest.TestCase):
+    """Test per il piano di esecuzione compilato."""
+    
+    def test_predicates_match_interpreter(self):
+        """Verifica che i predicati compilati diano gli stessi esiti di evaluate."""
+        variables = load_variables(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT))
+        responses = [
+            make_response({"id": 25, "name": "pikachu", "results": [{"name": "electric"}] * 20}),
+            make_response({"name": "static", "effect_entries": []}, elapsed_ms=2000),
+            make_response(status=404, body=b"Not Found"),
+            Response(200, {}, b"", 1.0),
+        ]
+        for spec in iter_requests(load_json(DEFAULT_COLLECTION)):
+            for test in spec.tests:
+                for check in test.checks:
+                    predicate = compile_check(check, variables)
+                    for response in responses:
+                        try:
+                            data = response.json()
+                        except ValueError:
+                            data = _NOT_JSON
+                        self.assertEqual(predicate(response, data, variables),
+                                         evaluate(check, response, variables), check)
+    
+    def test_urls_resolved_at_compile_time(self):
+        """Verifica che URL e valori attesi vengano risolti nella compilazione."""
+        plan = compile_plan(load_json(DEFAULT_COLLECTION), load_json(DEFAULT_ENVIRONMENT))
+        
+        self.assertEqual(len(plan.requests), 8)
+        self.assertEqual(plan.requests[0].url, "https://pokeapi.co/api/v2/pokemon/pikachu")
+        self.assertEqual(plan.levels(), [list(range(8))])
+        self.assertFalse(any(request.dynamic for request in plan.requests))
+    
+    def test_dependency_graph(self):
+        """Verifica che una variabile impostata da una richiesta ne crei la dipendenza."""
+        plan = compile_plan(CHAINED_COLLECTION)
+        by_id, by_name, by_type = plan.requests
+        
+        self.assertEqual(by_id.extracts, (("pokemon_name", ("name",)),))
+        self.assertEqual(by_name.depends_on, (0,))
+        self.assertTrue(by_name.dynamic)
+        self.assertEqual(by_name.url, "https://pokeapi.co/api/v2/pokemon/{{pokemon_name}}")
+        self.assertEqual(plan.levels(), [[0, 2], [1]])
+    
+    def test_serialized_round_trip(self):
+        """Verifica che il piano salvato e ricaricato sia identico."""
+        plan = compile_plan(CHAINED_COLLECTION)
+        loaded = Plan.from_dict(json.loads(json.dumps(plan.to_dict())))
+        
+        self.assertEqual(loaded.to_dict(), plan.to_dict())
+        self.assertEqual(loaded.requests[1].tests[0].checks, plan.requests[1].tests[0].checks)
+    
+    def test_recompiled_only_when_inputs_change(self):
+        """Verifica che il piano salvato venga riusato finché sorgenti e variabili non cambiano."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "plan.json")
+            first = load_or_compile(DEFAULT_COLLECTION, DEFAULT_ENVIRONMENT, path=path)
+            
+            with patch("plan.compile_plan") as compile_mock:
+                second = load_or_compile(DEFAULT_COLLECTION, DEFAULT_ENVIRONMENT, path=path)
+            compile_mock.assert_not_called()
+            
+            third = load_or_compile(DEFAULT_COLLECTION, DEFAULT_ENVIRONMENT, {"pokemon_name": "eevee"}, path)
+        
+        self.assertEqual(second.to_dict(), first.to_dict())
+        self.assertNotEqual(third.fingerprint, first.fingerprint)
+        self.assertEqual(third.requests[0].url, "https://pokeapi.co/api/v2/pokemon/eevee")
+
+
+class TestHttpClient(unittest.TestCase):
+    """Test della gestione delle connessioni del client HTTP."""
+    
+    def test_failed_retry_closes_new_connection(self):
+        """Verifica che la connessione aperta per il nuovo tentativo venga chiusa se fallisce anche lui."""
+        client = HttpClient()
+        stale, fresh = MagicMock(), MagicMock()
+        client._pool(("http", "example.invalid"))[0].put(stale)
+        send = MagicMock(side_effect=[http.client.RemoteDisconnected("chiusa"), OSError("rifiutata")])
+        
+        with patch.object(client, "_connect", return_value=fresh), patch.object(HttpClient, "_send", send):
+            with self.assertRaises(OSError):
+                client.get("http://example.invalid/pokemon/1")
+        
+        stale.close.assert_called_once()
+        fresh.close.assert_called_once()
+        self.assertTrue(client._pool(("http", "example.invalid"))[0].empty())
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test per la cache su disco delle risposte."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.now = [1000.0]
+        self.cache = ResponseCache(os.path.join(self.tmp.name, "cache.sqlite"), clock=lambda: self.now[0])
+    
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+    
+    def make_client(self, *responses):
+        client = MagicMock()
+        client.request.side_effect = list(responses)
+        return client
+    
+    def test_round_trip_compressed(self):
+        """Verifica che il corpo venga salvato compresso e riletto identico."""
+        body = json.dumps({"results": [{"name": "pikachu"}] * 200}).encode()
+        self.cache.put("http://x/pokemon", Response(200, {"etag": '"v1"'}, body, 5.0))
+        
+        entry = self.cache.get("http://x/pokemon")
+        
+        self.assertEqual(entry.response.body, body)
+        self.assertEqual(entry.etag, '"v1"')
+        self.assertLess(self.cache.size(), len(body))
+    
+    def test_lru_eviction(self):
+        """Verifica che oltre il limite venga eliminata la voce usata meno di recente."""
+        self.cache.max_bytes = 250
+        for name in ("a", "b"):
+            self.cache.put(f"http://x/{name}", Response(200, {}, os.urandom(100), 1.0))
+            self.now[0] += 1
+        self.cache.get("http://x/a")
+        self.now[0] += 1
+        
+        self.cache.put("http://x/c", Response(200, {}, os.urandom(100), 1.0))
+        
+        self.assertIsNotNone(self.cache.get("http://x/a"))
+        self.assertIsNone(self.cache.get("http://x/b"))
+        self.assertIsNotNone(self.cache.get("http://x/c"))
+    
+    def test_fresh_hit_skips_network(self):
+        """Verifica che una voce fresca venga servita senza richieste."""
+        client = self.make_client(make_response({"id": 25}))
+        caching = CachingClient(client, self.cache, ttl=60)
+        
+        caching.get("http://x/pokemon/25")
+        response = caching.get("http://x/pokemon/25")
+        
+        self.assertEqual(response.json(), {"id": 25})
+        self.assertEqual(client.request.call_count, 1)
+        self.assertEqual((caching.hits, caching.misses), (1, 1))
+        self.assertEqual(caching.hit_ratio, 0.5)
+    
+    def test_stale_entry_revalidated(self):
+        """Verifica la rivalidazione con If-None-Match e la risposta 304."""
+        first = Response(200, {"etag": '"v1"'}, b'{"id": 25}', 5.0)
+        client = self.make_client(first, Response(304, {}, b"", 2.0))
+        caching = CachingClient(client, self.cache, ttl=60)
+        
+        caching.get("http://x/pokemon/25")
+        self.now[0] += 120
+        response = caching.get("http://x/pokemon/25")
+        
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.json(), {"id": 25})
+        sent_headers = client.request.call_args_list[1][0][2]
+        self.assertEqual(sent_headers["If-None-Match"], '"v1"')
+        self.assertEqual(caching.revalidated, 1)
+    
+    def test_errors_not_cached(self):
+        """Verifica che le risposte non 200 non vengano salvate."""
+        client = self.make_client(make_response(status=404, body=b"Not Found"),
+                                  make_response(status=404, body=b"Not Found"))
+        caching = CachingClient(client, self.cache)
+        
+        caching.get("http://x/pokemon/missing")
+        caching.get("http://x/pokemon/missing")
+        
+        self.assertEqual(client.request.call_count, 2)
+        self.assertEqual(len(self.cache), 0)
+
+
+class TestFixtures(unittest.TestCase):
+    """Test della normalizzazione delle risposte registrate."""
+    
+    def page(self, offset, next_offset):
+        source = "http://mirror.local/api/v2"
+        return {"status": 200, "content_type": "application/json", "body": {
+            "count": 1302,
+            "next": f"{source}/pokemon?offset={next_offset}&limit=2" if next_offset is not None else None,
+            "previous": None,
+            "results": [{"name": f"p{i}", "url": f"{source}/pokemon/{i}/"} for i in (offset, offset + 1)],
+        }}
+    
+    def test_links_rebased_and_unrecorded_pages_trimmed(self):
+        """
+        I link passano a RECORDED_BASE_URL; un next verso una pagina non registrata viene rimosso.
+        """
+        responses = {
+            "/api/v2/pokemon?limit=2&offset=0": self.page(0, 2),
+            "/api/v2/pokemon?offset=2&limit=2": self.page(2, 4),
+        }
+        
+        normalised = normalise_responses(responses, "http://mirror.local/api/v2/")
+        
+        first = normalised["/api/v2/pokemon?limit=2&offset=0"]["body"]
+        last = normalised["/api/v2/pokemon?offset=2&limit=2"]["body"]
+        self.assertEqual(first["next"], RECORDED_BASE_URL + "/pokemon?offset=2&limit=2")
+        self.assertEqual(first["count"], 1302)
+        self.assertEqual(first["results"][0]["url"], RECORDED_BASE_URL + "/pokemon/0/")
+        self.assertEqual((last["next"], last["count"]), (None, 4))
+        self.assertEqual(responses["/api/v2/pokemon?limit=2&offset=0"]["body"]["count"], 1302)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test per l'istogramma delle latenze."""
+    
+    def test_arbitrary_values_within_precision(self):
+        """Verifica che il bucket di qualsiasi valore lo rappresenti con errore sotto 1/128."""
+        rng = random.Random(7)
+        values = [rng.randint(1, 2_000_000) for _ in range(5000)] + [2 ** k - 1 for k in range(1, 21)]
+        for value in values:
+            histogram = LatencyHistogram()
+            histogram.record(value)
+            histogram.record(10 ** 9)  # Il massimo non deve troncare il bucket del valore
+            
+            reported = histogram.percentile(50)
+            
+            self.assertGreaterEqual(reported, value)
+            self.assertLess((reported - value) / value, 1 / 128, value)
+    
+    def test_percentiles_within_precision(self):
+        """Verifica che i percentili abbiano un errore relativo sotto l'1%."""
+        histogram = LatencyHistogram()
+        for value in range(1, 100001):
+            histogram.record(value)
+        
+        for percent, expected in ((50, 50000), (95, 95000), (99, 99000)):
+            self.assertAlmostEqual(histogram.percentile(percent), expected, delta=expected * 0.01)
+        self.assertEqual(histogram.percentile(100), 100000)
+        self.assertEqual(histogram.max, 100000)
+    
+    def test_merge_and_hgrm(self):
+        """Verifica l'unione di istogrammi e l'esportazione .hgrm."""
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record(1000)
+        second.record(3000)
+        
+        first.merge(second)
+        text = first.to_hgrm()
+        
+        self.assertEqual(first.total, 2)
+        self.assertIn("#[Total count    =            2]", text)
+        self.assertAlmostEqual(first.percentile(50), 1000, delta=10)
+    
+    def test_empty(self):
+        """Verifica che un istogramma vuoto restituisca zero."""
+        self.assertEqual(LatencyHistogram().percentile(99), 0)
+
+
+class TestLoadTestErrors(unittest.TestCase):
+    """Test delle richieste fallite durante il test di carico."""
+    
+    def test_non_os_errors_are_counted(self):
+        """Verifica che le eccezioni non OSError vengano registrate come 'error'."""
+        client = MagicMock()
+        client.request.side_effect = http.client.IncompleteRead(b"")
+        target = Target("Get Pokemon", "GET", "http://example.invalid/pokemon/1", {}, 1.0)
+        
+        report = LoadTest([target], rps=64, duration=0.125, workers=2, client=client).run()
+        
+        self.assertEqual(report.statuses["Get Pokemon"], {"error": 8})
+        self.assertEqual(report.histograms["Get Pokemon"].total, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()